@@ -12,6 +12,11 @@ import bcrypt
 
 ALGORITHM = "HS256"
 
+# EventSource URLs can't carry headers and end up in logs/history, so streams use
+# a short-lived token that is only valid for the event stream
+STREAM_TOKEN_SCOPE = "events-stream"
+STREAM_TOKEN_TTL = int(os.getenv("STREAM_TOKEN_TTL_SECONDS", "60"))
+
 
 def get_secret_key() -> str:
     key = os.getenv("SECRET_KEY")
@@ -68,7 +73,30 @@ http_bearer = HTTPBearer(auto_error=False)
 def require_user(creds: Optional[HTTPAuthorizationCredentials] = Depends(http_bearer)) -> Dict[str, Any]:
     if not creds or not creds.scheme.lower() == "bearer":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing bearer token")
-    return verify_jwt(creds.credentials)
+    payload = verify_jwt(creds.credentials)
+    if payload.get("scope"):
+        # Single-purpose tokens (stream tokens) are not session credentials
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    return payload
+
+
+def issue_stream_token(user: Dict[str, Any]) -> str:
+    return issue_jwt(
+        {"sub": user.get("sub"), "email": user.get("email"), "scope": STREAM_TOKEN_SCOPE},
+        expires_in=STREAM_TOKEN_TTL,
+    )
+
+
+def require_user_stream(token: Optional[str] = None, creds: Optional[HTTPAuthorizationCredentials] = Depends(http_bearer)) -> Dict[str, Any]:
+    # EventSource can't set headers, so streams pass a stream token (never the session JWT) as ?token=
+    if creds and creds.scheme.lower() == "bearer":
+        return require_user(creds)
+    if token:
+        payload = verify_jwt(token)
+        if payload.get("scope") != STREAM_TOKEN_SCOPE:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Stream token required")
+        return payload
+    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing bearer token")
 
 
 def upsert_user_from_google(idinfo: Dict[str, Any]) -> Dict[str, Any]:
@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import sqlite3
+import itertools
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+
+# --- Event bus for the UI tool panel ---
+# Per-user ring buffers with monotonically increasing ids. The backend is
+# pluggable so several uvicorn workers can share one event history.
+
+
+class MemoryEventBackend:
+    """Process-local backend. Appends are lock-free: ids come from an
+    itertools.count and deque appends are atomic under the GIL."""
+
+    def __init__(self, maxlen: int = 200):
+        self.maxlen = maxlen
+        self._ids = itertools.count(1)
+        self._buffers: Dict[str, Deque[Dict[str, Any]]] = {}
+
+    def append(self, user_id: str, evt: Dict[str, Any]) -> Dict[str, Any]:
+        buf = self._buffers.get(user_id)
+        if buf is None:
+            buf = self._buffers.setdefault(user_id, deque(maxlen=self.maxlen))
+        evt = {**evt, "id": next(self._ids)}
+        buf.append(evt)
+        return evt
+
+    def since(self, user_id: str, since_id: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        # list(deque) copies in one C call, so concurrent appends can't break iteration
+        out = [e for e in list(self._buffers.get(user_id, ())) if e["id"] > since_id]
+        return out[-limit:] if limit else out
+
+
+class SQLiteEventBackend:
+    """File-backed backend shared by all workers on a host. SQLite assigns
+    ids atomically across processes; each user's history is trimmed to maxlen."""
+
+    def __init__(self, path: str, maxlen: int = 200, trim_every: int = 50):
+        self.path = path
+        self.maxlen = maxlen
+        self.trim_every = trim_every
+        self._local = threading.local()
+        self._appends = itertools.count(1)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ui_events ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " user_id TEXT NOT NULL,"
+            " data TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ui_events_user_id ON ui_events (user_id, id)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are per-thread; sync endpoints run in a threadpool
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, user_id: str, evt: Dict[str, Any]) -> Dict[str, Any]:
+        conn = self._conn()
+        cur = conn.execute(
+            "INSERT INTO ui_events (user_id, data) VALUES (?, ?)",
+            (user_id, json.dumps(evt, default=str, ensure_ascii=False)),
+        )
+        evt = {**evt, "id": cur.lastrowid}
+        if next(self._appends) % self.trim_every == 0:
+            conn.execute(
+                "DELETE FROM ui_events WHERE user_id = ? AND id <= ("
+                " SELECT id FROM ui_events WHERE user_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (user_id, user_id, self.maxlen),
+            )
+        return evt
+
+    def since(self, user_id: str, since_id: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT id, data FROM ui_events WHERE user_id = ? AND id > ? ORDER BY id DESC LIMIT ?",
+            (user_id, since_id, min(limit or self.maxlen, self.maxlen)),
+        ).fetchall()
+        return [{**json.loads(data), "id": _id} for _id, data in reversed(rows)]
+
+
+class RedisEventBackend:
+    """Redis (or any Redis-protocol server) backend: INCR for ids, a capped
+    list per user. Requires the optional `redis` package."""
+
+    def __init__(self, url: str, maxlen: int = 200, prefix: str = "crmb:events"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("EVENTS_BACKEND=redis requires the 'redis' package")
+        self.maxlen = maxlen
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+
+    def append(self, user_id: str, evt: Dict[str, Any]) -> Dict[str, Any]:
+        evt = {**evt, "id": int(self._redis.incr(f"{self.prefix}:seq"))}
+        key = f"{self.prefix}:{user_id}"
+        pipe = self._redis.pipeline()
+        pipe.rpush(key, json.dumps(evt, default=str, ensure_ascii=False))
+        pipe.ltrim(key, -self.maxlen, -1)
+        pipe.execute()
+        return evt
+
+    def since(self, user_id: str, since_id: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        raw = self._redis.lrange(f"{self.prefix}:{user_id}", -(limit or self.maxlen), -1)
+        return [e for e in (json.loads(r) for r in raw) if e["id"] > since_id]
+
+
+# --- Compact payloads ---
+# Events keep a bounded, redacted summary of each tool call; full responses
+# (500-hit searches, aggregations) only go to the optional spill log.
+EVENTS_SAMPLE_ROWS = int(os.getenv("EVENTS_SAMPLE_ROWS", "10"))
+EVENTS_SAMPLE_IDS = int(os.getenv("EVENTS_SAMPLE_IDS", "5"))
+EVENTS_PAYLOAD_MAX = int(os.getenv("EVENTS_PAYLOAD_MAX", "4096"))
+EVENTS_STRING_MAX = 200
+EVENTS_LIST_MAX = 20
+
+REDACT_KEYS = ("password", "passwd", "secret", "token", "api_key", "apikey", "authorization")
+
+
+def redact(value: Any, depth: int = 0, max_depth: int = 4) -> Any:
+    # Mask credential-like keys and clip long strings / lists / deep nesting
+    if isinstance(value, dict):
+        if depth >= max_depth:
+            return "{...}"
+        return {
+            k: ("***" if any(r in str(k).lower() for r in REDACT_KEYS) else redact(v, depth + 1, max_depth))
+            for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        if depth >= max_depth:
+            return "[...]"
+        out = [redact(v, depth + 1, max_depth) for v in value[:EVENTS_LIST_MAX]]
+        if len(value) > EVENTS_LIST_MAX:
+            out.append(f"... {len(value) - EVENTS_LIST_MAX} more")
+        return out
+    if isinstance(value, str) and len(value) > EVENTS_STRING_MAX:
+        return value[:EVENTS_STRING_MAX] + "..."
+    return value
+
+
+def _hits_total(hits: Dict[str, Any]) -> Any:
+    total = hits.get("total")
+    # ES 7 returns {"value": n, "relation": "eq"}
+    return total.get("value") if isinstance(total, dict) else total
+
+
+def _cap(payload: Dict[str, Any]) -> Dict[str, Any]:
+    rows = (payload.get("hits") or {}).get("hits")
+    while rows and len(json.dumps(payload, default=str)) > EVENTS_PAYLOAD_MAX:
+        del rows[len(rows) // 2:]
+    raw = json.dumps(payload, default=str, ensure_ascii=False)
+    if len(raw) > EVENTS_PAYLOAD_MAX:
+        return {"truncated": True, "preview": raw[:EVENTS_PAYLOAD_MAX]}
+    return payload
+
+
+def summarize_response(response: Any):
+    """Return (compact payload, summary) for a tool response."""
+    response = getattr(response, "body", response)
+    if not isinstance(response, dict):
+        return _cap({"preview": redact(str(response))}), {}
+
+    if isinstance(response.get("hits"), dict):
+        hits = response["hits"]
+        rows = hits.get("hits") or []
+        summary = {
+            "hits": _hits_total(hits),
+            "returned": len(rows),
+            "took": response.get("took"),
+            "ids": [h.get("_id") for h in rows[:EVENTS_SAMPLE_IDS]],
+        }
+        if response.get("aggregations"):
+            summary["aggs"] = sorted(response["aggregations"])
+        sample = [
+            {"_id": h.get("_id"), "_index": h.get("_index"), "_source": redact(h.get("_source") or {})}
+            for h in rows[:EVENTS_SAMPLE_ROWS]
+        ]
+        payload = {"took": response.get("took"), "hits": {"total": summary["hits"], "hits": sample}}
+        return _cap(payload), summary
+
+    # Writes/gets/collections: keep the small top-level fields
+    payload = {
+        k: redact(v) for k, v in response.items()
+        if k in ("result", "_id", "_index", "_version", "found", "collections") or not isinstance(v, (dict, list))
+    }
+    if "_source" in response:
+        payload["_source"] = redact(response["_source"])
+    return _cap(payload), {}
+
+
+class SpillLog:
+    """Append-only JSONL log of full tool responses, rotated at max_bytes."""
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, default=str, ensure_ascii=False) + "\n"
+        with self._lock:
+            try:
+                if os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+            except OSError:
+                pass
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+class EventBus:
+    def __init__(self, backend, spill: Optional[SpillLog] = None):
+        self.backend = backend
+        self.spill = spill
+
+    def publish(self, user_id: str, **e) -> Dict[str, Any]:
+        user_id = user_id or "anon"
+        full = e.get("response")
+        if full is not None:
+            e["response"], e["summary"] = summarize_response(full)
+            e["spilled"] = self.spill is not None
+        if "request" in e:
+            e["request"] = redact(e["request"])
+        evt = self.backend.append(user_id, {"ts": time.time(), **e})
+        if self.spill is not None and full is not None:
+            try:
+                self.spill.write({"id": evt["id"], "user_id": user_id, "ts": evt["ts"], "tool": e.get("tool"), "response": getattr(full, "body", full)})
+            except OSError:
+                # Spilling is best effort; the compact event is already stored
+                pass
+        return evt
+
+    def since(self, user_id: str, since_id: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        # Oldest first
+        return self.backend.since(user_id or "anon", since_id, limit)
+
+
+def get_event_backend():
+    kind = os.getenv("EVENTS_BACKEND", "memory").strip().lower()
+    maxlen = int(os.getenv("EVENTS_MAXLEN", "200"))
+    if kind == "sqlite":
+        return SQLiteEventBackend(os.getenv("EVENTS_SQLITE_PATH", "/tmp/crmb_events.sqlite3"), maxlen=maxlen)
+    if kind == "redis":
+        return RedisEventBackend(os.getenv("EVENTS_REDIS_URL", "redis://localhost:6379/0"), maxlen=maxlen)
+    return MemoryEventBackend(maxlen=maxlen)
+
+
+def get_spill_log() -> Optional[SpillLog]:
+    path = os.getenv("EVENTS_SPILL_PATH")
+    if not path:
+        return None
+    return SpillLog(path, max_bytes=int(os.getenv("EVENTS_SPILL_MAX_BYTES", str(50 * 1024 * 1024))))
+
+
+event_bus = EventBus(get_event_backend(), spill=get_spill_log())
@@ -1,8 +1,9 @@
 import os
 from fastapi import FastAPI, Request, Depends, UploadFile, File, BackgroundTasks, Form
-from fastapi.responses import HTMLResponse, JSONResponse, Response
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, PlainTextResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
 from .search import (
     es_client,
     ensure_index,
@@ -17,20 +18,27 @@ from .search import (
     ensure_user_collection_index,
     stream_csv_rows,
     bulk_index,
+    contact_doc_id,
+    is_contact_collection,
 )
 from .auth import (
     ensure_users_index,
     require_user,
+    require_user_stream,
+    issue_stream_token,
     issue_jwt,
     upsert_user_from_google,
     find_user_by_email,
     create_user_email,
     verify_password,
 )
+from .realtime import realtime_tokens
+from .events import event_bus
+from .metrics import tool_metrics
+from .tools import get_collection_fields, invalidate_collection_fields, compile_tool_manifest
 import json
-import time
-from collections import deque
-import requests
+import asyncio
+import httpx
 from google.oauth2 import id_token as google_id_token
 from google.auth.transport import requests as google_requests
 
@@ -66,25 +74,12 @@ if "humants" not in templates.env.filters:
             return ""
     templates.env.filters["humants"] = _humants
 
-# --- Simple in-memory event buffer for UI panel ---
-events = deque(maxlen=200)
-_eid = 0
+# --- Event stream for UI panel (per-user, shared across workers; see events.py) ---
+EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", "0.25"))
 
 
-def _next_event_id():
-    global _eid
-    _eid += 1
-    return _eid
-
-
-def record_event(**e):
-    evt = {
-        "id": _next_event_id(),
-        "ts": time.time(),
-        **e,
-    }
-    events.append(evt)
-    return evt
+def record_event(user_id: str, **e):
+    return event_bus.publish(user_id, **e)
 
 
 @app.on_event("startup")
@@ -101,6 +96,20 @@ def on_startup():
         pass
 
 
+@app.on_event("startup")
+async def warm_realtime_tokens():
+    # Pre-mint a few client secrets so the first voice session skips the round trip
+    if os.getenv("OPENAI_API_KEY"):
+        # Users without collections yet all share the base manifest
+        version, tools = compile_tool_manifest({})
+        await realtime_tokens.warm(version, lambda: _build_session_config(tools))
+
+
+@app.on_event("shutdown")
+async def close_realtime_tokens():
+    await realtime_tokens.aclose()
+
+
 @app.get("/", response_class=HTMLResponse)
 def index(request: Request):
     # Workspace is the main app; client-side script ensures auth and redirects if missing
@@ -193,6 +202,7 @@ async def ui_tables_create_doc(request: Request, collection: str, user=Depends(r
         return JSONResponse({"error": "Invalid JSON"}, status_code=400)
     index = _user_index(user, collection)
     es_client.index(index=index, document=doc, refresh="wait_for")
+    invalidate_collection_fields(user.get("sub") or user.get("email") or "anon")
     # Return refreshed table
     return ui_tables_collection_docs(request, collection, user)
 
@@ -220,6 +230,7 @@ async def ui_tables_update_doc(request: Request, collection: str, doc_id: str, u
     index = _user_index(user, collection)
     # Merge/replace fields via update
     es_client.update(index=index, id=doc_id, body={"doc": doc}, refresh="wait_for")
+    invalidate_collection_fields(user.get("sub") or user.get("email") or "anon")
     return ui_tables_collection_docs(request, collection, user)
 
 
@@ -235,20 +246,51 @@ def ui_tables_delete_doc(request: Request, collection: str, doc_id: str, user=De
 
 
 @app.get("/ui/events", response_class=HTMLResponse)
-def ui_events(request: Request):
-    # Newest first for display
-    data = list(reversed(events))
+def ui_events(request: Request, since: int = 0, user=Depends(require_user)):
+    sub = user.get("sub") or user.get("email") or "anon"
+    data = event_bus.since(sub, since)
+    last_id = data[-1]["id"] if data else since
+    # Newest first for display; with since=<id> only the new cards are rendered
+    tpl = "partials/events_delta.html" if since else "partials/events_cards.html"
     return templates.TemplateResponse(
-        "partials/events_cards.html",
-        {"request": request, "events": data},
+        tpl,
+        {"request": request, "events": list(reversed(data)), "last_id": last_id},
     )
 
 
-@app.get("/token")
-def mint_ephemeral_token(user=Depends(require_user)):
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        return JSONResponse({"error": "OPENAI_API_KEY not configured"}, status_code=500)
+@app.post("/ui/events/stream-token")
+def ui_events_stream_token(user=Depends(require_user)):
+    # Short-lived token for the EventSource URL (see auth.STREAM_TOKEN_SCOPE)
+    return {"token": issue_stream_token(user)}
+
+
+@app.get("/ui/events/stream")
+async def ui_events_stream(request: Request, since: int = 0, user=Depends(require_user_stream)):
+    # Server-Sent Events: pushes rendered cards for events newer than the client's last id
+    sub = user.get("sub") or user.get("email") or "anon"
+    tpl = templates.get_template("partials/events_delta.html")
+
+    async def stream():
+        last_id = since
+        yield "retry: 2000\n\n"
+        while not await request.is_disconnected():
+            data = await run_in_threadpool(event_bus.since, sub, last_id)
+            if data:
+                last_id = data[-1]["id"]
+                html = tpl.render(events=list(reversed(data)), last_id=last_id)
+                lines = "\n".join(f"data: {line}" for line in html.splitlines())
+                yield f"id: {last_id}\nevent: cards\n{lines}\n\n"
+            await asyncio.sleep(EVENTS_POLL_INTERVAL)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# --- Realtime voice session ---
+def _build_session_config(tools: list) -> dict:
     # Load instructions from file, if present
     instr_path = os.getenv("INSTRUCTION_FILE", os.path.join(os.path.dirname(__file__), "instruction.md"))
     instructions = None
@@ -257,119 +299,7 @@ def mint_ephemeral_token(user=Depends(require_user)):
             instructions = f.read()
     except Exception:
         instructions = None
-
-    # Define basic function tools available to the session from the start
-    tools = [
-        {
-            "type": "function",
-            "name": "list_collections",
-            "description": "List collection names for the current user",
-            "parameters": {"type": "object", "properties": {}, "additionalProperties": False},
-        },
-        {
-            "type": "function",
-            "name": "list_docs",
-            "description": "List documents in a collection",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "collection": {"type": "string"},
-                    "query": {"type": "object"},
-                    "size": {"type": "integer"},
-                    "from": {"type": "integer"},
-                },
-                "required": ["collection"],
-                "additionalProperties": True,
-            },
-        },
-        {
-            "type": "function",
-            "name": "search_docs",
-            "description": "Search documents with conditions across one or more collections",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "collections": {"type": "array", "items": {"type": "string"}},
-                    "collection": {"type": "string"},
-                    "q": {"type": "string", "description": "Free-text query"},
-                    "where": {
-                        "type": "object",
-                        "properties": {
-                            "all": {"type": "array", "items": {"type": "object"}},
-                            "any": {"type": "array", "items": {"type": "object"}},
-                            "none": {"type": "array", "items": {"type": "object"}},
-                            "filters": {"type": "array", "items": {"type": "object"}}
-                        },
-                        "additionalProperties": True
-                    },
-                    "size": {"type": "integer", "default": 50},
-                    "from": {"type": "integer", "default": 0},
-                    "sort": {"type": "array", "items": {"type": "object"}},
-                    "fields": {"type": "array", "items": {"type": "string"}},
-                    "aggs": {"type": "object"},
-                    "highlight": {"type": "object"}
-                },
-                "additionalProperties": True
-            }
-        },
-        {
-            "type": "function",
-            "name": "create_doc",
-            "description": "Create a document in a collection",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "collection": {"type": "string"},
-                    "doc": {"type": "object"},
-                },
-                "required": ["collection", "doc"],
-                "additionalProperties": True,
-            },
-        },
-        {
-            "type": "function",
-            "name": "get_doc",
-            "description": "Get a document by id",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "collection": {"type": "string"},
-                    "id": {"type": "string"},
-                },
-                "required": ["collection", "id"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "update_doc",
-            "description": "Update a document by id (merge fields)",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "collection": {"type": "string"},
-                    "id": {"type": "string"},
-                    "doc": {"type": "object"},
-                },
-                "required": ["collection", "id", "doc"],
-                "additionalProperties": True,
-            },
-        },
-        {
-            "type": "function",
-            "name": "delete_doc",
-            "description": "Delete a document by id",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "collection": {"type": "string"},
-                    "id": {"type": "string"},
-                },
-                "required": ["collection", "id"],
-            },
-        },
-    ]
-
-    session_config = {
+    return {
         "session": {
             "type": "realtime",
             "model": "gpt-realtime",
@@ -379,18 +309,22 @@ def mint_ephemeral_token(user=Depends(require_user)):
             **({"instructions": instructions} if instructions else {}),
         }
     }
+
+
+@app.get("/token")
+async def mint_ephemeral_token(user=Depends(require_user)):
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return JSONResponse({"error": "OPENAI_API_KEY not configured"}, status_code=500)
+    # Tools are compiled from the user's collection mappings; sessions with the
+    # same manifest version share the cached config and the pre-minted pool
+    sub = user.get("sub") or user.get("email") or "anon"
+    fields = await run_in_threadpool(get_collection_fields, sub)
+    version, tools = compile_tool_manifest(fields)
     try:
-        resp = requests.post(
-            "https://api.openai.com/v1/realtime/client_secrets",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            json=session_config,
-            timeout=10,
-        )
-        return Response(resp.text, status_code=resp.status_code, media_type="application/json")
-    except requests.RequestException as e:
+        status_code, payload = await realtime_tokens.get_token(version, lambda: _build_session_config(tools))
+        return JSONResponse(payload, status_code=status_code)
+    except httpx.HTTPError:
         return JSONResponse({"error": "Failed to generate token"}, status_code=500)
 
 
@@ -465,6 +399,7 @@ def _ingest_job(job_id: str):
         total = 0
         indexed = 0
         errors = 0
+        contacts = is_contact_collection(collection)
         def docs():
             nonlocal total
             for row in stream_csv_rows(tmp_path):
@@ -472,6 +407,8 @@ def _ingest_job(job_id: str):
                 _id = None
                 if id_field and id_field in row and row[id_field]:
                     _id = str(row[id_field])
+                elif contacts:
+                    _id = contact_doc_id(row)
                 yield (_id, row)
         ok, err = bulk_index(index, docs())
         indexed = ok
@@ -479,6 +416,9 @@ def _ingest_job(job_id: str):
         _JOBS[job_id].update({"status": "done", "total_rows": total, "indexed_rows": indexed, "errors": errors})
     except Exception as e:
         _JOBS[job_id].update({"status": "error", "error": str(e)})
+    finally:
+        # Mappings changed; the next session recompiles the tool manifest
+        invalidate_collection_fields(user_id)
 
 
 @app.post("/ui/ingest", response_class=HTMLResponse)
@@ -598,6 +538,7 @@ def _ingest_batch_job(job_id: str):
             num_fields = {k for k, t in (types or {}).items() if t in ("long", "float")}
             num_is_float = {k for k, t in (types or {}).items() if t == "float"}
             num_is_long = {k for k, t in (types or {}).items() if t == "long"}
+            contacts = is_contact_collection(collection)
             def docs():
                 for row in stream_csv_rows(tmp_path):
                     job["total_rows"] = job.get("total_rows", 0) + 1
@@ -625,7 +566,8 @@ def _ingest_batch_job(job_id: str):
                                     row[k] = None
                     except Exception:
                         pass
-                    yield (None, row)
+                    # Contact rows get email/phone-derived ids so re-imports overwrite, not duplicate
+                    yield (contact_doc_id(row) if contacts else None, row)
             ok, err = bulk_index(index, docs())
             # Track per-file result
             f["indexed"] = ok
@@ -654,6 +596,8 @@ def _ingest_batch_job(job_id: str):
                 os.remove(tmp_path)
             except Exception:
                 pass
+    # Mappings changed; the next session recompiles the tool manifest
+    invalidate_collection_fields(user_id)
 
 
 @app.post("/ui/ingest_batch_simple", response_class=HTMLResponse)
@@ -700,6 +644,7 @@ async def ui_ingest_batch_simple(request: Request, files: list[UploadFile] = Fil
             num_fields = {k for k, t in (types or {}).items() if t in ("long", "float")}
             num_is_float = {k for k, t in (types or {}).items() if t == "float"}
             num_is_long = {k for k, t in (types or {}).items() if t == "long"}
+            contacts = is_contact_collection(collection)
 
             def docs():
                 for row in stream_csv_rows(tmp_path):
@@ -727,7 +672,8 @@ async def ui_ingest_batch_simple(request: Request, files: list[UploadFile] = Fil
                                     row[k] = None
                     except Exception:
                         pass
-                    yield (None, row)
+                    # Contact rows get email/phone-derived ids so re-imports overwrite, not duplicate
+                    yield (contact_doc_id(row) if contacts else None, row)
 
             ok, err = bulk_index(index, docs())
             indexed += ok
@@ -747,6 +693,7 @@ async def ui_ingest_batch_simple(request: Request, files: list[UploadFile] = Fil
                 pass
         results.append({"filename": name, "indexed": indexed, "errors": errs})
         errors_total += errs
+    invalidate_collection_fields(user_id)
 
     summary = {
         "files": results,
@@ -757,27 +704,54 @@ async def ui_ingest_batch_simple(request: Request, files: list[UploadFile] = Fil
     return templates.TemplateResponse("partials/ingest_result.html", {"request": request, "result": summary})
 
 
+TOOL_NAMES = {"list_collections", "search_docs", "list_docs", "create_doc", "get_doc", "update_doc", "delete_doc"}
+
+
+def _tool_ok(call, sub, name, args, res):
+    with call.span("record"):
+        record_event(sub, tool=name, phase="ok", request=args, response=res)
+    # Serialise here so the encode cost shows up in the tool's phases
+    with call.span("serialize"):
+        content = json.dumps({"ok": True, "result": res}, default=str)
+    return Response(content, media_type="application/json")
+
+
+@app.get("/metrics")
+def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(tool_metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/metrics/slow")
+def metrics_slow(user=Depends(require_user)):
+    # The caller's most recent slow tool calls with their compiled ES DSL (newest first)
+    sub = user.get("sub") or user.get("email") or "anon"
+    return {"threshold_ms": tool_metrics.slow_ms, "calls": tool_metrics.slow_calls_for(sub)}
+
+
 @app.post("/tool")
 def execute_tool(payload: dict, user=Depends(require_user)):
     name = payload.get("name")
     args = payload.get("arguments") or {}
+    sub = user.get("sub") or user.get("email") or "anon"
+    call = tool_metrics.call(name if name in TOOL_NAMES else "unknown", user=sub)
     try:
         # Log start of tool execution
-        record_event(tool=name, phase="started", request=args)
+        with call.span("record"):
+            record_event(sub, tool=name, phase="started", request=args)
         if name == "list_collections":
-            sub = user.get("sub") or user.get("email") or "anon"
             prefix = f"users-{sub}-"
             collections = []
             try:
-                infos = es_client.indices.get(index=f"{prefix}*")
+                with call.span("list"):
+                    infos = es_client.indices.get(index=f"{prefix}*")
                 for idx in infos.keys():
                     if idx.startswith(prefix):
                         collections.append(idx[len(prefix):])
             except Exception:
                 collections = []
             res = {"collections": sorted(collections)}
-            record_event(tool=name, phase="ok", request=args, response=res)
-            return {"ok": True, "result": res}
+            return _tool_ok(call, sub, name, args, res)
         elif name == "search_docs":
             # Multi-collection, condition-based search translated to ES DSL
             cols = args.get("collections") or ([] if args.get("collection") is None else [args.get("collection")])
@@ -870,16 +844,20 @@ def execute_tool(payload: dict, user=Depends(require_user)):
             if sort:
                 body["sort"] = sort
 
+            call.dsl = {"index": indices, "size": size, "from": frm, **body}
             # Only search indices that exist to avoid raising
-            indices_existing = [idx for idx in indices if es_client.indices.exists(index=idx)]
+            with call.span("exists"):
+                indices_existing = [idx for idx in indices if es_client.indices.exists(index=idx)]
             if not indices_existing:
                 res = {"hits": {"total": 0, "hits": []}}
-                record_event(tool=name, phase="ok", request=args, response=res)
-                return {"ok": True, "result": res}
+                return _tool_ok(call, sub, name, args, res)
 
-            res = es_client.search(index=",".join(indices_existing), body=body, size=size, from_=frm)
+            with call.span("search"):
+                res = es_client.search(index=",".join(indices_existing), body=body, size=size, from_=frm)
+            call.es_took(res)
 
             # Optional relationship expansion
+            call.begin("expand")
             try:
                 expand = args.get("expand") or []
                 if expand and isinstance(res.get("hits", {}).get("hits", []), list):
@@ -951,61 +929,71 @@ def execute_tool(payload: dict, user=Depends(require_user)):
             except Exception:
                 # Relationship expansion is best effort; ignore failures
                 pass
-            record_event(tool=name, phase="ok", request=args, response=res)
-            return {"ok": True, "result": res}
+            call.end("expand")
+            return _tool_ok(call, sub, name, args, res)
         elif name == "list_docs":
             collection = args.get("collection")
             index = _user_index(user, collection)
             size = int(args.get("size") or 50)
             frm = int(args.get("from") or 0)
             query = args.get("query") or {"match_all": {}}
-            if not es_client.indices.exists(index=index):
+            call.dsl = {"index": index, "size": size, "from": frm, "query": query}
+            with call.span("exists"):
+                exists = es_client.indices.exists(index=index)
+            if not exists:
                 res = {"hits": {"total": 0, "hits": []}}
-                record_event(tool=name, phase="ok", request=args, response=res)
-                return {"ok": True, "result": res}
-            res = es_client.search(index=index, body={"query": query}, size=size, from_=frm)
-            record_event(tool=name, phase="ok", request=args, response=res)
-            return {"ok": True, "result": res}
+                return _tool_ok(call, sub, name, args, res)
+            with call.span("search"):
+                res = es_client.search(index=index, body={"query": query}, size=size, from_=frm)
+            call.es_took(res)
+            return _tool_ok(call, sub, name, args, res)
         elif name == "create_doc":
             collection = args.get("collection")
             index = _user_index(user, collection)
             doc = args["doc"]
-            res = es_client.index(index=index, document=doc, refresh="wait_for")
-            record_event(tool=name, phase="ok", request=args, response=res)
-            return {"ok": True, "result": res}
+            with call.span("write"):
+                res = es_client.index(index=index, document=doc, refresh="wait_for")
+            invalidate_collection_fields(sub)
+            return _tool_ok(call, sub, name, args, res)
         elif name == "get_doc":
             collection = args.get("collection")
             index = _user_index(user, collection)
             _id = args["id"]
-            res = es_client.get(index=index, id=_id)
-            record_event(tool=name, phase="ok", request=args, response=res)
-            return {"ok": True, "result": res}
+            with call.span("get"):
+                res = es_client.get(index=index, id=_id)
+            return _tool_ok(call, sub, name, args, res)
         elif name == "update_doc":
             collection = args.get("collection")
             index = _user_index(user, collection)
             _id = args["id"]
             doc = args["doc"]
             # Upsert-like behavior via index overwrite
-            source = es_client.get(index=index, id=_id).get("_source", {})
+            with call.span("get"):
+                source = es_client.get(index=index, id=_id).get("_source", {})
             source.update(doc)
-            res = es_client.index(index=index, id=_id, document=source, refresh="wait_for")
-            record_event(tool=name, phase="ok", request=args, response=res)
-            return {"ok": True, "result": res}
+            with call.span("write"):
+                res = es_client.index(index=index, id=_id, document=source, refresh="wait_for")
+            invalidate_collection_fields(sub)
+            return _tool_ok(call, sub, name, args, res)
         elif name == "delete_doc":
             collection = args.get("collection")
             index = _user_index(user, collection)
             _id = args["id"]
-            res = es_client.delete(index=index, id=_id, ignore=[404], refresh="wait_for")
-            record_event(tool=name, phase="ok", request=args, response=res)
-            return {"ok": True, "result": res}
+            with call.span("write"):
+                res = es_client.delete(index=index, id=_id, ignore=[404], refresh="wait_for")
+            return _tool_ok(call, sub, name, args, res)
         else:
+            call.status = "error"
             return JSONResponse({"ok": False, "error": f"Unknown tool {name}"}, status_code=400)
     except Exception as e:
+        call.status = "error"
         try:
-            record_event(tool=name, phase="error", request=args, error=str(e))
+            record_event(sub, tool=name, phase="error", request=args, error=str(e))
         except Exception:
             pass
         return JSONResponse({"ok": False, "error": str(e)}, status_code=500)
+    finally:
+        call.finish()
 
 
 @app.get("/login", response_class=HTMLResponse)
@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .events import redact
+
+
+# --- Tool-call instrumentation ---
+# Per-tool, per-phase latency histograms exposed in Prometheus text format,
+# plus a slow-call log that carries the compiled ES DSL (redacted like tool
+# events, and tagged with the caller so each user only sees their own calls).
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TOOL_SLOW_MS = float(os.getenv("TOOL_SLOW_MS", "1000"))
+# Bool queries nest deeper than event payloads; keep enough of the DSL to debug it
+SLOW_DSL_DEPTH = 8
+
+slow_log = logging.getLogger("tool.slow")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[values] = self._values.get(values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, v in sorted(self._values.items()):
+                out.append(f"{self.name}{_labels(self.labels, values)} {v:g}")
+        return out
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *values: str) -> None:
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(values)
+            if series is None:
+                series = self._series[values] = [0.0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += seconds
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((k, list(v)) for k, v in self._series.items())
+        for values, series in snapshot:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{bound:g}"'
+                out.append(f"{self.name}_bucket{_labels(self.labels, values, le)} {cumulative:g}")
+            cumulative += series[len(self.buckets)]
+            le = 'le="+Inf"'
+            out.append(f"{self.name}_bucket{_labels(self.labels, values, le)} {cumulative:g}")
+            out.append(f"{self.name}_sum{_labels(self.labels, values)} {series[-1]:.6f}")
+            out.append(f"{self.name}_count{_labels(self.labels, values)} {cumulative:g}")
+        return out
+
+
+class ToolCall:
+    """Timer for one tool invocation. Wrap each phase in `span(phase)` (or
+    `begin`/`end`); `finish()` records the total and writes the slow-call log."""
+
+    def __init__(self, metrics: "ToolMetrics", tool: str, user: Optional[str] = None):
+        self.metrics = metrics
+        self.tool = tool or "unknown"
+        self.user = user
+        self.status = "ok"
+        self.dsl: Optional[Dict[str, Any]] = None
+        self.took_ms: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self._open: Dict[str, float] = {}
+        self._start = time.perf_counter()
+        self._finished = False
+
+    def begin(self, phase: str) -> None:
+        self._open[phase] = time.perf_counter()
+
+    def end(self, phase: str) -> None:
+        t0 = self._open.pop(phase, None)
+        if t0 is None:
+            return
+        elapsed = time.perf_counter() - t0
+        self.phases[phase] = self.phases.get(phase, 0.0) + elapsed
+        self.metrics.phase_seconds.observe(elapsed, self.tool, phase)
+
+    @contextmanager
+    def span(self, phase: str) -> Iterator[None]:
+        self.begin(phase)
+        try:
+            yield
+        finally:
+            self.end(phase)
+
+    def es_took(self, res: Any, phase: str = "search") -> None:
+        # Compare ES-reported `took` with the wall time we spent in the phase
+        took = res.get("took") if hasattr(res, "get") else None
+        if took is None:
+            return
+        self.took_ms = float(took)
+        took_s = self.took_ms / 1000.0
+        self.metrics.es_took_seconds.observe(took_s, self.tool)
+        wall = self.phases.get(phase)
+        if wall is not None:
+            self.metrics.es_overhead_seconds.observe(max(wall - took_s, 0.0), self.tool)
+
+    def finish(self) -> float:
+        if self._finished:
+            return 0.0
+        self._finished = True
+        total = time.perf_counter() - self._start
+        self.metrics.phase_seconds.observe(total, self.tool, "total")
+        self.metrics.calls.inc(self.tool, self.status)
+        if total * 1000.0 >= self.metrics.slow_ms:
+            self.metrics.log_slow(self, total)
+        return total
+
+
+class ToolMetrics:
+    def __init__(self, slow_ms: float = TOOL_SLOW_MS, keep_slow: int = 50):
+        self.slow_ms = slow_ms
+        self.calls = Counter("tool_calls_total", "Tool calls by tool and status", ("tool", "status"))
+        self.phase_seconds = Histogram("tool_phase_seconds", "Tool call latency by phase (phase=total for the whole call)", ("tool", "phase"))
+        self.es_took_seconds = Histogram("tool_es_took_seconds", "Elasticsearch-reported took for the main query", ("tool",))
+        self.es_overhead_seconds = Histogram("tool_es_overhead_seconds", "Wall time minus ES took for the main query (network, client, queueing)", ("tool",))
+        self.slow_calls: Deque[Dict[str, Any]] = deque(maxlen=keep_slow)
+
+    def call(self, tool: str, user: Optional[str] = None) -> ToolCall:
+        return ToolCall(self, tool, user)
+
+    def log_slow(self, call: ToolCall, total: float) -> None:
+        entry = {
+            "ts": time.time(),
+            "user": call.user,
+            "tool": call.tool,
+            "status": call.status,
+            "total_ms": round(total * 1000.0, 1),
+            "phases_ms": {k: round(v * 1000.0, 1) for k, v in call.phases.items()},
+            "es_took_ms": call.took_ms,
+            "dsl": redact(call.dsl, max_depth=SLOW_DSL_DEPTH),
+        }
+        self.slow_calls.append(entry)
+        slow_log.warning("slow tool call %s", json.dumps(entry, default=str))
+
+    def slow_calls_for(self, user: str) -> List[Dict[str, Any]]:
+        # Newest first
+        return [entry for entry in reversed(self.slow_calls) if entry["user"] == user]
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in (self.calls, self.phase_seconds, self.es_took_seconds, self.es_overhead_seconds):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+tool_metrics = ToolMetrics()
@@ -0,0 +1,166 @@
+import os
+import time
+import asyncio
+from collections import deque, OrderedDict
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+import httpx
+
+
+def get_realtime_url() -> str:
+    # Overridable so a local stub server can stand in for OpenAI
+    return os.getenv("OPENAI_REALTIME_URL", "https://api.openai.com/v1/realtime/client_secrets")
+
+
+class RealtimeTokenService:
+    """Mints OpenAI realtime client secrets and keeps a small pre-minted pool per key.
+
+    A key identifies one session config (here the tool manifest version). Configs
+    are built once per key and cached; a voice session start pops a ready secret
+    from the pool while a background task tops it back up. Keys are LRU-bounded,
+    a tenant's newer key evicts its older ones, and pools are only kept warm for
+    keys that were warmed or asked for more than once.
+
+    The platform backend has its own copy (platform/backend/app/services/
+    realtime_token_service.py): the two apps ship as separate images and share
+    no package. Keep the behaviour and the REALTIME_TOKEN_* variables in sync.
+    """
+
+    def __init__(
+        self,
+        pool_size: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+        max_keys: Optional[int] = None,
+        min_remaining: float = 60.0,
+    ):
+        self.pool_size = pool_size if pool_size is not None else int(os.getenv("REALTIME_TOKEN_POOL_SIZE", "2"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(os.getenv("REALTIME_TOKEN_TTL_SECONDS", "600"))
+        self.max_keys = max_keys if max_keys is not None else int(os.getenv("REALTIME_TOKEN_MAX_KEYS", "256"))
+        self.min_remaining = min_remaining
+        self._client: Optional[httpx.AsyncClient] = None
+        self._configs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tenants: Dict[str, str] = {}
+        self._pools: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._refills: Dict[str, asyncio.Task] = {}
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=10)
+        return self._client
+
+    def session_config(self, key: str, build: Callable[[], Dict[str, Any]], tenant: Optional[str] = None) -> Dict[str, Any]:
+        config = self._configs.get(key)
+        if config is not None:
+            self._configs.move_to_end(key)
+            return config
+        config = build()
+        self._configs[key] = config
+        if tenant is not None:
+            # A tenant's new config version replaces the old one
+            previous = self._tenants.get(tenant)
+            if previous is not None and previous != key:
+                self.invalidate(previous)
+            self._tenants[tenant] = key
+        while len(self._configs) > self.max_keys:
+            self.invalidate(next(iter(self._configs)))
+        return config
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        # Drop cached config and any secrets minted from it
+        if key is None:
+            for task in self._refills.values():
+                task.cancel()
+            self._configs.clear()
+            self._pools.clear()
+            self._refills.clear()
+            self._tenants.clear()
+            return
+        self._configs.pop(key, None)
+        self._pools.pop(key, None)
+        task = self._refills.pop(key, None)
+        if task is not None:
+            task.cancel()
+        for tenant in [t for t, current in self._tenants.items() if current == key]:
+            del self._tenants[tenant]
+
+    async def mint(self, config: Dict[str, Any]) -> Tuple[int, Any]:
+        api_key = os.getenv("OPENAI_API_KEY")
+        body = {
+            "expires_after": {"anchor": "created_at", "seconds": self.ttl_seconds},
+            **config,
+        }
+        resp = await self._http().post(
+            get_realtime_url(),
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+            json=body,
+        )
+        try:
+            payload = resp.json()
+        except ValueError:
+            payload = {"error": resp.text}
+        return resp.status_code, payload
+
+    def _take(self, key: str) -> Optional[Dict[str, Any]]:
+        pool = self._pools.get(key)
+        now = time.time()
+        while pool:
+            secret = pool.popleft()
+            if float(secret.get("expires_at") or 0) - now > self.min_remaining:
+                return secret
+        return None
+
+    async def get_token(self, key: str, build: Callable[[], Dict[str, Any]], tenant: Optional[str] = None) -> Tuple[int, Any]:
+        seen = key in self._configs
+        config = self.session_config(key, build, tenant)
+        secret = self._take(key)
+        if seen:
+            # A one-off key mints directly and never pays for a pool
+            self._schedule_refill(key)
+        if secret is not None:
+            return 200, secret
+        # Cold pool: fall back to a direct round trip
+        return await self.mint(config)
+
+    def _schedule_refill(self, key: str) -> None:
+        if self.pool_size <= 0:
+            return
+        task = self._refills.get(key)
+        if task is not None and not task.done():
+            return
+        self._refills[key] = asyncio.get_running_loop().create_task(self._refill(key))
+
+    async def _refill(self, key: str) -> None:
+        config = self._configs.get(key)
+        if config is None:
+            return
+        pool = self._pools.setdefault(key, deque())
+        while len(pool) < self.pool_size:
+            try:
+                status, payload = await self.mint(config)
+            except httpx.HTTPError:
+                return
+            if status >= 300 or not isinstance(payload, dict):
+                return
+            if self._configs.get(key) is not config:
+                # Config was invalidated while minting; the secret is stale
+                return
+            payload.setdefault("expires_at", time.time() + self.ttl_seconds)
+            pool.append(payload)
+
+    async def warm(self, key: str, build: Callable[[], Dict[str, Any]]) -> None:
+        self.session_config(key, build)
+        self._schedule_refill(key)
+
+    async def aclose(self) -> None:
+        for task in self._refills.values():
+            task.cancel()
+        self._refills.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+realtime_tokens = RealtimeTokenService()
@@ -1,4 +1,6 @@
 import os
+import re
+import hashlib
 from typing import List, Dict, Any, Optional, Iterable, Tuple
 import time
 from elasticsearch.exceptions import ConnectionError as ESConnectionError
@@ -233,6 +235,33 @@ def stream_csv_rows(path: str, encoding: Optional[str] = None) -> Iterable[Dict[
             yield {k: (v if (v is not None and v != "") else None) for k, v in row.items()}
 
 
+_EMAIL_FIELDS = ("email", "email_address", "e_mail")
+# Collection name words that mean one row per person
+_CONTACT_COLLECTION_WORDS = ("contacts", "people", "persons")
+_PHONE_FIELDS = ("phone", "phone_number", "telephone", "mobile", "cell")
+
+
+def is_contact_collection(collection: str) -> bool:
+    # Only contact collections are keyed by email/phone; other rows (donations,
+    # tickets, ...) legitimately share a person's email and keep per-row ids
+    return any(word in _CONTACT_COLLECTION_WORDS for word in re.split(r"[^a-z0-9]+", (collection or "").lower()))
+
+
+def contact_doc_id(row: Dict[str, Any]) -> Optional[str]:
+    # Deterministic id for contact-like rows (normalized email, else last 10 phone digits)
+    # so the same person imported twice, or listed twice in a file, is one document
+    fields = {re.sub(r"[^a-z0-9]+", "_", (k or "").strip().lower()).strip("_"): v for k, v in row.items()}
+    for name in _EMAIL_FIELDS:
+        email = str(fields.get(name) or "").strip().lower()
+        if "@" in email:
+            return "contact-" + hashlib.sha1(("email:" + email).encode("utf-8")).hexdigest()
+    for name in _PHONE_FIELDS:
+        digits = re.sub(r"\D", "", str(fields.get(name) or ""))
+        if len(digits) >= 7:
+            return "contact-" + hashlib.sha1(("phone:" + digits[-10:]).encode("utf-8")).hexdigest()
+    return None
+
+
 def bulk_index(index: str, docs: Iterable[Tuple[Optional[str], Dict[str, Any]]], chunk_size: int = 500) -> Tuple[int, int]:
     # docs: iterable of (id, doc)
     ok = 0
@@ -0,0 +1,273 @@
+import os
+import time
+import copy
+import json
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .search import es_client
+
+
+# Basic function tools available to the session from the start
+BASE_TOOLS = [
+    {
+        "type": "function",
+        "name": "list_collections",
+        "description": "List collection names for the current user",
+        "parameters": {"type": "object", "properties": {}, "additionalProperties": False},
+    },
+    {
+        "type": "function",
+        "name": "list_docs",
+        "description": "List documents in a collection",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "collection": {"type": "string"},
+                "query": {"type": "object"},
+                "size": {"type": "integer"},
+                "from": {"type": "integer"},
+            },
+            "required": ["collection"],
+            "additionalProperties": True,
+        },
+    },
+    {
+        "type": "function",
+        "name": "search_docs",
+        "description": "Search documents with conditions across one or more collections",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "collections": {"type": "array", "items": {"type": "string"}},
+                "collection": {"type": "string"},
+                "q": {"type": "string", "description": "Free-text query"},
+                "where": {
+                    "type": "object",
+                    "properties": {
+                        "all": {"type": "array", "items": {"type": "object"}},
+                        "any": {"type": "array", "items": {"type": "object"}},
+                        "none": {"type": "array", "items": {"type": "object"}},
+                        "filters": {"type": "array", "items": {"type": "object"}}
+                    },
+                    "additionalProperties": True
+                },
+                "size": {"type": "integer", "default": 50},
+                "from": {"type": "integer", "default": 0},
+                "sort": {"type": "array", "items": {"type": "object"}},
+                "fields": {"type": "array", "items": {"type": "string"}},
+                "aggs": {"type": "object"},
+                "highlight": {"type": "object"}
+            },
+            "additionalProperties": True
+        }
+    },
+    {
+        "type": "function",
+        "name": "create_doc",
+        "description": "Create a document in a collection",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "collection": {"type": "string"},
+                "doc": {"type": "object"},
+            },
+            "required": ["collection", "doc"],
+            "additionalProperties": True,
+        },
+    },
+    {
+        "type": "function",
+        "name": "get_doc",
+        "description": "Get a document by id",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "collection": {"type": "string"},
+                "id": {"type": "string"},
+            },
+            "required": ["collection", "id"],
+        },
+    },
+    {
+        "type": "function",
+        "name": "update_doc",
+        "description": "Update a document by id (merge fields)",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "collection": {"type": "string"},
+                "id": {"type": "string"},
+                "doc": {"type": "object"},
+            },
+            "required": ["collection", "id", "doc"],
+            "additionalProperties": True,
+        },
+    },
+    {
+        "type": "function",
+        "name": "delete_doc",
+        "description": "Delete a document by id",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "collection": {"type": "string"},
+                "id": {"type": "string"},
+            },
+            "required": ["collection", "id"],
+        },
+    },
+]
+
+
+# Condition operators understood by the /tool search_docs translator
+WHERE_OPS = [
+    "eq", "term", "in", "terms", "match", "phrase", "match_phrase", "contains",
+    "wildcard", "prefix", "gt", "gte", "lt", "lte", "range", "exists", "missing",
+]
+
+# Compiled manifests keyed by version (hash of the collection field mappings), LRU-bounded
+MANIFEST_CACHE_SIZE = int(os.getenv("TOOL_MANIFEST_CACHE_SIZE", "256"))
+_MANIFESTS: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+
+# Collection fields per user, read from ES once and dropped when the user's
+# mappings can change (ingest, document writes); LRU-bounded. The TTL covers
+# writes handled by another worker process
+FIELDS_CACHE_SIZE = int(os.getenv("TOOL_FIELDS_CACHE_SIZE", "1024"))
+FIELDS_TTL_SECONDS = int(os.getenv("TOOL_FIELDS_TTL_SECONDS", "300"))
+_FIELDS: "OrderedDict[str, Tuple[float, Dict[str, Dict[str, str]]]]" = OrderedDict()
+
+
+def _flatten_properties(props: Dict[str, Any], prefix: str = "") -> Dict[str, str]:
+    fields: Dict[str, str] = {}
+    for name, spec in (props or {}).items():
+        if name.startswith("_"):
+            continue
+        path = f"{prefix}{name}"
+        if "properties" in spec:
+            fields.update(_flatten_properties(spec["properties"], f"{path}."))
+        else:
+            fields[path] = spec.get("type", "object")
+    return fields
+
+
+def get_collection_fields(user_id: str) -> Dict[str, Dict[str, str]]:
+    # collection -> {field: ES type}, cached per user (see invalidate_collection_fields)
+    cached = _FIELDS.get(user_id)
+    if cached is not None and time.monotonic() - cached[0] < FIELDS_TTL_SECONDS:
+        _FIELDS.move_to_end(user_id)
+        return cached[1]
+    fields = _read_collection_fields(user_id)
+    if fields is None:
+        # ES unavailable: don't cache the empty answer
+        return {}
+    _FIELDS[user_id] = (time.monotonic(), fields)
+    _FIELDS.move_to_end(user_id)
+    while len(_FIELDS) > FIELDS_CACHE_SIZE:
+        _FIELDS.popitem(last=False)
+    return fields
+
+
+def invalidate_collection_fields(user_id: str) -> None:
+    _FIELDS.pop(user_id, None)
+
+
+def _read_collection_fields(user_id: str) -> Optional[Dict[str, Dict[str, str]]]:
+    # From the inferred mappings of the user's indices (one get_mapping round trip)
+    prefix = f"users-{user_id}-"
+    try:
+        mappings = es_client.indices.get_mapping(index=f"{prefix}*")
+    except Exception:
+        return None
+    out: Dict[str, Dict[str, str]] = {}
+    for idx, body in mappings.items():
+        if not idx.startswith(prefix):
+            continue
+        props = ((body or {}).get("mappings") or {}).get("properties") or {}
+        out[idx[len(prefix):]] = _flatten_properties(props)
+    return out
+
+
+def manifest_version(fields: Dict[str, Dict[str, str]]) -> str:
+    canonical = json.dumps(fields or {}, sort_keys=True)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def _describe(fields: Dict[str, Dict[str, str]]) -> str:
+    parts = []
+    for collection, cols in sorted(fields.items()):
+        cols_desc = ", ".join(f"{k} ({t})" for k, t in sorted(cols.items()))
+        parts.append(f"{collection}: {cols_desc or 'no fields yet'}")
+    return "Known collections and fields - " + "; ".join(parts)
+
+
+def _compile(fields: Dict[str, Dict[str, str]]) -> List[Dict[str, Any]]:
+    tools = copy.deepcopy(BASE_TOOLS)
+    if not fields:
+        return tools
+    collections = sorted(fields.keys())
+    all_fields = sorted({f for cols in fields.values() for f in cols})
+    # text fields sort on their .raw keyword subfield
+    sortable = sorted({
+        (f"{f}.raw" if t == "text" else f)
+        for cols in fields.values() for f, t in cols.items()
+        if t in ("text", "keyword", "long", "float", "integer", "double", "date", "boolean")
+    })
+    collection_enum = {"type": "string", "enum": collections}
+    condition = {
+        "type": "object",
+        "properties": {
+            "field": {"type": "string", "enum": all_fields},
+            "op": {"type": "string", "enum": WHERE_OPS, "default": "eq"},
+            "value": {},
+            "values": {"type": "array"},
+            "gt": {}, "gte": {}, "lt": {}, "lte": {},
+        },
+        "required": ["field"],
+    }
+    description = _describe(fields)
+
+    for tool in tools:
+        props = tool["parameters"].get("properties", {})
+        name = tool["name"]
+        if name == "search_docs":
+            props["collections"] = {"type": "array", "items": collection_enum}
+            props["collection"] = collection_enum
+            for key in ("all", "any", "none", "filters"):
+                props["where"]["properties"][key] = {"type": "array", "items": condition}
+            props["fields"] = {"type": "array", "items": {"type": "string", "enum": all_fields}}
+            props["sort"] = {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "field": {"type": "string", "enum": sortable},
+                        "order": {"type": "string", "enum": ["asc", "desc"]},
+                    },
+                    "required": ["field"],
+                },
+            }
+            tool["description"] = f"{tool['description']}. {description}"
+        elif name in ("list_docs", "get_doc", "update_doc", "delete_doc"):
+            props["collection"] = collection_enum
+            if name in ("list_docs", "update_doc"):
+                tool["description"] = f"{tool['description']}. {description}"
+        elif name == "create_doc":
+            # New collections are allowed, so only describe the existing ones
+            tool["description"] = f"{tool['description']}. {description}"
+    return tools
+
+
+def compile_tool_manifest(fields: Dict[str, Dict[str, str]]) -> Tuple[str, List[Dict[str, Any]]]:
+    # Compiled once per mapping version and reused across sessions
+    version = manifest_version(fields)
+    tools = _MANIFESTS.get(version)
+    if tools is None:
+        tools = _compile(fields)
+        _MANIFESTS[version] = tools
+        while len(_MANIFESTS) > MANIFEST_CACHE_SIZE:
+            _MANIFESTS.popitem(last=False)
+    else:
+        _MANIFESTS.move_to_end(version)
+    return version, tools
@@ -9,7 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr
 
 from ...core.database import get_database
-from ...core.auth import AuthService, create_openai_realtime_token
+from ...core.auth import AuthService, get_current_user, create_openai_realtime_token
 
 
 router = APIRouter()
@@ -103,7 +103,7 @@ async def client_login(
 
 @router.get("/me")
 async def get_current_user_info(
-    current_user: Dict[str, Any] = Depends(create_openai_realtime_token)
+    current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """Get current user information"""
     return current_user
@@ -111,10 +111,11 @@ async def get_current_user_info(
 
 @router.post("/realtime-token")
 async def get_realtime_token(
-    current_user: Dict[str, Any] = Depends(create_openai_realtime_token)
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    db: AsyncSession = Depends(get_database)
 ) -> Dict[str, Any]:
     """Get OpenAI Realtime API token for voice interface"""
-    return await create_openai_realtime_token(current_user)
+    return await create_openai_realtime_token(current_user, db)
 
 
 @router.post("/logout")
@@ -9,13 +9,25 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text
 from pydantic import BaseModel
 
-from ...core.database import get_database, get_client_schema
+from ...core.database import get_database, get_client_schema, use_client_schema
 from ...core.auth import get_current_client_user
+from ...services.dashboard_stats import read_dashboard_stats, refresh_dashboard_stats
+from ...services.contact_search import (
+    contact_columns, search_conditions, select_list, encode_cursor, decode_cursor, estimate_row_count
+)
 
 
 router = APIRouter()
 
 
+async def get_client_database(
+    current_user: Dict[str, Any] = Depends(get_current_client_user),
+    db: AsyncSession = Depends(get_database)
+) -> AsyncSession:
+    """Database session scoped (search_path) to the current client's schema"""
+    return await use_client_schema(db, get_client_schema(current_user["client_id"]))
+
+
 class ContactSearchRequest(BaseModel):
     query: str
     limit: int = 10
@@ -32,113 +44,121 @@ class ContactCreateRequest(BaseModel):
 
 @router.get("/dashboard/stats")
 async def get_dashboard_stats(
+    refresh: bool = Query(False, description="Reconcile counters with an exact recount first"),
     current_user: Dict[str, Any] = Depends(get_current_client_user),
-    db: AsyncSession = Depends(get_database)
+    db: AsyncSession = Depends(get_client_database)
 ) -> Dict[str, Any]:
-    """Get dashboard statistics for client CRM"""
+    """Get dashboard statistics for client CRM (trigger-maintained counters)"""
 
     client_id = current_user["client_id"]
     schema_name = get_client_schema(client_id)
 
     try:
-        # Get contact count
-        contact_count_query = text(f"SELECT COUNT(*) FROM {schema_name}.contacts")
-        contact_result = await db.execute(contact_count_query)
-        total_contacts = contact_result.scalar()
-
-        # Get recent activity count (last 30 days)
-        recent_activity_query = text(f"""
-            SELECT COUNT(*) FROM {schema_name}.contacts
-            WHERE created_at >= NOW() - INTERVAL '30 days'
-        """)
-        recent_result = await db.execute(recent_activity_query)
-        recent_contacts = recent_result.scalar()
-
-        # Try to get donation stats if donations table exists
-        donation_stats = {}
-        try:
-            donation_count_query = text(f"SELECT COUNT(*), SUM(amount) FROM {schema_name}.donations")
-            donation_result = await db.execute(donation_count_query)
-            donation_row = donation_result.first()
-            if donation_row:
-                donation_stats = {
-                    "total_donations": donation_row[0] or 0,
-                    "total_amount": float(donation_row[1]) if donation_row[1] else 0
-                }
-        except Exception:
-            # Donations table might not exist for all clients
-            donation_stats = {"total_donations": 0, "total_amount": 0}
-
-        return {
-            "contacts": {
-                "total": total_contacts or 0,
-                "recent": recent_contacts or 0
-            },
-            "donations": donation_stats,
-            "client_id": client_id
-        }
-
+        if refresh:
+            await refresh_dashboard_stats(db, schema_name)
+        stats = await read_dashboard_stats(db, schema_name)
     except Exception as e:
-        # If schema doesn't exist yet, return empty stats
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error accessing client database: {str(e)}"
+        )
+
+    if stats is None:
         return {
             "contacts": {"total": 0, "recent": 0},
-            "donations": {"total_donations": 0, "total_amount": 0},
+            "donations": None,
             "client_id": client_id,
             "note": "CRM schema not yet initialized"
         }
 
+    # donations is None when the tenant has no donations module
+    return {**stats, "client_id": client_id}
+
 
 @router.get("/contacts")
 async def list_contacts(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     search: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    exact_count: bool = Query(False, description="Count rows exactly instead of estimating"),
     current_user: Dict[str, Any] = Depends(get_current_client_user),
-    db: AsyncSession = Depends(get_database)
+    db: AsyncSession = Depends(get_client_database)
 ) -> Dict[str, Any]:
-    """List contacts for client CRM"""
+    """
+    List contacts for client CRM
+
+    Without a search, pages are keyset-paginated on (created_at, id): pass
+    next_cursor back as cursor and every page costs the same index probe.
+    total is the planner estimate unless exact_count is set.
+    """
 
     client_id = current_user["client_id"]
     schema_name = get_client_schema(client_id)
 
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
     try:
+        columns = await contact_columns(db, schema_name)
+        next_cursor = None
+        total_is_estimate = False
+
         # Build query with optional search
         if search:
+            conditions = search_conditions(search, columns)
+            # Indexed match (tsvector/trigram), ranked; the window count avoids a second scan
             contacts_query = text(f"""
-                SELECT id, first_name, last_name, email, phone, organization, created_at
-                FROM {schema_name}.contacts
-                WHERE
-                    LOWER(first_name) LIKE LOWER(:search) OR
-                    LOWER(last_name) LIKE LOWER(:search) OR
-                    LOWER(email) LIKE LOWER(:search) OR
-                    LOWER(organization) LIKE LOWER(:search)
-                ORDER BY created_at DESC
+                SELECT id, {select_list(columns)}, created_at,
+                       COUNT(*) OVER () AS total
+                FROM contacts
+                WHERE {conditions['where']}
+                ORDER BY {conditions['rank']} DESC, created_at DESC
                 LIMIT :limit OFFSET :skip
             """)
             count_query = text(f"""
-                SELECT COUNT(*) FROM {schema_name}.contacts
-                WHERE
-                    LOWER(first_name) LIKE LOWER(:search) OR
-                    LOWER(last_name) LIKE LOWER(:search) OR
-                    LOWER(email) LIKE LOWER(:search) OR
-                    LOWER(organization) LIKE LOWER(:search)
+                SELECT COUNT(*) FROM contacts
+                WHERE {conditions['where']}
             """)
-            search_param = f"%{search}%"
-            contacts_result = await db.execute(contacts_query, {"search": search_param, "limit": limit, "skip": skip})
-            count_result = await db.execute(count_query, {"search": search_param})
+            contacts_result = await db.execute(contacts_query, {**conditions["params"], "limit": limit, "skip": skip})
+            contacts = contacts_result.fetchall()
+            if contacts:
+                total_count = contacts[0][7]
+            else:
+                # Page past the end: the window count has no row to ride on
+                total_count = (await db.execute(count_query, conditions["params"])).scalar()
         else:
+            keyset = "WHERE (created_at, id) < (:after_created_at, :after_id)" if after else ""
             contacts_query = text(f"""
-                SELECT id, first_name, last_name, email, phone, organization, created_at
-                FROM {schema_name}.contacts
-                ORDER BY created_at DESC
+                SELECT id, {select_list(columns)}, created_at
+                FROM contacts
+                {keyset}
+                ORDER BY created_at DESC, id DESC
                 LIMIT :limit OFFSET :skip
             """)
-            count_query = text(f"SELECT COUNT(*) FROM {schema_name}.contacts")
-            contacts_result = await db.execute(contacts_query, {"limit": limit, "skip": skip})
-            count_result = await db.execute(count_query)
-
-        contacts = contacts_result.fetchall()
-        total_count = count_result.scalar()
+            params = {"limit": limit + 1, "skip": 0 if after else skip}
+            if after:
+                params.update(after_created_at=after[0], after_id=after[1])
+            contacts_result = await db.execute(contacts_query, params)
+            contacts = contacts_result.fetchall()
+
+            # One extra row tells us whether another page exists
+            if len(contacts) > limit:
+                contacts = contacts[:limit]
+                last = contacts[-1]
+                if last[6] is not None:
+                    next_cursor = encode_cursor(last[6], last[0])
+
+            total_count = None if exact_count else await estimate_row_count(db, schema_name, "contacts")
+            if total_count is None:
+                count_result = await db.execute(text("SELECT COUNT(*) FROM contacts"))
+                total_count = count_result.scalar()
+            else:
+                total_is_estimate = True
 
         contacts_data = []
         for contact in contacts:
@@ -155,6 +175,8 @@ async def list_contacts(
         return {
             "contacts": contacts_data,
             "total": total_count or 0,
+            "total_is_estimate": total_is_estimate,
+            "next_cursor": next_cursor,
             "skip": skip,
             "limit": limit,
             "search": search
@@ -171,17 +193,14 @@ async def list_contacts(
 async def create_contact(
     contact: ContactCreateRequest,
     current_user: Dict[str, Any] = Depends(get_current_client_user),
-    db: AsyncSession = Depends(get_database)
+    db: AsyncSession = Depends(get_client_database)
 ) -> Dict[str, Any]:
     """Create new contact in client CRM"""
 
-    client_id = current_user["client_id"]
-    schema_name = get_client_schema(client_id)
-
     try:
         # Insert new contact
-        insert_query = text(f"""
-            INSERT INTO {schema_name}.contacts
+        insert_query = text("""
+            INSERT INTO contacts
             (id, first_name, last_name, email, phone, organization, notes, created_at, updated_at)
             VALUES (gen_random_uuid(), :first_name, :last_name, :email, :phone, :organization, :notes, NOW(), NOW())
             RETURNING id, first_name, last_name, email, phone, organization, created_at
@@ -221,17 +240,14 @@ async def create_contact(
 async def get_contact(
     contact_id: str,
     current_user: Dict[str, Any] = Depends(get_current_client_user),
-    db: AsyncSession = Depends(get_database)
+    db: AsyncSession = Depends(get_client_database)
 ) -> Dict[str, Any]:
     """Get specific contact details"""
 
-    client_id = current_user["client_id"]
-    schema_name = get_client_schema(client_id)
-
     try:
-        contact_query = text(f"""
+        contact_query = text("""
             SELECT id, first_name, last_name, email, phone, organization, notes, created_at, updated_at
-            FROM {schema_name}.contacts
+            FROM contacts
             WHERE id = :contact_id
         """)
 
@@ -269,7 +285,7 @@ async def get_contact(
 async def search_contacts(
     search_request: ContactSearchRequest,
     current_user: Dict[str, Any] = Depends(get_current_client_user),
-    db: AsyncSession = Depends(get_database)
+    db: AsyncSession = Depends(get_client_database)
 ) -> Dict[str, Any]:
     """Search contacts (for voice interface and general search)"""
 
@@ -277,31 +293,21 @@ async def search_contacts(
     schema_name = get_client_schema(client_id)
 
     try:
+        columns = await contact_columns(db, schema_name)
+        conditions = search_conditions(search_request.query, columns)
+
+        # Prefix full-text, substring and fuzzy (misheard names) matches, best first
         search_query = text(f"""
-            SELECT id, first_name, last_name, email, phone, organization
-            FROM {schema_name}.contacts
-            WHERE
-                LOWER(first_name) LIKE LOWER(:search) OR
-                LOWER(last_name) LIKE LOWER(:search) OR
-                LOWER(email) LIKE LOWER(:search) OR
-                LOWER(organization) LIKE LOWER(:search) OR
-                LOWER(notes) LIKE LOWER(:search)
-            ORDER BY
-                CASE
-                    WHEN LOWER(first_name) LIKE LOWER(:exact_search) OR LOWER(last_name) LIKE LOWER(:exact_search) THEN 1
-                    WHEN LOWER(email) LIKE LOWER(:exact_search) THEN 2
-                    ELSE 3
-                END,
-                created_at DESC
+            SELECT id, {select_list(columns)},
+                   {conditions['rank']} AS score
+            FROM contacts
+            WHERE {conditions['where']}
+            ORDER BY score DESC, created_at DESC
             LIMIT :limit
         """)
 
-        search_param = f"%{search_request.query}%"
-        exact_search_param = search_request.query.lower()
-
         result = await db.execute(search_query, {
-            "search": search_param,
-            "exact_search": exact_search_param,
+            **conditions["params"],
             "limit": search_request.limit
         })
 
@@ -316,7 +322,8 @@ async def search_contacts(
                 "email": contact[3],
                 "phone": contact[4],
                 "organization": contact[5],
-                "full_name": f"{contact[1]} {contact[2]}"
+                "full_name": f"{contact[1]} {contact[2]}",
+                "score": round(float(contact[6]), 4)
             })
 
         return {
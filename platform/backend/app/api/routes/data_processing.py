@@ -4,7 +4,6 @@ Handles file uploads, data analysis, and CRM generation
 """
 
 import os
-import pandas as pd
 from typing import List, Dict, Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -15,7 +14,12 @@ from ...core.database import get_database
 from ...core.auth import get_current_platform_user, get_current_client_user
 from ...models.platform import Client, ClientProject
 from ...services.basic_data_importer import BasicDataImporter, import_csv_for_client
+from ...services.contact_dedup import DUPLICATE_MODES
 from ...services.basic_crm_generator import BasicCRMGenerator, generate_basic_crm
+from ...services.upload_registry import register_upload, get_uploads, profile_sheets, profile_frame
+from ...services.data_classifier import (
+    classify_table, classify_organization, suggest_modules, DEFAULT_CONFIDENCE_THRESHOLD
+)
 
 
 router = APIRouter()
@@ -26,6 +30,8 @@ class FileUploadResponse(BaseModel):
     size: int
     content_type: str
     file_id: str
+    file_format: str
+    duplicate: bool = False  # Same content was already uploaded for this client
 
 
 class DataAnalysisRequest(BaseModel):
@@ -76,25 +82,21 @@ async def upload_file(
             detail=f"File type {file.content_type} not supported. Please upload CSV or Excel files."
         )
 
-    # Create uploads directory
-    upload_dir = f"/tmp/crmblr_uploads/{client_id}"
-    os.makedirs(upload_dir, exist_ok=True)
-
-    # Save file
-    file_path = os.path.join(upload_dir, file.filename)
-    content = await file.read()
-
-    with open(file_path, "wb") as f:
-        f.write(content)
-
-    # Generate file ID (in production, store this in database)
-    file_id = f"{client_id}_{file.filename}_{len(content)}"
+    try:
+        upload, created = await register_upload(db, client_id, file)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
     return FileUploadResponse(
-        filename=file.filename,
-        size=len(content),
-        content_type=file.content_type,
-        file_id=file_id
+        filename=upload.filename,
+        size=upload.size,
+        content_type=upload.content_type,
+        file_id=str(upload.id),
+        file_format=upload.file_format,
+        duplicate=not created
     )
 
 
@@ -110,63 +112,53 @@ async def analyze_data(
     # In production, this would use AI services to analyze the data
 
     try:
-        # Load and preview data from uploaded files
-        upload_dir = f"/tmp/crmblr_uploads/{request.client_id}"
+        # Previews come from the profile cached at upload; no file is read here
+        try:
+            uploads = await get_uploads(db, request.client_id, request.uploaded_files)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid file id"
+            )
+
         data_preview = {}
-        suggested_modules = ["contacts"]  # Default
-        organization_type = request.organization_type or "nonprofit"
-
-        for file_id in request.uploaded_files:
-            # Parse file_id to get filename
-            parts = file_id.split("_")
-            if len(parts) >= 2:
-                filename = "_".join(parts[1:-1])  # Remove client_id and size
-                file_path = os.path.join(upload_dir, filename)
-
-                if os.path.exists(file_path):
-                    try:
-                        # Try to read as CSV first
-                        if filename.endswith('.csv'):
-                            df = pd.read_csv(file_path)
-                        else:
-                            # Try Excel
-                            df = pd.read_excel(file_path)
-
-                        # Basic analysis of the data
-                        columns = df.columns.tolist()
-                        sample_data = df.head(3).to_dict('records')
-
-                        data_preview[filename] = {
-                            "columns": columns,
-                            "row_count": len(df),
-                            "sample_data": sample_data
-                        }
-
-                        # Simple heuristics to suggest modules
-                        column_names_lower = [col.lower() for col in columns]
-
-                        if any(keyword in " ".join(column_names_lower)
-                               for keyword in ["donation", "amount", "gift", "pledge"]):
-                            if "donations" not in suggested_modules:
-                                suggested_modules.append("donations")
-
-                        if any(keyword in " ".join(column_names_lower)
-                               for keyword in ["event", "program", "activity"]):
-                            if "events" not in suggested_modules:
-                                suggested_modules.append("events")
-
-                        if any(keyword in " ".join(column_names_lower)
-                               for keyword in ["volunteer", "hours", "service"]):
-                            if "volunteers" not in suggested_modules:
-                                suggested_modules.append("volunteers")
-
-                    except Exception as e:
-                        data_preview[filename] = {
-                            "error": f"Could not parse file: {str(e)}",
-                            "columns": [],
-                            "row_count": 0,
-                            "sample_data": []
-                        }
+        classifications = {}
+
+        for upload in uploads:
+            if upload.profile is None:
+                data_preview[upload.filename] = {
+                    "error": upload.profile_error or "File has not been profiled",
+                    "columns": [],
+                    "row_count": 0,
+                    "sample_data": []
+                }
+                continue
+
+            for key, sheet in profile_sheets(upload):
+                data_preview[key] = {
+                    "columns": sheet["columns"],
+                    "row_count": sheet["row_count"],
+                    "row_count_estimated": sheet["row_count_estimated"],
+                    "sample_data": sheet["rows"][:3]
+                }
+
+                # Header/value scoring against the module entity definitions
+                classification = classify_table(key, profile_frame(sheet))
+                classifications[key] = classification
+                data_preview[key]["classification"] = {
+                    "entity_type": classification["entity_type"],
+                    "confidence": classification["confidence"],
+                    "field_mapping": classification["field_mapping"]
+                }
+
+        suggested_modules = suggest_modules(classifications.values())
+        organization = classify_organization(classifications)
+        if request.organization_type:
+            organization_type, confidence = request.organization_type, 1.0
+        elif organization["confidence"] >= DEFAULT_CONFIDENCE_THRESHOLD:
+            organization_type, confidence = organization["type"], organization["confidence"]
+        else:
+            organization_type, confidence = "nonprofit", organization["confidence"]
 
         # Generate basic field mappings
         field_mappings = {
@@ -189,13 +181,15 @@ async def analyze_data(
 
         return DataAnalysisResponse(
             organization_type=organization_type,
-            confidence=0.8,  # Mock confidence score
+            confidence=confidence,
             suggested_modules=suggested_modules,
             field_mappings=field_mappings,
             data_preview=data_preview,
             analysis_id=analysis_id
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -302,6 +296,7 @@ async def import_csv_data(
     file: UploadFile = File(...),
     table_name: str = Form(...),
     field_mappings: str = Form(...),  # JSON string
+    duplicates: str = Form("keep"),  # keep, skip or merge duplicate contacts
     current_user: Dict[str, Any] = Depends(get_current_client_user),
     db: AsyncSession = Depends(get_database)
 ) -> Dict[str, Any]:
@@ -312,27 +307,36 @@ async def import_csv_data(
 
     client_id = current_user["client_id"]
 
+    if duplicates not in DUPLICATE_MODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"duplicates must be one of: {', '.join(DUPLICATE_MODES)}"
+        )
+
     try:
         # Parse field mappings
         mappings = json.loads(field_mappings)
 
-        # Read CSV file
-        content = await file.read()
-
-        # Save to temporary file
+        # Stream upload to a temporary file (large files never sit in memory)
         with tempfile.NamedTemporaryFile(mode='wb', suffix='.csv', delete=False) as temp_file:
-            temp_file.write(content)
+            while chunk := await file.read(1024 * 1024):
+                temp_file.write(chunk)
             temp_path = temp_file.name
 
         try:
             # Use the basic data importer
-            result = await import_csv_for_client(db, client_id, temp_path, table_name, mappings)
+            result = await import_csv_for_client(db, client_id, temp_path, table_name, mappings, duplicates)
 
             if result["success"]:
                 return {
                     "message": f"Successfully imported {result['records_imported']} records to {table_name}",
                     "records_processed": result["records_processed"],
                     "records_imported": result["records_imported"],
+                    "records_rejected": result["records_rejected"],
+                    "rejected_rows": result["rejected_rows"],
+                    "load_stats": result["load_stats"],
+                    "data_quality": result["data_quality"],
+                    "deduplication": result["deduplication"],
                     "table_name": table_name,
                     "schema_name": result["schema_name"],
                     "columns_mapped": len(mappings)
@@ -13,6 +13,7 @@ from ...core.database import get_database
 from ...core.auth import get_current_platform_user
 from ...services.hybrid_ai_onboarding import HybridAIOnboardingService, EnhancedOnboardingWorkflow
 from ...services.makelit_integration import create_makelit_crm_from_intake
+from ...services.file_loader import LineCounter
 
 
 router = APIRouter()
@@ -120,22 +121,15 @@ async def start_enhanced_onboarding(
         files_info = []
         if uploaded_files:
             for file in uploaded_files:
-                content = await file.read()
-
-                # For CSV files, try to get row count
-                row_count = 0
-                if file.filename.endswith('.csv'):
-                    try:
-                        import pandas as pd
-                        import io
-                        df = pd.read_csv(io.StringIO(content.decode('utf-8')))
-                        row_count = len(df)
-                    except:
-                        row_count = 0
+                # Stream the upload, counting CSV rows by newline (no decode/parse)
+                counter = LineCounter()
+                while chunk := await file.read(1024 * 1024):
+                    counter.update(chunk)
+                row_count = counter.rows if file.filename.endswith('.csv') else 0
 
                 files_info.append({
                     "filename": file.filename,
-                    "size": len(content),
+                    "size": counter.size,
                     "content_type": file.content_type,
                     "row_count": row_count
                 })
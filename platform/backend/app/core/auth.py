@@ -5,7 +5,7 @@ Combines CRMBLR's JWT system with Make-Lit's user models for multi-tenant suppor
 
 import os
 import time
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
 
 import jwt
@@ -15,6 +15,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import bcrypt
 
+from .config import settings
 from .database import get_database
 from ..models.platform import PlatformUser, Client, ClientUser
 
@@ -260,28 +261,15 @@ class AuthService:
 
 # OpenAI Realtime Token (from original CRMBLR)
 
-async def create_openai_realtime_token(
-    current_user: Dict[str, Any] = Depends(get_current_user)
-) -> Dict[str, Any]:
-    """
-    Create ephemeral token for OpenAI Realtime API
-    Available to both platform and client users
-    """
-    import requests
-
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="OpenAI API key not configured"
-        )
+def _build_realtime_session_config(current_user: Dict[str, Any], tools: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build realtime session config (instructions + tools) for a user's tenant"""
 
-    # Load instructions based on user type
+    # Instructions depend only on the user type, so secrets are shared across a tenant's users
     if current_user["user_type"] == "client":
         # Client users get CRM-specific instructions
-        instructions = f"""
-        You are a helpful AI assistant for {current_user.get('full_name', 'the user')}'s CRM system.
-        You can help them search contacts, create records, and analyze their data.
+        instructions = """
+        You are a helpful AI assistant for this organization's CRM system.
+        You can help users search contacts, create records, and analyze their data.
         Always be helpful and accurate with their organizational data.
         """
     else:
@@ -291,30 +279,7 @@ async def create_openai_realtime_token(
         You can help with general queries and system information.
         """
 
-    # Define available functions (will expand based on user's modules)
-    tools = [
-        {
-            "type": "function",
-            "name": "search_contacts",
-            "description": "Search for contacts in the CRM",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string", "description": "Search query"},
-                    "limit": {"type": "integer", "default": 10}
-                },
-                "required": ["query"]
-            }
-        },
-        {
-            "type": "function",
-            "name": "get_dashboard_stats",
-            "description": "Get dashboard statistics",
-            "parameters": {"type": "object", "properties": {}}
-        }
-    ]
-
-    session_config = {
+    return {
         "session": {
             "type": "realtime",
             "model": "gpt-realtime",
@@ -325,19 +290,47 @@ async def create_openai_realtime_token(
         }
     }
 
+
+async def create_openai_realtime_token(
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    db: AsyncSession = Depends(get_database)
+) -> Dict[str, Any]:
+    """
+    Create ephemeral token for OpenAI Realtime API
+    Available to both platform and client users
+    Served from a pre-warmed pool when possible (see realtime_token_service)
+    Tools are generated from the client's enabled modules (see tool_manifest)
+    """
+    import httpx
+    from ..services.realtime_token_service import realtime_token_service
+    from ..services.tool_manifest import compile_tool_manifest, configuration_version
+
+    if not settings.OPENAI_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="OpenAI API key not configured"
+        )
+
+    configuration = None
+    if current_user["user_type"] == "client":
+        result = await db.execute(
+            select(Client.configuration).where(Client.id == current_user["client_id"])
+        )
+        configuration = result.scalar_one_or_none()
+    tools = compile_tool_manifest(configuration)
+
+    # Session configs (and pooled secrets) are shared per tenant and configuration
+    # version; a module change starts a new version and evicts the old one
+    tenant = f"{current_user['user_type']}:{current_user.get('client_id') or 'platform'}"
+    key = f"{tenant}:{configuration_version(configuration)}"
+
     try:
-        response = requests.post(
-            "https://api.openai.com/v1/realtime/client_secrets",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            json=session_config,
-            timeout=10,
+        status_code, token = await realtime_token_service.get_token(
+            key, lambda: _build_realtime_session_config(current_user, tools), tenant
         )
-        return {"token": response.json(), "status_code": response.status_code}
-    except requests.RequestException:
+        return {"token": token, "status_code": status_code}
+    except httpx.HTTPError:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to generate OpenAI token"
-        )
\ No newline at end of file
+        )
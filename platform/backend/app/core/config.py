@@ -31,12 +31,42 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "crmblr_platform")
     POSTGRES_PORT: str = os.getenv("POSTGRES_PORT", "5432")
 
+    # Database - connection pool (size against MAX_CLIENTS_PER_INSTANCE)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "False").lower() == "true"
+    # Per-connection statement_timeout; 0 leaves the server/role setting alone (imports and
+    # index builds can run long, so opt in per deployment)
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    # cached: asyncpg statement cache (direct Postgres)
+    # named: unique statement names (pgbouncer >= 1.21 with max_prepared_statements)
+    # disabled: no statement caching (older pgbouncer in transaction pooling mode)
+    DB_PREPARED_STATEMENTS: str = os.getenv("DB_PREPARED_STATEMENTS", "cached")
+
     # Database - Elasticsearch (search/voice)
     ELASTICSEARCH_URL: str = os.getenv("ELASTICSEARCH_URL", "http://localhost:9200")
     ES_INDEX_PREFIX: str = os.getenv("ES_INDEX_PREFIX", "crmblr")
 
     # OpenAI (voice features)
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
+    OPENAI_REALTIME_URL: str = os.getenv("OPENAI_REALTIME_URL", "https://api.openai.com/v1/realtime/client_secrets")
+    REALTIME_TOKEN_POOL_SIZE: int = int(os.getenv("REALTIME_TOKEN_POOL_SIZE", "2"))
+    REALTIME_TOKEN_TTL_SECONDS: int = int(os.getenv("REALTIME_TOKEN_TTL_SECONDS", "600"))
+    REALTIME_TOKEN_MAX_KEYS: int = int(os.getenv("REALTIME_TOKEN_MAX_KEYS", "256"))
+    TOOL_MANIFEST_CACHE_SIZE: int = int(os.getenv("TOOL_MANIFEST_CACHE_SIZE", "256"))
+
+    # OpenAI (onboarding data analysis)
+    AI_ANALYSIS_MODEL: str = os.getenv("AI_ANALYSIS_MODEL", "gpt-4")
+    AI_MAX_CONCURRENT_REQUESTS: int = int(os.getenv("AI_MAX_CONCURRENT_REQUESTS", "4"))
+    AI_RESPONSE_CACHE_DIR: Optional[str] = os.getenv("AI_RESPONSE_CACHE_DIR")
+    # Local classifier confidence needed to skip the LLM
+    AI_LOCAL_CONFIDENCE_THRESHOLD: float = float(os.getenv("AI_LOCAL_CONFIDENCE_THRESHOLD", "0.6"))
+    # Worker processes for parsing uploaded spreadsheets (0 = min(4, CPUs))
+    FILE_LOADER_PROCESSES: int = int(os.getenv("FILE_LOADER_PROCESSES", "0"))
+    # Content-addressed store for uploaded data files
+    UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "/tmp/crmblr_uploads")
 
     # Google OAuth
     GOOGLE_CLIENT_ID: Optional[str] = os.getenv("GOOGLE_CLIENT_ID")
@@ -63,11 +93,23 @@ class Settings(BaseSettings):
     # Multi-tenant
     MAX_CLIENTS_PER_INSTANCE: int = 100
     DEFAULT_USER_LIMIT: int = 5
+    # Empty tenant schemas kept ready per pooled layout (0 disables the pool)
+    SCHEMA_POOL_SIZE: int = int(os.getenv("SCHEMA_POOL_SIZE", "2"))
+    # Pooled layouts: a template's default configuration and the basic sign-up modules
+    SCHEMA_POOL_TEMPLATE: str = os.getenv("SCHEMA_POOL_TEMPLATE", "nonprofit")
+    SCHEMA_POOL_MODULES: str = os.getenv("SCHEMA_POOL_MODULES", "contacts")
 
     @validator("POSTGRES_SERVER", pre=True)
     def validate_postgres_server(cls, v: str) -> str:
         return v
 
+    @validator("DB_PREPARED_STATEMENTS")
+    def validate_prepared_statements(cls, v: str) -> str:
+        v = v.lower()
+        if v not in ("cached", "named", "disabled"):
+            raise ValueError("DB_PREPARED_STATEMENTS must be cached, named or disabled")
+        return v
+
     @property
     def database_url(self) -> str:
         """PostgreSQL connection URL"""
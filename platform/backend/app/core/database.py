@@ -4,18 +4,88 @@ Supports both PostgreSQL (primary) and Elasticsearch (search/voice)
 """
 
 import os
-from typing import AsyncGenerator, Optional
+import time
+import uuid
+import threading
+from typing import AsyncGenerator, Optional, Dict, Any
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 # from elasticsearch import AsyncElasticsearch  # Optional dependency
 from .config import settings
 
+
+class PoolMetrics:
+    """Checkout wait times and timeouts for the engine's connection pool"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.observe(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_metrics.observe(time.perf_counter() - started)
+        return connection
+
+
+def _engine_options() -> Dict[str, Any]:
+    """create_async_engine options from settings"""
+    options: Dict[str, Any] = {
+        "poolclass": MeteredPool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "echo": settings.DEBUG,
+    }
+    if "asyncpg" not in settings.async_database_url:
+        return options
+
+    connect_args: Dict[str, Any] = {}
+    if settings.DB_PREPARED_STATEMENTS == "cached":
+        # Startup parameters are rejected by pgbouncer, so only sent to Postgres directly
+        if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+            connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+    else:
+        # Transaction pooling: statements may land on a different server connection,
+        # so names must never collide (set statement_timeout on the role instead)
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+        if settings.DB_PREPARED_STATEMENTS == "disabled":
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+    options["connect_args"] = connect_args
+    return options
+
+
 # PostgreSQL Setup
-engine = create_async_engine(
-    settings.async_database_url,
-    pool_pre_ping=True,
-    echo=settings.DEBUG,
-)
+engine = create_async_engine(settings.async_database_url, **_engine_options())
 
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -45,8 +115,31 @@ DatabaseDep = get_database
 
 # Multi-tenant utilities
 def get_client_schema(client_id: str) -> str:
-    """Get PostgreSQL schema name for client"""
-    return f"client_{client_id}"
+    """Get PostgreSQL schema name for client (UUID hyphens aren't valid in bare identifiers)"""
+    return f"client_{str(client_id).replace('-', '_')}"
+
+# Transaction-local (SET LOCAL semantics): ends with the transaction, so a pooled
+# connection never leaks one tenant's search_path to the next checkout
+SET_SEARCH_PATH = text("SELECT set_config('search_path', :search_path, true)")
+
+async def use_client_schema(session: AsyncSession, schema_name: str) -> AsyncSession:
+    """
+    Scope a session to a client schema via search_path
+
+    Unqualified table names then resolve to the client's tables, so query text is
+    the same for every tenant and asyncpg reuses one prepared statement per
+    connection. The setting is re-applied at the start of every transaction.
+    """
+    params = {"search_path": f'"{schema_name}", public'}
+
+    def set_search_path(sync_session, transaction, connection):
+        connection.execute(SET_SEARCH_PATH, params)
+
+    event.listen(session.sync_session, "after_begin", set_search_path)
+    session.info["schema_name"] = schema_name
+    if session.in_transaction():
+        await session.execute(SET_SEARCH_PATH, params)
+    return session
 
 def get_client_es_index(client_id: str, entity_type: str) -> str:
     """Get Elasticsearch index name for client entity"""
@@ -56,7 +149,7 @@ async def ensure_client_schema(client_id: str) -> None:
     """Ensure client-specific PostgreSQL schema exists"""
     schema_name = get_client_schema(client_id)
     async with AsyncSessionLocal() as session:
-        await session.execute(f"CREATE SCHEMA IF NOT EXISTS {schema_name}")
+        await session.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema_name}"))
         await session.commit()
 
 async def ensure_client_indices(client_id: str, entity_types: list[str]) -> None:
@@ -89,11 +182,33 @@ async def check_postgres_health() -> bool:
     """Check PostgreSQL connection health"""
     try:
         async with AsyncSessionLocal() as session:
-            await session.execute("SELECT 1")
+            await session.execute(text("SELECT 1"))
             return True
     except Exception:
         return False
 
+def get_pool_stats() -> Dict[str, Any]:
+    """Pool utilisation and checkout wait times (for sizing against tenancy)"""
+    pool = engine.pool
+    capacity = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    checked_out = pool.checkedout()
+    checkouts = pool_metrics.checkouts
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "utilisation": round(checked_out / capacity, 3) if capacity else None,
+        "checkouts": checkouts,
+        "checkout_timeouts": pool_metrics.timeouts,
+        "wait_ms_avg": round(pool_metrics.wait_seconds_total / checkouts * 1000, 3) if checkouts else 0.0,
+        "wait_ms_max": round(pool_metrics.wait_seconds_max * 1000, 3),
+        "prepared_statements": settings.DB_PREPARED_STATEMENTS,
+        "max_clients_per_instance": settings.MAX_CLIENTS_PER_INSTANCE,
+        "connections_per_client": round(capacity / settings.MAX_CLIENTS_PER_INSTANCE, 3)
+    }
+
 async def check_elasticsearch_health() -> bool:
     """Check Elasticsearch connection health (disabled for MVP)"""
     return False
\ No newline at end of file
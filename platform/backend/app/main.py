@@ -11,8 +11,10 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from .core.config import settings
-from .core.database import check_postgres_health, check_elasticsearch_health
+from .core.database import check_postgres_health, check_elasticsearch_health, get_pool_stats
 from .core.auth import get_current_user, get_current_platform_user, get_current_client_user
+from .services.realtime_token_service import realtime_token_service
+from .services.schema_provisioner import schedule_pool_refill
 
 # Import API routes
 from .api.routes import auth, platform, clients, data_processing
@@ -34,6 +36,9 @@ async def lifespan(app: FastAPI):
 
     if not postgres_healthy:
         print("⚠️  WARNING: PostgreSQL connection failed - some features may not work")
+    else:
+        # Pre-provision tenant schemas in the background
+        schedule_pool_refill()
 
     print("✅ CRMBLR Platform started successfully")
 
@@ -41,6 +46,7 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     print("🛑 Shutting down CRMBLR Platform...")
+    await realtime_token_service.aclose()
 
 
 # Create FastAPI application
@@ -248,7 +254,8 @@ async def platform_status(
         "version": "1.0.0",
         "active_clients": 0,  # TODO: Count from database
         "total_users": 0,     # TODO: Count from database
-        "uptime": "unknown"   # TODO: Calculate uptime
+        "uptime": "unknown",  # TODO: Calculate uptime
+        "database_pool": get_pool_stats()
     }
 
 
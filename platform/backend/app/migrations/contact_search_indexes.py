@@ -0,0 +1,137 @@
+"""
+Contact Search Index Migration
+One-off online upgrade of existing tenant contacts tables to indexed search
+Run once per deployment against Postgres directly (not through pgbouncer):
+
+    python -m app.migrations.contact_search_indexes
+
+New tables get a generated search_vector column (contact_search_ddl), but
+adding one to a populated table rewrites it under an ACCESS EXCLUSIVE lock.
+Here the column is added as a plain one (a catalog-only change), kept current
+by a trigger and backfilled in small batches, and every index is built with
+CREATE INDEX CONCURRENTLY, so reads and writes carry on throughout. Until a
+tenant has the column its searches use the unindexed substring match; rows
+not yet backfilled are still found by the trigram match on names/email.
+Safe to rerun after an interruption.
+"""
+
+import sys
+import uuid
+import asyncio
+import logging
+from typing import Collection, List
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy import text
+
+from ..core.database import engine
+from ..services.contact_search import contact_columns, search_vector_expression, trigram_expression
+
+
+logger = logging.getLogger(__name__)
+
+# Rows updated per backfill statement (each its own short transaction)
+BACKFILL_BATCH_SIZE = 5000
+
+# Give up on a DDL lock rather than queue every other query behind it
+LOCK_TIMEOUT = "5s"
+
+
+async def _tenant_schemas(conn: AsyncConnection) -> List[str]:
+    result = await conn.execute(text("""
+        SELECT n.nspname FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relname = 'contacts' AND c.relkind IN ('r', 'p') AND n.nspname LIKE 'client\\_%'
+        ORDER BY n.nspname
+    """))
+    return [row[0] for row in result.fetchall()]
+
+
+async def _create_index(conn: AsyncConnection, schema_name: str, name: str, definition: str) -> None:
+    """CREATE INDEX CONCURRENTLY, first dropping an invalid leftover of an interrupted build"""
+    invalid = (await conn.execute(
+        text("SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:index_name)"),
+        {"index_name": f"{schema_name}.{name}"}
+    )).scalar()
+    if invalid:
+        await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {schema_name}.{name}"))
+    await conn.execute(text(
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {schema_name}.contacts {definition}"
+    ))
+
+
+async def _add_search_vector(conn: AsyncConnection, schema_name: str, columns: Collection[str]) -> None:
+    """Plain search_vector column, a trigger keeping it current, and a batched backfill"""
+    table = f"{schema_name}.contacts"
+    await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+    await conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION {schema_name}.contacts_search_vector() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.search_vector := {search_vector_expression(columns, row="NEW.")};
+            RETURN NEW;
+        END
+        $$
+    """))
+    await conn.execute(text(f"""
+        CREATE OR REPLACE TRIGGER contacts_search_vector
+        BEFORE INSERT OR UPDATE ON {table}
+        FOR EACH ROW EXECUTE FUNCTION {schema_name}.contacts_search_vector()
+    """))
+
+    # Rows written from here on are covered by the trigger; walk the rest by primary key
+    after = uuid.UUID(int=0)
+    filled = 0
+    while True:
+        ids = (await conn.execute(
+            text(f"SELECT id FROM {table} WHERE id > :after ORDER BY id LIMIT :batch_size"),
+            {"after": after, "batch_size": BACKFILL_BATCH_SIZE}
+        )).scalars().all()
+        if not ids:
+            break
+        result = await conn.execute(
+            text(f"""
+                UPDATE {table} SET search_vector = {search_vector_expression(columns)}
+                WHERE id = ANY(:ids) AND search_vector IS NULL
+            """),
+            {"ids": list(ids)}
+        )
+        filled += result.rowcount
+        after = ids[-1]
+    logger.info(f"{schema_name}: backfilled search_vector on {filled} contacts")
+
+
+async def migrate_schema(conn: AsyncConnection, schema_name: str) -> None:
+    """Bring one tenant's contacts table up to the search layout (autocommit connection)"""
+    columns = await contact_columns(conn, schema_name)
+    trigram = trigram_expression(columns)
+    if "created_at" in columns:
+        await _create_index(conn, schema_name, "idx_contacts_created_id", "(created_at DESC, id DESC)")
+    if trigram:
+        await _create_index(conn, schema_name, "idx_contacts_search_trgm", f"USING GIN (({trigram}) gin_trgm_ops)")
+    if "search_vector" not in columns:
+        if not search_vector_expression(columns):
+            return
+        await _add_search_vector(conn, schema_name, columns)
+    await _create_index(conn, schema_name, "idx_contacts_search_vector", "USING GIN (search_vector)")
+
+
+async def migrate() -> List[str]:
+    """Migrate every tenant schema; returns the schemas that failed (rerun to retry them)"""
+    failed = []
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(f"SET lock_timeout = '{LOCK_TIMEOUT}'"))
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for schema_name in await _tenant_schemas(conn):
+            try:
+                await migrate_schema(conn, schema_name)
+                logger.info(f"{schema_name}: contact search ready")
+            except Exception as e:
+                logger.error(f"{schema_name}: contact search migration failed: {e}")
+                failed.append(schema_name)
+    return failed
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    sys.exit(1 if asyncio.run(migrate()) else 0)
@@ -3,6 +3,7 @@ Flexible Template System for CRMBLR Platform
 Allows easy customization and addition of fields for each client's unique needs
 """
 
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
 from pydantic import BaseModel
 from enum import Enum
@@ -197,7 +198,8 @@ class TemplateCustomizer:
         # Start with base field sets
         for entity_name, base_fields in template.base_field_sets.items():
             config["entities"][entity_name] = {
-                "fields": base_fields.copy(),
+                # Field dicts are copied: answers edit them and templates are cached
+                "fields": [dict(field) for field in base_fields],
                 "workflows": [],
                 "custom_fields": []
             }
@@ -259,16 +261,25 @@ class TemplateCustomizer:
         return config
 
 
-# Available templates
-AVAILABLE_TEMPLATES = {
-    "cbd": CommunityBenefitDistrictTemplate(),
-    "nonprofit": NonprofitTemplate(),
+# Available templates (instantiated on first lookup)
+TEMPLATE_CLASSES = {
+    "cbd": CommunityBenefitDistrictTemplate,
+    "nonprofit": NonprofitTemplate,
 }
 
 
+@lru_cache(maxsize=None)
 def get_template(template_id: str) -> Optional[BaseTemplate]:
     """Get template by ID"""
-    return AVAILABLE_TEMPLATES.get(template_id)
+    template_class = TEMPLATE_CLASSES.get(template_id)
+    return template_class() if template_class else None
+
+
+def __getattr__(name: str):
+    # Old module-level registry, built on access
+    if name == "AVAILABLE_TEMPLATES":
+        return {template_id: get_template(template_id) for template_id in TEMPLATE_CLASSES}
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def create_client_configuration(template_id: str, customization_answers: Dict[str, Any]) -> Dict[str, Any]:
@@ -8,7 +8,7 @@ from datetime import datetime
 from typing import Optional, Dict, Any
 from enum import Enum
 
-from sqlalchemy import Column, String, Text, DateTime, Boolean, Integer, JSON, ForeignKey
+from sqlalchemy import Column, String, Text, DateTime, Boolean, Integer, BigInteger, JSON, ForeignKey, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -76,6 +76,7 @@ class Client(Base):
     # Relationships
     users = relationship("ClientUser", back_populates="client", cascade="all, delete-orphan")
     projects = relationship("ClientProject", back_populates="client", cascade="all, delete-orphan")
+    uploads = relationship("UploadedFile", back_populates="client", cascade="all, delete-orphan")
 
     @property
     def setup_fee(self) -> int:
@@ -181,6 +182,55 @@ class ClientProject(Base):
     client = relationship("Client", back_populates="projects")
 
 
+class UploadedFile(Base):
+    """
+    Registry of files uploaded for data analysis
+    Content is stored once per hash; the profile caches the header, sample rows and row counts
+    """
+    __tablename__ = "uploaded_files"
+
+    # Primary key (the file_id handed to the client)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # Client association
+    client_id = Column(UUID(as_uuid=True), ForeignKey("clients.id"), nullable=False, index=True)
+
+    # File details
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(255), nullable=True)
+    content_hash = Column(String(64), nullable=False, index=True)  # sha256 hex
+    storage_path = Column(String(1024), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    file_format = Column(String(20), nullable=False)  # "csv", "xlsx", "xls"
+
+    # Cached preview: per sheet key, columns, row_count, row_count_estimated, rows
+    profile = Column(JSON, nullable=True)
+    profile_error = Column(Text, nullable=True)
+
+    # Metadata
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    client = relationship("Client", back_populates="uploads")
+
+    # Re-uploading the same export returns the existing entry
+    __table_args__ = (
+        UniqueConstraint("client_id", "content_hash", name="uq_uploaded_files_client_hash"),
+    )
+
+
+class PooledSchema(Base):
+    """
+    Empty, fully provisioned tenant schema waiting to be claimed
+    plan_key fingerprints the layout (see services.schema_provisioner)
+    """
+    __tablename__ = "schema_pool"
+
+    schema_name = Column(String(63), primary_key=True)
+    plan_key = Column(String(40), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class PlatformUser(Base):
     """
     Platform administrators (you and your team)
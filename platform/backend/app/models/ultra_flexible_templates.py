@@ -4,7 +4,8 @@ Based on analysis of CRM v2's modular architecture and SOMA West's operational n
 Allows clients to mix and match functional modules for their specific requirements
 """
 
-from typing import Dict, List, Any, Optional
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Tuple
 from pydantic import BaseModel
 from enum import Enum
 
@@ -48,7 +49,7 @@ class CRMModule(BaseModel):
 # CORE MODULES (Required for all clients)
 # ============================================================================
 
-CONTACTS_MODULE = CRMModule(
+CONTACTS_MODULE_SPEC = dict(
     id="contacts",
     name="Contact Management",
     description="Individual people and relationship tracking",
@@ -88,7 +89,7 @@ CONTACTS_MODULE = CRMModule(
     ]
 )
 
-ACTIVITIES_MODULE = CRMModule(
+ACTIVITIES_MODULE_SPEC = dict(
     id="activities",
     name="Activity Logging",
     description="Track interactions and communications",
@@ -123,7 +124,7 @@ ACTIVITIES_MODULE = CRMModule(
 # OPERATIONS MODULES (CBD, Service Organizations)
 # ============================================================================
 
-SERVICE_REQUESTS_MODULE = CRMModule(
+SERVICE_REQUESTS_MODULE_SPEC = dict(
     id="service_requests",
     name="Service Request Management",
     description="Track and manage service requests with field operations",
@@ -176,7 +177,7 @@ SERVICE_REQUESTS_MODULE = CRMModule(
     recommended_plan="medium"
 )
 
-EVENT_MANAGEMENT_MODULE = CRMModule(
+EVENT_MANAGEMENT_MODULE_SPEC = dict(
     id="events",
     name="Event Management",
     description="Plan, track, and manage events",
@@ -220,7 +221,7 @@ EVENT_MANAGEMENT_MODULE = CRMModule(
 # FUNDRAISING MODULES (Nonprofits, Foundations)
 # ============================================================================
 
-DONATIONS_MODULE = CRMModule(
+DONATIONS_MODULE_SPEC = dict(
     id="donations",
     name="Donation Tracking",
     description="Track donations and donor relationships",
@@ -262,7 +263,7 @@ DONATIONS_MODULE = CRMModule(
     recommended_plan="small"
 )
 
-GRANTS_MODULE = CRMModule(
+GRANTS_MODULE_SPEC = dict(
     id="grants",
     name="Grant Management",
     description="Track grant applications and awards",
@@ -304,7 +305,7 @@ GRANTS_MODULE = CRMModule(
 # RELATIONSHIP MODULES
 # ============================================================================
 
-ORGANIZATIONS_MODULE = CRMModule(
+ORGANIZATIONS_MODULE_SPEC = dict(
     id="organizations",
     name="Organization Management",
     description="Track institutional relationships",
@@ -360,7 +361,7 @@ class OrganizationTemplate(BaseModel):
     recommended_plan: str
 
 
-CBD_TEMPLATE = OrganizationTemplate(
+CBD_TEMPLATE_SPEC = dict(
     id="cbd",
     name="Community Benefit District",
     description="Operations management for CBDs and BIDs",
@@ -398,7 +399,7 @@ CBD_TEMPLATE = OrganizationTemplate(
     recommended_plan="medium"
 )
 
-NONPROFIT_TEMPLATE = OrganizationTemplate(
+NONPROFIT_TEMPLATE_SPEC = dict(
     id="nonprofit",
     name="Nonprofit Organization",
     description="Complete nonprofit management with fundraising focus",
@@ -437,30 +438,144 @@ NONPROFIT_TEMPLATE = OrganizationTemplate(
 # MODULE REGISTRY
 # ============================================================================
 
-ALL_MODULES = {
-    "contacts": CONTACTS_MODULE,
-    "activities": ACTIVITIES_MODULE,
-    "service_requests": SERVICE_REQUESTS_MODULE,
-    "events": EVENT_MANAGEMENT_MODULE,
-    "donations": DONATIONS_MODULE,
-    "grants": GRANTS_MODULE,
-    "organizations": ORGANIZATIONS_MODULE,
+# Specs are validated into models on first use, not at import
+MODULE_SPECS: Dict[str, Dict[str, Any]] = {
+    "contacts": CONTACTS_MODULE_SPEC,
+    "activities": ACTIVITIES_MODULE_SPEC,
+    "service_requests": SERVICE_REQUESTS_MODULE_SPEC,
+    "events": EVENT_MANAGEMENT_MODULE_SPEC,
+    "donations": DONATIONS_MODULE_SPEC,
+    "grants": GRANTS_MODULE_SPEC,
+    "organizations": ORGANIZATIONS_MODULE_SPEC,
 }
 
-TEMPLATES = {
-    "cbd": CBD_TEMPLATE,
-    "nonprofit": NONPROFIT_TEMPLATE,
+TEMPLATE_SPECS: Dict[str, Dict[str, Any]] = {
+    "cbd": CBD_TEMPLATE_SPEC,
+    "nonprofit": NONPROFIT_TEMPLATE_SPEC,
 }
 
 
+def question_id(question: Dict) -> str:
+    """Answer key for a setup question ("How do you prioritize requests?" -> "how_do_you_prioritize_requests?")"""
+    return question.get("question", "").lower().replace(" ", "_")
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """A validated template with what configuration building needs precomputed"""
+    template: OrganizationTemplate
+    module_ids: Tuple[str, ...]                # required + suggested and their dependencies
+    entities: Tuple[Tuple[str, Dict], ...]     # (entity name, definition) provided by those modules
+    answer_fields: Dict[str, Tuple[str, str]]  # question id -> (module, configuration field)
+    questions: Dict[str, Dict]                 # question id -> setup question
+
+
+class TemplateRegistry:
+    """
+    Lazily validated, indexed modules and templates
+
+    Each module or template is validated the first time it is asked for;
+    module dependency closures and template question ids are computed once.
+    """
+
+    def __init__(self, module_specs: Dict[str, Dict[str, Any]], template_specs: Dict[str, Dict[str, Any]]):
+        self.module_specs = module_specs
+        self.template_specs = template_specs
+        self._modules: Dict[str, CRMModule] = {}
+        self._templates: Dict[str, CompiledTemplate] = {}
+        self._closures: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+    def module(self, module_id: str) -> Optional[CRMModule]:
+        if module_id not in self._modules:
+            spec = self.module_specs.get(module_id)
+            if spec is None:
+                return None
+            self._modules[module_id] = CRMModule(**spec)
+        return self._modules[module_id]
+
+    def modules(self) -> Dict[str, CRMModule]:
+        return {module_id: self.module(module_id) for module_id in self.module_specs}
+
+    def module_closure(self, module_ids: Tuple[str, ...]) -> Tuple[str, ...]:
+        """Modules plus everything they require, dependencies first (unknown ids dropped)"""
+        if module_ids not in self._closures:
+            order: List[str] = []
+
+            def visit(module_id: str, path: Tuple[str, ...]) -> None:
+                module = self.module(module_id)
+                if module is None or module_id in order or module_id in path:
+                    return
+                for required in module.requires_modules:
+                    visit(required, path + (module_id,))
+                order.append(module_id)
+
+            for module_id in module_ids:
+                visit(module_id, ())
+            self._closures[module_ids] = tuple(order)
+        return self._closures[module_ids]
+
+    def compiled(self, template_id: str) -> Optional[CompiledTemplate]:
+        if template_id not in self._templates:
+            spec = self.template_specs.get(template_id)
+            if spec is None:
+                return None
+            self._templates[template_id] = self._compile(OrganizationTemplate(**spec))
+        return self._templates[template_id]
+
+    def _compile(self, template: OrganizationTemplate) -> CompiledTemplate:
+        listed = template.required_modules + template.suggested_modules + template.optional_modules
+        unknown = [module_id for module_id in listed if module_id not in self.module_specs]
+        if unknown:
+            raise ValueError(f"Template {template.id} lists unknown modules: {unknown}")
+
+        module_ids = self.module_closure(tuple(template.required_modules + template.suggested_modules))
+        questions: Dict[str, Dict] = {}
+        answer_fields: Dict[str, Tuple[str, str]] = {}
+        for question in template.setup_questions:
+            key = question_id(question)
+            questions[key] = question
+            if question.get("module") in module_ids and question.get("field"):
+                answer_fields[key] = (question["module"], question["field"])
+        entities = tuple(
+            (entity_name, entity_def)
+            for module_id in module_ids
+            for entity_name, entity_def in self.module(module_id).base_entities.items()
+        )
+        return CompiledTemplate(template, module_ids, entities, answer_fields, questions)
+
+    def template(self, template_id: str) -> Optional[OrganizationTemplate]:
+        compiled = self.compiled(template_id)
+        return compiled.template if compiled else None
+
+    def templates(self) -> Dict[str, OrganizationTemplate]:
+        return {template_id: self.template(template_id) for template_id in self.template_specs}
+
+
+registry = TemplateRegistry(MODULE_SPECS, TEMPLATE_SPECS)
+
+
+def __getattr__(name: str) -> Any:
+    # ALL_MODULES / TEMPLATES are built on first access (validates every entry)
+    if name == "ALL_MODULES":
+        return registry.modules()
+    if name == "TEMPLATES":
+        return registry.templates()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def get_template(template_id: str) -> Optional[OrganizationTemplate]:
     """Get template by ID"""
-    return TEMPLATES.get(template_id)
+    return registry.template(template_id)
 
 
 def get_module(module_id: str) -> Optional[CRMModule]:
     """Get module by ID"""
-    return ALL_MODULES.get(module_id)
+    return registry.module(module_id)
+
+
+def get_module_closure(module_ids: List[str]) -> List[str]:
+    """Modules with their required modules, dependencies first"""
+    return list(registry.module_closure(tuple(module_ids)))
 
 
 def build_client_configuration(template_id: str, answers: Dict[str, Any]) -> Dict[str, Any]:
@@ -468,44 +583,31 @@ def build_client_configuration(template_id: str, answers: Dict[str, Any]) -> Dic
     Build complete client configuration from template + answers
     This creates the exact specification needed to deploy their CRM
     """
-    template = get_template(template_id)
-    if not template:
+    compiled = registry.compiled(template_id)
+    if not compiled:
         raise ValueError(f"Template {template_id} not found")
 
     config = {
         "template_id": template_id,
-        "template_name": template.name,
+        "template_name": compiled.template.name,
         "modules": {},
         "entities": {},
         "workflows": {},
         "branding": {}
     }
 
-    # Add required modules
-    all_modules = template.required_modules + template.suggested_modules
-    for module_id in all_modules:
-        module = get_module(module_id)
-        if module:
-            config["modules"][module_id] = {
-                "enabled": True,
-                "configuration": {}
-            }
-
-            # Add module entities
-            for entity_name, entity_def in module.base_entities.items():
-                config["entities"][entity_name] = entity_def.copy()
-
-    # Apply customizations from answers
-    for question in template.setup_questions:
-        question_id = question.get("question", "").lower().replace(" ", "_")
-        if question_id in answers:
-            answer = answers[question_id]
-
-            if question.get("module") and question.get("field"):
-                module_id = question["module"]
-                field_name = question["field"]
-
-                if module_id in config["modules"]:
-                    config["modules"][module_id]["configuration"][field_name] = answer
-
-    return config
\ No newline at end of file
+    # Required and suggested modules (with their dependencies) and their entities
+    for module_id in compiled.module_ids:
+        config["modules"][module_id] = {
+            "enabled": True,
+            "configuration": {}
+        }
+    for entity_name, entity_def in compiled.entities:
+        config["entities"][entity_name] = entity_def.copy()
+
+    # Apply customizations from answers (question ids are precomputed)
+    for key, (module_id, field_name) in compiled.answer_fields.items():
+        if key in answers:
+            config["modules"][module_id]["configuration"][field_name] = answers[key]
+
+    return config
@@ -12,15 +12,22 @@ WORKFLOW:
 
 import os
 import json
+import asyncio
+import hashlib
 import pandas as pd
+from collections import OrderedDict
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import openai
 from elasticsearch import Elasticsearch
 
-from ..models.ultra_flexible_templates import get_template, get_module, ALL_MODULES
+from ..models.ultra_flexible_templates import get_template, get_module
 from ..core.config import settings
+from .data_classifier import classify_table, classify_organization
+from .file_loader import stream_data_files
+from .data_cleaning import clean_frame
+from .data_profiler import DataProfiler
 
 
 class DataSource(str, Enum):
@@ -56,11 +63,81 @@ class DataAnalysisResult:
     recommended_config: Dict[str, Any]
 
 
+class LLMResponseCache:
+    """
+    Content-addressed cache of parsed LLM replies
+
+    Keys hash the prompt kind, model and the data the prompt was built from
+    (headers + sample rows), so re-analysing the same files skips the API.
+    Entries live in a bounded in-process LRU and, if a directory is given,
+    on disk so they survive restarts and are shared between workers.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_entries: int = 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(kind: str, model: str, material: Any) -> str:
+        canonical = json.dumps([kind, model, material], sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        if self.directory:
+            try:
+                with open(self._path(key), encoding="utf-8") as f:
+                    value = json.load(f)
+            except (OSError, ValueError):
+                return None
+            self._remember(key, value)
+            return value
+        return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._remember(key, value)
+        if self.directory:
+            tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(value, f, default=str)
+                os.replace(tmp_path, self._path(key))
+            except OSError as e:
+                print(f"Could not persist LLM cache entry {key}: {e}")
+
+    def _remember(self, key: str, value: Dict[str, Any]) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
 class AIDataProcessor:
     """Processes unstructured nonprofit data using AI"""
 
-    def __init__(self):
-        self.openai_client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(
+        self,
+        openai_client: Optional[Any] = None,
+        model: Optional[str] = None,
+        max_concurrent_requests: Optional[int] = None,
+        response_cache: Optional[LLMResponseCache] = None,
+        confidence_threshold: Optional[float] = None
+    ):
+        self.openai_client = openai_client or openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        self.model = model or settings.AI_ANALYSIS_MODEL
+        self.response_cache = response_cache or LLMResponseCache(settings.AI_RESPONSE_CACHE_DIR)
+        self.llm_semaphore = asyncio.Semaphore(max_concurrent_requests or settings.AI_MAX_CONCURRENT_REQUESTS)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Local classifications at or above this skip the LLM
+        self.confidence_threshold = settings.AI_LOCAL_CONFIDENCE_THRESHOLD if confidence_threshold is None else confidence_threshold
         self.es_client = Elasticsearch([settings.ELASTICSEARCH_URL]) if settings.ELASTICSEARCH_URL else None
 
     async def process_client_data(self, client_id: str, uploaded_files: List[Dict]) -> DataAnalysisResult:
@@ -69,14 +146,15 @@ class AIDataProcessor:
         Returns analysis and recommended configuration
         """
 
-        # Step 1: Load and analyze all data files
-        raw_data = await self._load_data_files(uploaded_files)
+        # Step 1: Load all data files; each sheet is classified locally as it arrives
+        # and confidently classified ones are cleaned while later sheets still parse
+        raw_data, local_classifications, prepared = await self._load_and_prepare(uploaded_files)
 
         # Step 2: Use AI to understand organization type and structure
-        org_analysis = await self._analyze_organization_type(raw_data)
+        org_analysis = await self._analyze_organization_type(raw_data, local_classifications)
 
         # Step 3: Extract structured entities from unstructured data
-        extracted_entities = await self._extract_entities(raw_data, org_analysis)
+        extracted_entities = await self._extract_entities(raw_data, org_analysis, local_classifications, prepared)
 
         # Step 4: Map entities to CRM modules
         module_mapping = await self._map_entities_to_modules(extracted_entities, org_analysis)
@@ -97,35 +175,56 @@ class AIDataProcessor:
 
     async def _load_data_files(self, uploaded_files: List[Dict]) -> Dict[str, pd.DataFrame]:
         """Load and parse uploaded files into DataFrames"""
-        raw_data = {}
+        raw_data, _, _ = await self._load_and_prepare(uploaded_files, prepare=False)
+        return raw_data
 
-        for file_info in uploaded_files:
-            file_path = file_info["path"]
-            file_name = file_info["name"]
+    async def _load_and_prepare(
+        self,
+        uploaded_files: List[Dict],
+        prepare: bool = True
+    ) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Dict[str, Any]], Dict[str, asyncio.Task]]:
+        """
+        Stream sheets from the loader pool, starting analysis on each as it arrives
 
-            try:
-                if file_path.endswith(('.xlsx', '.xls')):
-                    # Handle multiple sheets
-                    excel_file = pd.ExcelFile(file_path)
-                    for sheet_name in excel_file.sheet_names:
-                        df = pd.read_excel(file_path, sheet_name=sheet_name)
-                        key = f"{file_name}_{sheet_name}" if len(excel_file.sheet_names) > 1 else file_name
-                        raw_data[key] = df
-
-                elif file_path.endswith('.csv'):
-                    df = pd.read_csv(file_path)
-                    raw_data[file_name] = df
-
-                # TODO: Add support for other formats (JSON, email exports, etc.)
-
-            except Exception as e:
-                print(f"Error loading {file_name}: {e}")
+        Returns:
+            (tables in upload order, local classifications, cleaning tasks for
+            tables confident enough to skip the LLM)
+        """
+        arrived: List[Tuple[int, str, pd.DataFrame]] = []
+        local_classifications: Dict[str, Dict[str, Any]] = {}
+        prepared: Dict[str, asyncio.Task] = {}
+
+        # TODO: Add support for other formats (JSON, email exports, etc.)
+        async for index, table_name, df in stream_data_files(uploaded_files):
+            arrived.append((index, table_name, df))
+            if not prepare or df.empty:
                 continue
-
-        return raw_data
-
-    async def _analyze_organization_type(self, raw_data: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
-        """Use AI to determine organization type from data patterns"""
+            local = classify_table(table_name, df)
+            local_classifications[table_name] = local
+            if local["confidence"] >= self.confidence_threshold:
+                prepared[table_name] = asyncio.create_task(self._clean_and_structure_data(df, local))
+
+        # Upload order (sheets keep workbook order), so results don't depend on parse timing
+        arrived.sort(key=lambda item: item[0])
+        raw_data = {table_name: df for _, table_name, df in arrived}
+        return raw_data, local_classifications, prepared
+
+    def _classify_locally(self, raw_data: Dict[str, pd.DataFrame]) -> Dict[str, Dict[str, Any]]:
+        """Heuristic entity classification of each non-empty table (no API calls)"""
+        return {table_name: classify_table(table_name, df) for table_name, df in raw_data.items() if not df.empty}
+
+    async def _analyze_organization_type(
+        self,
+        raw_data: Dict[str, pd.DataFrame],
+        local_classifications: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Determine organization type from data patterns (LLM only if the local vote is unclear)"""
+
+        if local_classifications is None:
+            local_classifications = self._classify_locally(raw_data)
+        local_analysis = classify_organization(local_classifications)
+        if local_analysis["confidence"] >= self.confidence_threshold:
+            return local_analysis
 
         # Prepare data summary for AI analysis
         data_summary = {}
@@ -158,16 +257,8 @@ class AIDataProcessor:
         }}
         """
 
-        response = await self.openai_client.chat.completions.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.1
-        )
-
-        try:
-            analysis = json.loads(response.choices[0].message.content)
-            return analysis
-        except:
+        analysis = await self._complete_json("organization_type", data_summary, prompt)
+        if analysis is None:
             # Fallback if AI response isn't valid JSON
             return {
                 "type": "nonprofit",
@@ -176,22 +267,35 @@ class AIDataProcessor:
                 "focus_areas": ["community"],
                 "reasoning": "Default fallback analysis"
             }
-
-    async def _extract_entities(self, raw_data: Dict[str, pd.DataFrame], org_analysis: Dict) -> Dict[str, Dict]:
+        return analysis
+
+    async def _extract_entities(
+        self,
+        raw_data: Dict[str, pd.DataFrame],
+        org_analysis: Dict,
+        local_classifications: Optional[Dict[str, Dict[str, Any]]] = None,
+        prepared: Optional[Dict[str, asyncio.Task]] = None
+    ) -> Dict[str, Dict]:
         """Extract structured entities from unstructured data"""
 
         extracted_entities = {}
+        tables = [(table_name, df) for table_name, df in raw_data.items() if not df.empty]
+        local_classifications = local_classifications or {}
+        prepared = prepared or {}
 
-        for table_name, df in raw_data.items():
-            if df.empty:
-                continue
-
-            # Use AI to identify what this data represents
-            entity_analysis = await self._identify_entity_type(table_name, df, org_analysis)
+        # Identify what each table represents (concurrent, LLM calls bounded by llm_semaphore)
+        analyses = await asyncio.gather(*(
+            self._identify_entity_type(table_name, df, org_analysis, local_classifications.get(table_name))
+            for table_name, df in tables
+        ))
 
+        for (table_name, df), entity_analysis in zip(tables, analyses):
             if entity_analysis["entity_type"] != "unknown":
-                # Clean and structure the data
-                cleaned_data = await self._clean_and_structure_data(df, entity_analysis)
+                # Clean and structure the data (already under way for tables classified on arrival)
+                if table_name in prepared:
+                    cleaned_data = await prepared[table_name]
+                else:
+                    cleaned_data = await self._clean_and_structure_data(df, entity_analysis)
 
                 extracted_entities[entity_analysis["entity_type"]] = {
                     "source_table": table_name,
@@ -204,10 +308,20 @@ class AIDataProcessor:
 
         return extracted_entities
 
-    async def _identify_entity_type(self, table_name: str, df: pd.DataFrame, org_analysis: Dict) -> Dict:
-        """Use AI to identify what type of entity this data represents"""
+    async def _identify_entity_type(
+        self,
+        table_name: str,
+        df: pd.DataFrame,
+        org_analysis: Dict,
+        local_classification: Optional[Dict[str, Any]] = None
+    ) -> Dict:
+        """Identify what type of entity this data represents (local classifier first, then AI)"""
+
+        local = local_classification or classify_table(table_name, df)
+        if local["confidence"] >= self.confidence_threshold:
+            return local
 
-        sample_data = df.head(5).to_dict('records') if not df.empty else []
+        sample_data = json.loads(df.head(5).to_json(orient="records", date_format="iso", default_handler=str)) if not df.empty else []
 
         prompt = f"""
         Identify what type of CRM entity this data represents for a {org_analysis['type']} organization.
@@ -240,107 +354,82 @@ class AIDataProcessor:
         }}
         """
 
-        response = await self.openai_client.chat.completions.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.1
-        )
-
-        try:
-            return json.loads(response.choices[0].message.content)
-        except:
+        # Keyed on content, not the table name: the same sheet under another file name is a hit
+        cache_material = {
+            "columns": [str(c) for c in df.columns],
+            "sample": sample_data,
+            "organization_type": org_analysis["type"]
+        }
+        entity_analysis = await self._complete_json("entity_type", cache_material, prompt)
+        if entity_analysis is None:
+            # A low-confidence local guess still beats nothing
+            if local["entity_type"] != "unknown":
+                return local
             return {
                 "entity_type": "unknown",
                 "confidence": 0.0,
                 "field_mapping": {},
                 "reasoning": "Could not parse AI response"
             }
+        return entity_analysis
+
+    async def _complete_json(self, kind: str, cache_material: Any, prompt: str) -> Optional[Dict[str, Any]]:
+        """
+        JSON reply for a prompt, via the content-addressed cache
+
+        Identical concurrent requests share one API call. Unparseable replies
+        return None and are not cached.
+        """
+        key = self.response_cache.key(kind, self.model, cache_material)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            async with self.llm_semaphore:
+                response = await self.openai_client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.1
+                )
+            try:
+                result = json.loads(response.choices[0].message.content)
+            except (TypeError, ValueError):
+                result = None
+            if isinstance(result, dict):
+                self.response_cache.set(key, result)
+            else:
+                result = None
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise; mark retrieved so an unobserved future doesn't warn
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
 
     async def _clean_and_structure_data(self, df: pd.DataFrame, entity_analysis: Dict) -> pd.DataFrame:
         """Clean and standardize data based on entity type"""
 
-        cleaned_df = df.copy()
         field_mapping = entity_analysis.get("field_mapping", {})
 
         # Apply field mapping (rename columns to standard names)
         if field_mapping:
-            cleaned_df = cleaned_df.rename(columns=field_mapping)
-
-        # Entity-specific cleaning
-        entity_type = entity_analysis["entity_type"]
-
-        if entity_type == "contacts":
-            cleaned_df = self._clean_contact_data(cleaned_df)
-        elif entity_type == "donations":
-            cleaned_df = self._clean_donation_data(cleaned_df)
-        elif entity_type == "service_requests":
-            cleaned_df = self._clean_service_request_data(cleaned_df)
-
-        # General cleaning
-        cleaned_df = self._general_data_cleaning(cleaned_df)
-
-        return cleaned_df
-
-    def _clean_contact_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Specific cleaning for contact data"""
-        # Split full names if needed
-        if 'full_name' in df.columns and 'first_name' not in df.columns:
-            df[['first_name', 'last_name']] = df['full_name'].str.split(' ', 1, expand=True)
-
-        # Standardize email format
-        if 'email' in df.columns:
-            df['email'] = df['email'].str.lower().str.strip()
-
-        # Clean phone numbers
-        if 'phone' in df.columns:
-            df['phone'] = df['phone'].astype(str).str.replace(r'[^\d]', '', regex=True)
-
-        return df
-
-    def _clean_donation_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Specific cleaning for donation data"""
-        # Clean monetary amounts
-        money_columns = ['amount', 'donation_amount', 'gift_amount']
-        for col in money_columns:
-            if col in df.columns:
-                df[col] = df[col].astype(str).str.replace(r'[\$,]', '', regex=True)
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-
-        # Standardize dates
-        date_columns = ['date', 'gift_date', 'donation_date']
-        for col in date_columns:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col], errors='coerce')
-
-        return df
-
-    def _clean_service_request_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Specific cleaning for service request data"""
-        # Standardize status values
-        if 'status' in df.columns:
-            status_mapping = {
-                'open': 'Reported',
-                'in progress': 'In Progress',
-                'completed': 'Completed',
-                'closed': 'Completed'
-            }
-            df['status'] = df['status'].str.lower().map(status_mapping).fillna(df['status'])
-
-        return df
-
-    def _general_data_cleaning(self, df: pd.DataFrame) -> pd.DataFrame:
-        """General data cleaning applied to all entities"""
-        # Remove completely empty rows
-        df = df.dropna(how='all')
+            df = df.rename(columns=field_mapping)
 
-        # Strip whitespace from string columns
-        string_columns = df.select_dtypes(include=['object']).columns
-        df[string_columns] = df[string_columns].apply(lambda x: x.str.strip() if x.dtype == "object" else x)
-
-        # Replace empty strings with NaN
-        df = df.replace('', pd.NA)
-
-        return df
+        # Entity-specific and general cleaning in one planned pass over the columns
+        return await asyncio.to_thread(clean_frame, df, entity_analysis["entity_type"])
 
     async def _map_entities_to_modules(self, extracted_entities: Dict, org_analysis: Dict) -> Dict:
         """Map extracted entities to appropriate CRM modules"""
@@ -366,8 +455,9 @@ class AIDataProcessor:
                 suggested_modules.append(module_id)
 
             # Assess data quality
-            quality_score = self._assess_data_quality(entity_data["cleaned_data"])
-            data_quality[entity_name] = quality_score
+            quality_report = await asyncio.to_thread(self._assess_data_quality, entity_data["cleaned_data"])
+            entity_data["quality_report"] = quality_report
+            data_quality[entity_name] = quality_report["quality_score"]
 
         # Add organization type specific modules
         org_type = org_analysis["type"]
@@ -386,23 +476,9 @@ class AIDataProcessor:
             "entity_module_mapping": {k: entity_to_module_mapping.get(k) for k in extracted_entities.keys()}
         }
 
-    def _assess_data_quality(self, df: pd.DataFrame) -> float:
-        """Assess quality of cleaned data (0-1 score)"""
-        if df.empty:
-            return 0.0
-
-        # Calculate completeness (non-null percentage)
-        completeness = 1 - (df.isnull().sum().sum() / (len(df) * len(df.columns)))
-
-        # Calculate uniqueness (for key fields like email)
-        uniqueness = 1.0
-        if 'email' in df.columns:
-            email_uniqueness = df['email'].nunique() / len(df['email'].dropna())
-            uniqueness = min(uniqueness, email_uniqueness)
-
-        # Overall quality score
-        quality_score = (completeness * 0.7) + (uniqueness * 0.3)
-        return min(1.0, max(0.0, quality_score))
+    def _assess_data_quality(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """Quality report of cleaned data (streamed in chunks; quality_score is 0-1)"""
+        return DataProfiler.profile_frame(df).report()
 
     async def _generate_configuration(self, org_analysis: Dict, extracted_entities: Dict, module_mapping: Dict) -> Dict:
         """Generate complete CRM configuration based on analysis"""
@@ -450,7 +526,8 @@ class AIDataProcessor:
                     "source_table": entity_data["source_table"],
                     "field_mapping": entity_data["field_mapping"],
                     "record_count": entity_data["record_count"],
-                    "data_quality": module_mapping["data_quality"].get(entity_name, 0.0)
+                    "data_quality": module_mapping["data_quality"].get(entity_name, 0.0),
+                    "quality_report": entity_data.get("quality_report")
                 }
 
         return config
@@ -13,18 +13,22 @@ PIPELINE:
 3. Client gets login to their fully populated CRM
 """
 
+import io
 import asyncio
 import json
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any
 from dataclasses import dataclass
 import pandas as pd
-from sqlalchemy import create_engine, MetaData, Table, Column, String, Integer, DateTime, Text, Boolean, Numeric
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from elasticsearch import AsyncElasticsearch
 
-from ..core.database import get_client_schema, get_client_es_index, ensure_client_schema, ensure_client_indices
+from ..core.database import get_client_schema, get_client_es_index, ensure_client_indices
 from ..models.ultra_flexible_templates import get_module, get_template
 from .ai_data_processor import DataAnalysisResult
+from .data_cleaning import money_as_float
+from .contact_dedup import DUPLICATE_MODES, EMAIL_KEY_SQL, PHONE_KEY_SQL, dedupe_contacts, email_key, phone_key
+from .schema_provisioner import plan_for_configuration, provision_schema
 
 
 @dataclass
@@ -40,23 +44,50 @@ class CRMDeploymentResult:
     access_url: str
 
 
+def _async_database_url(database_url: str) -> str:
+    """asyncpg form of a PostgreSQL URL"""
+    for prefix in ("postgresql+asyncpg://", "postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if database_url.startswith(prefix):
+            return "postgresql+asyncpg://" + database_url[len(prefix):]
+    return database_url
+
+
 class AutomatedCRMGenerator:
     """Generates complete CRM from AI analysis"""
 
-    def __init__(self, database_url: str, elasticsearch_url: str = None):
-        self.db_engine = create_engine(database_url)
+    def __init__(
+        self,
+        database_url: str,
+        elasticsearch_url: str = None,
+        copy_chunk_size: int = 50000,
+        max_concurrent_imports: int = 4,
+        es_batch_size: int = 2000,
+        es_bulk_concurrency: int = 4
+    ):
+        self.async_engine = create_async_engine(_async_database_url(database_url))
         self.es_client = AsyncElasticsearch([elasticsearch_url]) if elasticsearch_url else None
+        self.copy_chunk_size = copy_chunk_size
+        self.es_batch_size = es_batch_size
+        self.es_bulk_concurrency = es_bulk_concurrency
+        self.import_semaphore = asyncio.Semaphore(max_concurrent_imports)
 
     async def deploy_crm(
         self,
         client_id: str,
         analysis_result: DataAnalysisResult,
-        client_details: Dict[str, str]
+        client_details: Dict[str, str],
+        duplicates: str = "keep"
     ) -> CRMDeploymentResult:
         """
         Main deployment method: create complete CRM from AI analysis
+
+        duplicates: Duplicate contacts - "keep" them (default), "skip" them (first
+            record wins, contacts already stored are dropped) or "merge" them
         """
 
+        if duplicates not in DUPLICATE_MODES:
+            raise ValueError(f"duplicates must be one of: {', '.join(DUPLICATE_MODES)}")
+
         config = analysis_result.recommended_config
 
         # Step 1: Create database schema for client
@@ -67,7 +98,7 @@ class AutomatedCRMGenerator:
             await self._create_client_elasticsearch_indices(client_id, config)
 
         # Step 3: Import cleaned data
-        import_results = await self._import_client_data(client_id, analysis_result)
+        import_results = await self._import_client_data(client_id, analysis_result, duplicates)
 
         # Step 4: Create admin user
         admin_user = await self._create_admin_user(client_id, client_details)
@@ -91,82 +122,13 @@ class AutomatedCRMGenerator:
         )
 
     async def _create_client_database_schema(self, client_id: str, config: Dict[str, Any]):
-        """Create PostgreSQL schema and tables for client"""
+        """Create PostgreSQL schema, tables, constraints and indexes for client in one transaction"""
 
         schema_name = get_client_schema(client_id)
-
-        # Ensure schema exists
-        await ensure_client_schema(client_id)
-
-        metadata = MetaData(schema=schema_name)
-
-        # Create tables for each entity in the configuration
-        for entity_name, entity_config in config["entities"].items():
-            await self._create_entity_table(metadata, entity_name, entity_config)
-
-        # Create the tables
-        metadata.create_all(self.db_engine)
-
-    async def _create_entity_table(self, metadata: MetaData, entity_name: str, entity_config: Dict):
-        """Create a table for a specific entity"""
-
-        columns = [
-            Column('id', UUID(as_uuid=True), primary_key=True),
-            Column('created_at', DateTime, nullable=False),
-            Column('updated_at', DateTime, nullable=True),
-            Column('created_by', String(255), nullable=True),
-        ]
-
-        # Add entity-specific fields
-        for field in entity_config.get("fields", []):
-            column = self._create_column_from_field(field)
-            if column:
-                columns.append(column)
-
-        # Create the table
-        table = Table(entity_name, metadata, *columns)
-        return table
-
-    def _create_column_from_field(self, field: Dict) -> Optional[Column]:
-        """Create SQLAlchemy column from field definition"""
-
-        field_name = field["name"]
-        field_type = field["type"]
-        required = field.get("required", False)
-        max_length = field.get("max_length")
-
-        # Map field types to SQLAlchemy types
-        if field_type == "string":
-            column_type = String(max_length or 255)
-        elif field_type == "email":
-            column_type = String(255)
-        elif field_type == "phone":
-            column_type = String(50)
-        elif field_type == "text":
-            column_type = Text
-        elif field_type == "integer":
-            column_type = Integer
-        elif field_type == "decimal":
-            column_type = Numeric(12, 2)
-        elif field_type == "boolean":
-            column_type = Boolean
-        elif field_type == "datetime":
-            column_type = DateTime
-        elif field_type == "date":
-            column_type = DateTime  # Store as datetime for simplicity
-        elif field_type in ["json", "json_array"]:
-            column_type = JSONB
-        elif field_type == "choice":
-            column_type = String(100)  # Store choice values as strings
-        else:
-            return None  # Skip unknown field types
-
-        return Column(
-            field_name,
-            column_type,
-            nullable=not required,
-            default=field.get("default")
-        )
+        plan = plan_for_configuration(config)
+        async with AsyncSession(self.async_engine) as session:
+            claimed = await provision_schema(session, schema_name, plan)
+        print(f"{'Claimed' if claimed else 'Provisioned'} {schema_name}: {', '.join(plan.tables)}")
 
     async def _create_client_elasticsearch_indices(self, client_id: str, config: Dict[str, Any]):
         """Create Elasticsearch indices for client entities"""
@@ -177,37 +139,90 @@ class AutomatedCRMGenerator:
         entity_types = list(config["entities"].keys())
         await ensure_client_indices(client_id, entity_types)
 
-    async def _import_client_data(self, client_id: str, analysis_result: DataAnalysisResult) -> Dict[str, int]:
-        """Import cleaned data into client's database"""
+    async def _import_client_data(
+        self,
+        client_id: str,
+        analysis_result: DataAnalysisResult,
+        duplicates: str = "keep"
+    ) -> Dict[str, int]:
+        """Import cleaned data into client's database (entities load concurrently)"""
 
-        import_results = {}
         schema_name = get_client_schema(client_id)
+        entities = [
+            (entity_name, entity_data["cleaned_data"])
+            for entity_name, entity_data in analysis_result.detected_entities.items()
+            if not entity_data["cleaned_data"].empty
+        ]
+        counts = await asyncio.gather(*(
+            self._import_entity(client_id, schema_name, entity_name, df, duplicates)
+            for entity_name, df in entities
+        ))
+        return {entity_name: count for (entity_name, _), count in zip(entities, counts)}
 
-        for entity_name, entity_data in analysis_result.detected_entities.items():
+    async def _import_entity(
+        self,
+        client_id: str,
+        schema_name: str,
+        entity_name: str,
+        df: pd.DataFrame,
+        duplicates: str = "keep"
+    ) -> int:
+        """Import one entity; bounded by the import semaphore"""
+
+        async with self.import_semaphore:
             try:
-                # Get cleaned data
-                df = entity_data["cleaned_data"]
-                if df.empty:
-                    continue
+                if entity_name == "contacts" and duplicates != "keep":
+                    # Collapse duplicates within the data, then drop contacts already stored
+                    df, _ = await asyncio.to_thread(dedupe_contacts, df, duplicates == "merge")
+                    df = await self._drop_existing_contacts(schema_name, df)
 
                 # Add required fields
                 df = self._add_required_fields(df)
 
-                # Import to PostgreSQL
+                # Import to PostgreSQL and Elasticsearch (optional) in parallel
                 table_name = f"{schema_name}.{entity_name}"
-                records_imported = await self._import_to_postgres(df, table_name)
-
-                # Import to Elasticsearch (optional)
-                if self.es_client:
-                    await self._import_to_elasticsearch(client_id, entity_name, df)
+                records_imported, _ = await asyncio.gather(
+                    self._import_to_postgres(df, table_name),
+                    self._import_to_elasticsearch(client_id, entity_name, df)
+                )
 
-                import_results[entity_name] = records_imported
+                return records_imported
 
             except Exception as e:
                 print(f"Error importing {entity_name}: {e}")
-                import_results[entity_name] = 0
-
-        return import_results
+                return 0
+
+    async def _drop_existing_contacts(self, schema_name: str, df: pd.DataFrame, batch_size: int = 10000) -> pd.DataFrame:
+        """Rows whose email/phone key doesn't match a contact already in the table"""
+
+        keys = {"email": (email_key, EMAIL_KEY_SQL), "phone": (phone_key, PHONE_KEY_SQL)}
+        existing = pd.Series(False, index=df.index)
+        async with self.async_engine.connect() as conn:
+            result = await conn.execute(
+                text(
+                    "SELECT column_name FROM information_schema.columns "
+                    "WHERE table_schema = :schema AND table_name = 'contacts'"
+                ),
+                {"schema": schema_name}
+            )
+            table_columns = {row[0] for row in result}
+            for column, (key_function, key_sql) in keys.items():
+                if column not in df.columns or column not in table_columns:
+                    continue
+                values = key_function(df[column])
+                distinct = values.dropna().unique().tolist()
+                # Same expression as the index, so each batch is an index lookup
+                expression = key_sql.format(column=column)
+                found = set()
+                for start in range(0, len(distinct), batch_size):
+                    result = await conn.execute(
+                        text(f"SELECT DISTINCT {expression} FROM {schema_name}.contacts WHERE {expression} = ANY(:keys)"),
+                        {"keys": distinct[start:start + batch_size]}
+                    )
+                    found.update(row[0] for row in result)
+                if found:
+                    existing |= values.isin(found).fillna(False).astype(bool)
+        return df[~existing]
 
     def _add_required_fields(self, df: pd.DataFrame) -> pd.DataFrame:
         """Add required fields to DataFrame before import"""
@@ -224,52 +239,96 @@ class AutomatedCRMGenerator:
         return df
 
     async def _import_to_postgres(self, df: pd.DataFrame, table_name: str) -> int:
-        """Import DataFrame to PostgreSQL table"""
+        """Import DataFrame to PostgreSQL table via COPY (CSV buffers, chunked)"""
+
+        schema, table = table_name.split('.')
 
         try:
-            # Use pandas to_sql for bulk import
-            df.to_sql(
-                table_name.split('.')[-1],  # table name without schema
-                self.db_engine,
-                schema=table_name.split('.')[0],  # schema name
-                if_exists='append',
-                index=False,
-                method='multi'
-            )
-            return len(df)
+            async with self.async_engine.connect() as conn:
+                result = await conn.execute(
+                    text(
+                        "SELECT column_name FROM information_schema.columns "
+                        "WHERE table_schema = :schema AND table_name = :table"
+                    ),
+                    {"schema": schema, "table": table}
+                )
+                table_columns = {row[0] for row in result}
+                columns = [c for c in df.columns if c in table_columns]
+
+                raw = await conn.get_raw_connection()
+                copy = raw.driver_connection.copy_to_table
+                imported = 0
+                for start in range(0, len(df), self.copy_chunk_size):
+                    chunk = df.iloc[start:start + self.copy_chunk_size]
+                    # CSV encoding is CPU-bound; keep it off the event loop
+                    buffer = await asyncio.to_thread(self._copy_buffer, chunk, columns)
+                    await copy(table, schema_name=schema, source=buffer, columns=columns, format='csv')
+                    imported += len(chunk)
+                await conn.commit()
+                return imported
 
         except Exception as e:
             print(f"Error importing to PostgreSQL: {e}")
             return 0
 
+    def _copy_buffer(self, df: pd.DataFrame, columns: List[str]) -> io.BytesIO:
+        """Encode rows as COPY CSV (empty unquoted field = NULL)"""
+
+        frame = df[columns].copy()
+        for column in columns:
+            values = frame[column]
+            if pd.api.types.is_float_dtype(values):
+                present = values.dropna()
+                if len(present) and (present % 1 == 0).all():
+                    # Integer columns with gaps are read as float; COPY rejects "12.0" for integers
+                    frame[column] = values.astype("Int64")
+            elif values.dtype == object and values.map(lambda v: isinstance(v, (dict, list))).any():
+                frame[column] = values.map(lambda v: json.dumps(v, default=str) if isinstance(v, (dict, list)) else v)
+        buffer = io.BytesIO()
+        frame.to_csv(buffer, index=False, header=False, date_format='%Y-%m-%dT%H:%M:%S.%f')
+        buffer.seek(0)
+        return buffer
+
     async def _import_to_elasticsearch(self, client_id: str, entity_name: str, df: pd.DataFrame) -> int:
-        """Import DataFrame to Elasticsearch"""
+        """Import DataFrame to Elasticsearch (row batches, bounded concurrent bulk requests)"""
 
         if not self.es_client:
             return 0
 
+        index_name = get_client_es_index(client_id, entity_name)
+        semaphore = asyncio.Semaphore(self.es_bulk_concurrency)
+
+        async def send(start: int) -> int:
+            async with semaphore:
+                batch = df.iloc[start:start + self.es_batch_size]
+                # Serialise the batch column-wise in a worker thread
+                documents = await asyncio.to_thread(self._es_documents, batch)
+                operations = []
+                for document in documents:
+                    operations.append({"index": {"_index": index_name, "_id": document["id"]}})
+                    operations.append(document)
+                response = await self.es_client.bulk(operations=operations)
+                if not response.get("errors"):
+                    return len(documents)
+                return sum(1 for item in response["items"] if item["index"].get("status", 500) < 300)
+
         try:
-            index_name = get_client_es_index(client_id, entity_name)
-
-            # Prepare documents for bulk import
-            docs = []
-            for _, row in df.iterrows():
-                doc = {
-                    "_index": index_name,
-                    "_id": row['id'],
-                    "_source": row.to_dict()
-                }
-                docs.append(doc)
-
-            # Bulk import
-            from elasticsearch.helpers import async_bulk
-            success_count, _ = await async_bulk(self.es_client, docs)
-            return success_count
+            counts = await asyncio.gather(*(
+                send(start) for start in range(0, len(df), self.es_batch_size)
+            ))
+            return sum(counts)
 
         except Exception as e:
             print(f"Error importing to Elasticsearch: {e}")
             return 0
 
+    def _es_documents(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """JSON-safe documents: NaN/NaT -> null, timestamps -> ISO strings, numpy -> Python"""
+
+        # Decimals would serialize as strings and be mapped as text
+        df = money_as_float(df)
+        return json.loads(df.to_json(orient="records", date_format="iso", default_handler=str))
+
     async def _create_admin_user(self, client_id: str, client_details: Dict[str, str]) -> Dict[str, str]:
         """Create admin user for the client"""
 
@@ -14,6 +14,7 @@ import logging
 from ..core.database import get_client_schema
 from ..models.platform import Client, ClientUser, ClientProject
 from ..core.auth import hash_password
+from .schema_provisioner import plan_for_modules, provision_schema
 
 
 logger = logging.getLogger(__name__)
@@ -102,190 +103,11 @@ class BasicCRMGenerator:
         return client
 
     async def _create_client_schema(self, schema_name: str, modules: List[str]):
-        """Create database schema and tables for client"""
+        """Create database schema and tables for client (one transaction, or a pooled schema)"""
 
-        # Create schema
-        await self.db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema_name}"))
-
-        # Create core tables for each module
-        for module in modules:
-            await self._create_module_tables(schema_name, module)
-
-        await self.db.commit()
-
-    async def _create_module_tables(self, schema_name: str, module: str):
-        """Create tables for a specific module"""
-
-        table_definitions = {
-            'contacts': f'''
-                CREATE TABLE IF NOT EXISTS {schema_name}.contacts (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    first_name VARCHAR(100),
-                    last_name VARCHAR(100),
-                    email VARCHAR(255),
-                    phone VARCHAR(50),
-                    organization VARCHAR(255),
-                    title VARCHAR(100),
-                    address TEXT,
-                    city VARCHAR(100),
-                    state VARCHAR(50),
-                    zip VARCHAR(20),
-                    country VARCHAR(100) DEFAULT 'USA',
-                    notes TEXT,
-                    tags TEXT[],
-                    status VARCHAR(50) DEFAULT 'active',
-                    source VARCHAR(100),
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    updated_at TIMESTAMP DEFAULT NOW()
-                );
-
-                CREATE INDEX IF NOT EXISTS idx_contacts_email ON {schema_name}.contacts(email);
-                CREATE INDEX IF NOT EXISTS idx_contacts_name ON {schema_name}.contacts(last_name, first_name);
-                CREATE INDEX IF NOT EXISTS idx_contacts_organization ON {schema_name}.contacts(organization);
-            ''',
-
-            'donations': f'''
-                CREATE TABLE IF NOT EXISTS {schema_name}.donations (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    contact_id UUID REFERENCES {schema_name}.contacts(id),
-                    donor_name VARCHAR(255),
-                    donor_email VARCHAR(255),
-                    amount DECIMAL(10,2) NOT NULL,
-                    donation_date DATE NOT NULL,
-                    campaign VARCHAR(255),
-                    fund VARCHAR(255),
-                    method VARCHAR(100),
-                    reference_number VARCHAR(100),
-                    notes TEXT,
-                    status VARCHAR(50) DEFAULT 'completed',
-                    tax_deductible BOOLEAN DEFAULT true,
-                    acknowledged BOOLEAN DEFAULT false,
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    updated_at TIMESTAMP DEFAULT NOW()
-                );
-
-                CREATE INDEX IF NOT EXISTS idx_donations_contact ON {schema_name}.donations(contact_id);
-                CREATE INDEX IF NOT EXISTS idx_donations_date ON {schema_name}.donations(donation_date);
-                CREATE INDEX IF NOT EXISTS idx_donations_campaign ON {schema_name}.donations(campaign);
-            ''',
-
-            'events': f'''
-                CREATE TABLE IF NOT EXISTS {schema_name}.events (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    name VARCHAR(255) NOT NULL,
-                    description TEXT,
-                    event_date DATE,
-                    start_time TIME,
-                    end_time TIME,
-                    location VARCHAR(255),
-                    address TEXT,
-                    capacity INTEGER,
-                    registered_count INTEGER DEFAULT 0,
-                    price DECIMAL(8,2) DEFAULT 0,
-                    status VARCHAR(50) DEFAULT 'planned',
-                    category VARCHAR(100),
-                    notes TEXT,
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    updated_at TIMESTAMP DEFAULT NOW()
-                );
-
-                CREATE TABLE IF NOT EXISTS {schema_name}.event_registrations (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    event_id UUID REFERENCES {schema_name}.events(id),
-                    contact_id UUID REFERENCES {schema_name}.contacts(id),
-                    registration_date TIMESTAMP DEFAULT NOW(),
-                    status VARCHAR(50) DEFAULT 'registered',
-                    notes TEXT,
-                    created_at TIMESTAMP DEFAULT NOW()
-                );
-
-                CREATE INDEX IF NOT EXISTS idx_events_date ON {schema_name}.events(event_date);
-                CREATE INDEX IF NOT EXISTS idx_registrations_event ON {schema_name}.event_registrations(event_id);
-            ''',
-
-            'volunteers': f'''
-                CREATE TABLE IF NOT EXISTS {schema_name}.volunteers (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    contact_id UUID REFERENCES {schema_name}.contacts(id),
-                    volunteer_name VARCHAR(255),
-                    email VARCHAR(255),
-                    phone VARCHAR(50),
-                    skills TEXT[],
-                    availability TEXT,
-                    hours_logged DECIMAL(8,2) DEFAULT 0,
-                    status VARCHAR(50) DEFAULT 'active',
-                    background_check BOOLEAN DEFAULT false,
-                    emergency_contact VARCHAR(255),
-                    notes TEXT,
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    updated_at TIMESTAMP DEFAULT NOW()
-                );
-
-                CREATE TABLE IF NOT EXISTS {schema_name}.volunteer_hours (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    volunteer_id UUID REFERENCES {schema_name}.volunteers(id),
-                    activity VARCHAR(255),
-                    hours DECIMAL(4,2) NOT NULL,
-                    date DATE NOT NULL,
-                    notes TEXT,
-                    approved BOOLEAN DEFAULT false,
-                    created_at TIMESTAMP DEFAULT NOW()
-                );
-
-                CREATE INDEX IF NOT EXISTS idx_volunteers_contact ON {schema_name}.volunteers(contact_id);
-                CREATE INDEX IF NOT EXISTS idx_volunteer_hours_volunteer ON {schema_name}.volunteer_hours(volunteer_id);
-            ''',
-
-            'grants': f'''
-                CREATE TABLE IF NOT EXISTS {schema_name}.grants (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    name VARCHAR(255) NOT NULL,
-                    funder VARCHAR(255),
-                    amount DECIMAL(12,2),
-                    purpose TEXT,
-                    application_date DATE,
-                    decision_date DATE,
-                    start_date DATE,
-                    end_date DATE,
-                    status VARCHAR(50) DEFAULT 'researching',
-                    probability INTEGER DEFAULT 0,
-                    notes TEXT,
-                    documents TEXT[],
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    updated_at TIMESTAMP DEFAULT NOW()
-                );
-
-                CREATE INDEX IF NOT EXISTS idx_grants_status ON {schema_name}.grants(status);
-                CREATE INDEX IF NOT EXISTS idx_grants_decision_date ON {schema_name}.grants(decision_date);
-            ''',
-
-            'services': f'''
-                CREATE TABLE IF NOT EXISTS {schema_name}.service_requests (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    contact_id UUID REFERENCES {schema_name}.contacts(id),
-                    title VARCHAR(255) NOT NULL,
-                    description TEXT,
-                    category VARCHAR(100),
-                    priority VARCHAR(50) DEFAULT 'medium',
-                    status VARCHAR(50) DEFAULT 'open',
-                    assigned_to VARCHAR(255),
-                    requested_date DATE DEFAULT CURRENT_DATE,
-                    completed_date DATE,
-                    location VARCHAR(255),
-                    notes TEXT,
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    updated_at TIMESTAMP DEFAULT NOW()
-                );
-
-                CREATE INDEX IF NOT EXISTS idx_service_requests_contact ON {schema_name}.service_requests(contact_id);
-                CREATE INDEX IF NOT EXISTS idx_service_requests_status ON {schema_name}.service_requests(status);
-            '''
-        }
-
-        if module in table_definitions:
-            await self.db.execute(text(table_definitions[module]))
-        else:
-            logger.warning(f"No table definition found for module: {module}")
+        plan = plan_for_modules(tuple(modules))
+        claimed = await provision_schema(self.db, schema_name, plan)
+        logger.info(f"{'Claimed' if claimed else 'Provisioned'} {schema_name} with {', '.join(plan.tables)}")
 
     async def _create_admin_user(self, client_id: uuid.UUID, client_data: Dict[str, Any]) -> ClientUser:
         """Create the first admin user for the client"""
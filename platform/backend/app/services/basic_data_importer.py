@@ -7,17 +7,27 @@ For complex AI-powered import, see ai_data_processor.py
 import pandas as pd
 import os
 import uuid
-from typing import Dict, List, Any, Optional, Tuple
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple, AsyncIterator, Awaitable, Callable
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
+from sqlalchemy import text, select
 import asyncio
 import logging
 
 from ..core.database import get_client_schema
+from ..models.platform import ClientProject
+from .bulk_loader import BulkLoader
+from .contact_dedup import EMAIL_KEY_SQL, PHONE_KEY_SQL, contact_dedup_ddl, dedupe_contacts
+from .contact_search import contact_columns, contact_search_ddl
+from .dashboard_stats import STATS_TABLES, ensure_dashboard_stats
+from .data_profiler import DataProfiler
 
 
 logger = logging.getLogger(__name__)
 
+# Rows per streamed chunk (one load transaction each)
+DEFAULT_CHUNK_SIZE = 50000
+
 
 class BasicDataImporter:
     """Simple data importer for MVP - handles clean CSV files only"""
@@ -30,59 +40,107 @@ class BasicDataImporter:
         client_id: str,
         file_path: str,
         table_name: str,
-        field_mappings: Dict[str, str]
+        field_mappings: Dict[str, str],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        project_id: Optional[str] = None,
+        duplicates: str = "keep"
     ) -> Dict[str, Any]:
         """
         Import a clean CSV file to client CRM
 
+        The file is streamed in chunks: the next chunk is parsed while the
+        current one is written, so memory stays flat regardless of file size.
+
         Args:
             client_id: Client UUID
             file_path: Path to CSV file
             table_name: Target table (contacts, donations, events, etc.)
             field_mappings: Map of CSV columns to database fields
+            chunk_size: Rows per chunk (one load transaction each)
+            project_id: ClientProject to report progress to (defaults to the client's latest)
+            duplicates: Duplicate contacts - "keep" them (default), "skip" them (first record
+                wins) or "merge" them (gaps filled from the duplicates)
 
         Returns:
             Import result with success/failure details
         """
+        project = None
         try:
             # Validate file exists
             if not os.path.exists(file_path):
                 raise FileNotFoundError(f"File not found: {file_path}")
 
-            # Read CSV file
-            df = pd.read_csv(file_path)
+            # Get client schema
+            schema_name = get_client_schema(client_id)
+
+            # Ensure target table exists
+            await self._ensure_table_exists(schema_name, table_name)
+
+            estimated_rows = self._estimate_row_count(file_path)
+            project = await self._get_project(client_id, project_id)
+            await self._report_progress(project, table_name, "running", 0, estimated_rows)
+
+            async def on_batch(loader: BulkLoader, rows_processed: int) -> None:
+                await self._report_progress(
+                    project, table_name, "running", rows_processed,
+                    max(estimated_rows, rows_processed), loader.summary()
+                )
+
+            # Map and import data chunk by chunk, profiling quality as it streams
+            profiler = DataProfiler()
+            load_result = await self._import_records(
+                schema_name,
+                table_name,
+                self._iter_csv_chunks(file_path, field_mappings, chunk_size),
+                on_batch=on_batch,
+                profiler=profiler,
+                duplicates=duplicates
+            )
+            data_quality = profiler.report()
+            records_processed = load_result["rows_processed"]
 
-            if len(df) == 0:
+            if records_processed == 0:
+                await self._report_progress(project, table_name, "failed", 0, 0)
                 return {
                     "success": False,
                     "error": "CSV file is empty",
                     "records_processed": 0
                 }
 
-            # Clean and map the data
-            mapped_data = self._map_csv_data(df, field_mappings)
-
-            # Get client schema
-            schema_name = get_client_schema(client_id)
-
-            # Ensure target table exists
-            await self._ensure_table_exists(schema_name, table_name)
-
-            # Import data
-            records_imported = await self._import_records(
-                schema_name, table_name, mapped_data
+            await self._report_progress(
+                project, table_name, "completed", records_processed, records_processed,
+                {**load_result, "quality_score": data_quality["quality_score"]}
             )
 
             return {
                 "success": True,
-                "records_processed": len(df),
-                "records_imported": records_imported,
+                "records_processed": records_processed,
+                "records_imported": load_result["rows_loaded"],
+                "records_rejected": load_result["rows_rejected"],
+                "rejected_rows": load_result["rejected_rows"],
+                "load_stats": {
+                    "method": load_result["method"],
+                    "seconds": load_result["seconds"],
+                    "rows_per_sec": load_result["rows_per_sec"],
+                    "duplicates_skipped": load_result["rows_skipped_duplicates"],
+                    "existing_matched": load_result["rows_matched_existing"],
+                    "ignored_columns": load_result["ignored_columns"]
+                },
+                "data_quality": data_quality,
+                "deduplication": load_result["deduplication"],
                 "table_name": table_name,
                 "schema_name": schema_name
             }
 
         except Exception as e:
             logger.error(f"Error importing CSV for client {client_id}: {str(e)}")
+            try:
+                await self.db.rollback()
+                if project is not None:
+                    await self.db.refresh(project)
+                await self._report_progress(project, table_name, "failed", None, None, {"error": str(e)})
+            except Exception:
+                pass
             return {
                 "success": False,
                 "error": str(e),
@@ -90,37 +148,118 @@ class BasicDataImporter:
                 "records_imported": 0
             }
 
-    def _map_csv_data(self, df: pd.DataFrame, field_mappings: Dict[str, str]) -> List[Dict[str, Any]]:
-        """Map CSV columns to database fields"""
-
-        mapped_records = []
-
-        for _, row in df.iterrows():
-            mapped_record = {}
-
-            # Add ID field
-            mapped_record['id'] = str(uuid.uuid4())
-
-            # Map fields according to mapping
-            for csv_column, db_field in field_mappings.items():
-                if csv_column in df.columns:
-                    value = row[csv_column]
+    async def _iter_csv_chunks(
+        self,
+        file_path: str,
+        field_mappings: Dict[str, str],
+        chunk_size: int
+    ) -> AsyncIterator[pd.DataFrame]:
+        """Yield mapped chunks; the next chunk is parsed in a worker thread meanwhile"""
+
+        # Header only: read just the mapped columns, all as text (the loader
+        # stages text and PostgreSQL casts, so inference is wasted work and
+        # would drop leading zeros from zips/phones)
+        header = pd.read_csv(file_path, nrows=0)
+        usecols = [c for c in header.columns if c in field_mappings]
+        if not usecols:
+            return
+        reader = pd.read_csv(
+            file_path,
+            usecols=usecols,
+            dtype={c: str for c in usecols},
+            chunksize=chunk_size
+        )
+        try:
+            pending = asyncio.create_task(asyncio.to_thread(next, reader, None))
+            while True:
+                chunk = await pending
+                if chunk is None:
+                    break
+                pending = asyncio.create_task(asyncio.to_thread(next, reader, None))
+                yield self._map_csv_data(chunk, field_mappings)
+        finally:
+            if not pending.done():
+                await asyncio.wait([pending])
+            reader.close()
+
+    def _estimate_row_count(self, file_path: str, sample_bytes: int = 65536) -> int:
+        """Estimate data rows from file size and the average line length of the head"""
+
+        size = os.path.getsize(file_path)
+        with open(file_path, 'rb') as f:
+            head = f.read(sample_bytes)
+        lines = head.count(b'\n') + (0 if head.endswith(b'\n') or not head else 1)
+        if len(head) >= size:
+            return max(lines - 1, 0)
+        return max(int(size / (len(head) / max(lines, 1))) - 1, 0)
+
+    async def _get_project(self, client_id: str, project_id: Optional[str]) -> Optional[ClientProject]:
+        """Project record that receives import progress"""
+
+        if project_id:
+            return await self.db.get(ClientProject, uuid.UUID(str(project_id)))
+        result = await self.db.execute(
+            select(ClientProject)
+            .where(ClientProject.client_id == uuid.UUID(str(client_id)))
+            .order_by(ClientProject.created_at.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def _report_progress(
+        self,
+        project: Optional[ClientProject],
+        table_name: str,
+        import_status: str,
+        rows_processed: Optional[int],
+        estimated_rows: Optional[int],
+        details: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Record import progress in the project's configuration_data"""
+
+        if project is None:
+            return
+        configuration = dict(project.configuration_data or {})
+        imports = dict(configuration.get("imports") or {})
+        entry = dict(imports.get(table_name) or {})
+        entry["status"] = import_status
+        if rows_processed is not None:
+            entry["rows_processed"] = rows_processed
+            entry["estimated_rows"] = estimated_rows
+            entry["percent"] = 100 if import_status == "completed" else (
+                min(99, int(rows_processed * 100 / estimated_rows)) if estimated_rows else 0
+            )
+        if details:
+            entry.update({k: v for k, v in details.items() if k in (
+                "rows_loaded", "rows_rejected", "rows_per_sec", "seconds", "quality_score", "error"
+            )})
+        entry["updated_at"] = datetime.utcnow().isoformat()
+        imports[table_name] = entry
+        configuration["imports"] = imports
+        # Reassign so SQLAlchemy sees the JSON change
+        project.configuration_data = configuration
+        await self.db.commit()
 
-                    # Basic data cleaning
-                    if pd.isna(value):
-                        mapped_record[db_field] = None
-                    elif isinstance(value, str):
-                        mapped_record[db_field] = value.strip()
-                    else:
-                        mapped_record[db_field] = value
+    def _map_csv_data(self, df: pd.DataFrame, field_mappings: Dict[str, str]) -> pd.DataFrame:
+        """Map CSV columns to database fields (column-wise, no per-row objects)"""
 
-            # Add timestamps
-            mapped_record['created_at'] = 'NOW()'
-            mapped_record['updated_at'] = 'NOW()'
+        present = {csv_column: db_field for csv_column, db_field in field_mappings.items()
+                   if csv_column in df.columns}
+        mapped = df[list(present)].rename(columns=present)
+        # Several CSV columns mapped to one field: the last mapping wins
+        mapped = mapped.loc[:, ~mapped.columns.duplicated(keep="last")].copy()
 
-            mapped_records.append(mapped_record)
+        # Basic data cleaning
+        for column in mapped.columns:
+            values = mapped[column]
+            if pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+                stripped = values.str.strip()
+                # Non-string cells in object columns keep their value
+                mapped[column] = stripped.where(stripped.notna(), values)
 
-        return mapped_records
+        # ids come from the table default (gen_random_uuid) in the bulk INSERT ... SELECT;
+        # created_at/updated_at are set by the loader
+        return mapped
 
     async def _ensure_table_exists(self, schema_name: str, table_name: str):
         """Ensure the target table exists with basic structure"""
@@ -197,60 +336,88 @@ class BasicDataImporter:
 
         # Create schema if it doesn't exist
         await self.db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema_name}"))
+        existed = (await self.db.execute(
+            text("SELECT to_regclass(:table_name) IS NOT NULL"),
+            {"table_name": f"{schema_name}.{table_name}"}
+        )).scalar()
 
         # Create table
         create_sql = table_schemas[table_name].format(schema=schema_name, table=table_name)
         await self.db.execute(text(create_sql))
         await self.db.commit()
 
+        if table_name == 'contacts':
+            # Full-text/trigram search column and indexes, only on a table created just now:
+            # on a populated one the generated column would rewrite it (see the migration)
+            if not existed:
+                columns = await contact_columns(self.db, schema_name)
+                for statement in contact_search_ddl(schema_name, columns):
+                    await self.db.execute(text(statement))
+            # Match-key indexes for duplicate detection against existing contacts
+            for statement in contact_dedup_ddl(schema_name):
+                await self.db.execute(text(statement))
+            await self.db.commit()
+
+        # Dashboard counters (triggers) before any rows are loaded
+        if table_name in STATS_TABLES:
+            await ensure_dashboard_stats(self.db, schema_name, force=True)
+
     async def _import_records(
         self,
         schema_name: str,
         table_name: str,
-        records: List[Dict[str, Any]]
-    ) -> int:
-        """Import records to database"""
-
-        if not records:
-            return 0
-
-        # Get field names from first record (excluding timestamps)
-        sample_record = records[0]
-        field_names = [k for k in sample_record.keys() if k not in ['created_at', 'updated_at']]
-
-        # Build INSERT query
-        placeholders = ', '.join([f':{field}' for field in field_names])
-        fields_str = ', '.join(field_names)
-
-        insert_sql = f"""
-            INSERT INTO {schema_name}.{table_name}
-            ({fields_str}, created_at, updated_at)
-            VALUES ({placeholders}, NOW(), NOW())
+        batches: AsyncIterator[pd.DataFrame],
+        on_batch: Optional[Callable[[BulkLoader, int], Awaitable[None]]] = None,
+        profiler: Optional[DataProfiler] = None,
+        duplicates: str = "keep"
+    ) -> Dict[str, Any]:
         """
+        Import mapped batches to database via the staging-table bulk loader
 
-        # Insert records in batches
-        batch_size = 100
-        total_imported = 0
-
-        for i in range(0, len(records), batch_size):
-            batch = records[i:i + batch_size]
-
-            for record in batch:
-                # Remove timestamp fields since we're adding them in SQL
-                record_data = {k: v for k, v in record.items()
-                             if k not in ['created_at', 'updated_at']}
-
-                try:
-                    await self.db.execute(text(insert_sql), record_data)
-                    total_imported += 1
-                except Exception as e:
-                    logger.warning(f"Failed to insert record: {str(e)}")
-                    # Continue with other records
-
-            # Commit batch
-            await self.db.commit()
+        Contacts are deduplicated within each batch (exact email/phone keys
+        plus fuzzy names) and matched against existing rows by email/phone
+        key, unless duplicates is "keep".
+        """
 
-        return total_imported
+        dedupe = table_name == 'contacts' and duplicates != "keep"
+        merge = duplicates == "merge"
+        if dedupe:
+            loader = BulkLoader(
+                self.db, schema_name, table_name,
+                match_keys={"email": EMAIL_KEY_SQL, "phone": PHONE_KEY_SQL},
+                merge_matches=merge
+            )
+        else:
+            loader = BulkLoader(self.db, schema_name, table_name)
+        dedup_stats = {"exact_matches": 0, "fuzzy_matches": 0, "duplicates": 0}
+        rows_processed = 0
+        async for frame in batches:
+            records = frame
+            if dedupe:
+                records, stats = await asyncio.to_thread(dedupe_contacts, frame, merge)
+                for key in dedup_stats:
+                    dedup_stats[key] += stats[key]
+            if profiler is not None:
+                # Profile the raw batch in a worker thread while it is written
+                await asyncio.gather(loader.load_frame(records), asyncio.to_thread(profiler.update, frame))
+            else:
+                await loader.load_frame(records)
+            rows_processed += len(frame)
+            if on_batch is not None:
+                await on_batch(loader, rows_processed)
+        summary = loader.summary()
+        return {
+            **summary,
+            "rows_processed": rows_processed,
+            "deduplication": {
+                "mode": duplicates if table_name == 'contacts' else "keep",
+                "in_file_duplicates": dedup_stats["duplicates"],
+                "exact_matches": dedup_stats["exact_matches"],
+                "fuzzy_matches": dedup_stats["fuzzy_matches"],
+                "existing_matches": summary["rows_matched_existing"],
+                "merged": merge
+            }
+        }
 
     async def preview_csv_import(
         self,
@@ -267,7 +434,8 @@ class BasicDataImporter:
             df = pd.read_csv(file_path, nrows=10)
 
             # Apply mapping
-            mapped_preview = self._map_csv_data(df, field_mappings)
+            mapped = self._map_csv_data(df, field_mappings)
+            mapped_preview = mapped.astype(object).where(mapped.notna(), None).to_dict(orient="records")
 
             # Get column info
             column_info = []
@@ -378,9 +546,12 @@ async def import_csv_for_client(
     client_id: str,
     file_path: str,
     table_name: str,
-    field_mappings: Dict[str, str]
+    field_mappings: Dict[str, str],
+    duplicates: str = "keep"
 ) -> Dict[str, Any]:
     """Convenience function for importing CSV files"""
 
     importer = BasicDataImporter(db)
-    return await importer.import_csv_file(client_id, file_path, table_name, field_mappings)
\ No newline at end of file
+    return await importer.import_csv_file(
+        client_id, file_path, table_name, field_mappings, duplicates=duplicates
+    )
\ No newline at end of file
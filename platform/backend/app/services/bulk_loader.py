@@ -0,0 +1,390 @@
+"""
+Bulk Load Service
+Loads record batches into client tables through a per-batch staging table
+Uses asyncpg COPY when available, multi-row INSERT otherwise; rejects are reported per row
+"""
+
+import time
+import uuid
+import hashlib
+from typing import Dict, List, Any, Optional, Sequence, Iterable
+import numpy as np
+import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+# Staging values are TEXT. Columns of any other type are validated by casting
+# each value through a safe-cast function (NULL where the cast raises), so every
+# rule of PostgreSQL's own input functions applies and a bad value rejects its
+# row instead of aborting the batch
+TEXT_TYPES = ("text", "varchar", "bpchar", "name", "citext")
+
+# Reject labels for common types (others use the type name)
+TYPE_LABELS = {
+    "int2": "integer",
+    "int4": "integer",
+    "int8": "integer",
+    "numeric": "number",
+    "float4": "number",
+    "float8": "number",
+    "date": "date",
+    "timestamp": "timestamp",
+    "timestamptz": "timestamp",
+    "time": "time",
+    "uuid": "uuid",
+    "bool": "boolean",
+}
+
+# Slash dates are read month first whatever the server's DateStyle (batch transaction only)
+LOAD_DATESTYLE = "ISO, MDY"
+
+# Columns filled by the loader itself
+TIMESTAMP_COLUMNS = ("created_at", "updated_at")
+
+# Bind parameter budget per multi-row INSERT (PostgreSQL limit is 32767)
+MAX_BIND_PARAMS = 30000
+
+
+def _as_text(series: pd.Series) -> np.ndarray:
+    """Column -> object array of str/None, as the staging table expects"""
+    if pd.api.types.is_float_dtype(series):
+        values = series.dropna()
+        if len(values) and (values % 1 == 0).all():
+            # Integer columns with gaps are read as float; don't stage "12.0"
+            series = series.astype("Int64")
+    text_values = series.astype(str).to_numpy(dtype=object)
+    text_values[series.isna().to_numpy()] = None
+    return text_values
+
+
+class BulkLoader:
+    """Stage -> validate -> INSERT ... SELECT loader for one client table"""
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        schema_name: str,
+        table_name: str,
+        max_reported_rejects: int = 1000,
+        match_keys: Optional[Dict[str, str]] = None,
+        merge_matches: bool = False
+    ):
+        """
+        Args:
+            match_keys: column -> SQL key expression ("{column}" placeholder);
+                staged rows whose key equals an existing row's are not inserted
+            merge_matches: fill empty columns of the matched rows from the staged ones
+        """
+        self.db = db
+        self.schema_name = schema_name
+        self.table_name = table_name
+        self.max_reported_rejects = max_reported_rejects
+        self.match_keys = match_keys or {}
+        self.merge_matches = merge_matches
+        self.method: Optional[str] = None
+        self.rows_loaded = 0
+        self.rows_rejected = 0
+        self.rows_skipped = 0
+        self.rows_matched = 0
+        self.rejects: List[Dict[str, Any]] = []
+        self.ignored_columns: List[str] = []
+        self.seconds = 0.0
+        self._columns: Optional[Dict[str, Dict[str, Any]]] = None
+        self._next_row = 1
+
+    async def _target_columns(self) -> Dict[str, Dict[str, Any]]:
+        """Column name -> type info for the target table (read once)"""
+        if self._columns is None:
+            result = await self.db.execute(text("""
+                SELECT a.attname, format_type(a.atttypid, a.atttypmod), t.typname,
+                       a.atttypmod, a.attnotnull, a.atthasdef, a.attgenerated <> ''
+                FROM pg_attribute a
+                JOIN pg_type t ON t.oid = a.atttypid
+                WHERE a.attrelid = CAST(:rel AS regclass) AND a.attnum > 0 AND NOT a.attisdropped
+                ORDER BY a.attnum
+            """), {"rel": f"{self.schema_name}.{self.table_name}"})
+            self._columns = {
+                name: {
+                    "sql_type": sql_type,
+                    "type_name": type_name,
+                    "typmod": typmod,
+                    "not_null": not_null,
+                    "has_default": has_default,
+                    "generated": generated,
+                }
+                for name, sql_type, type_name, typmod, not_null, has_default, generated in result.fetchall()
+            }
+        return self._columns
+
+    @staticmethod
+    def _is_typed(info: Dict[str, Any]) -> bool:
+        return info["type_name"] not in TEXT_TYPES
+
+    @staticmethod
+    def _safe_cast_name(sql_type: str) -> str:
+        return "pg_temp.try_cast_" + hashlib.md5(sql_type.encode("utf-8")).hexdigest()[:12]
+
+    def _safe_cast_ddl(self, sql_type: str) -> str:
+        """Function returning the value cast to sql_type (typmod included), or NULL if the cast fails"""
+        return f"""
+            CREATE OR REPLACE FUNCTION {self._safe_cast_name(sql_type)}(value TEXT) RETURNS {sql_type}
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                RETURN CAST(value AS {sql_type});
+            EXCEPTION WHEN others THEN
+                RETURN NULL;
+            END
+            $$
+        """
+
+    def _check_expression(self, column: str, info: Dict[str, Any]) -> List[str]:
+        """CASE branches that flag an invalid value in a staging column"""
+        col = f'"{column}"'
+        typed = self._is_typed(info)
+        # Blank strings load as NULL into typed columns
+        value = f"NULLIF(trim({col}), '')" if typed else col
+        checks = []
+        # An explicit NULL bypasses column defaults, so supplied NOT NULL columns need a value
+        if info["not_null"]:
+            checks.append(f"WHEN {value} IS NULL THEN '{column}: value required'")
+        if typed:
+            label = TYPE_LABELS.get(info["type_name"], info["sql_type"])
+            checks.append(
+                f"WHEN {value} IS NOT NULL AND {self._safe_cast_name(info['sql_type'])}({value}) IS NULL "
+                f"THEN '{column}: invalid {label}'"
+            )
+        elif info["type_name"] in ("varchar", "bpchar") and info["typmod"] > 4:
+            # An explicit cast would truncate, so length is checked rather than cast
+            checks.append(f"WHEN char_length({col}) > {info['typmod'] - 4} THEN '{column}: longer than {info['typmod'] - 4} characters'")
+        return checks
+
+    async def _uses_copy(self) -> bool:
+        conn = await self.db.connection()
+        return conn.dialect.driver == "asyncpg"
+
+    async def _copy_rows(self, stage: str, columns: List[str], rows: List[Sequence[Any]]) -> None:
+        """COPY rows into the staging table over the session's asyncpg connection"""
+        conn = await self.db.connection()
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(stage, records=rows, columns=["_row"] + columns)
+
+    async def _insert_rows(self, stage: str, columns: List[str], rows: List[Sequence[Any]]) -> None:
+        """Multi-row INSERT ... VALUES into the staging table"""
+        width = len(columns) + 1
+        per_statement = max(1, MAX_BIND_PARAMS // width)
+        column_list = ", ".join(f'"{c}"' for c in ["_row"] + columns)
+        for start in range(0, len(rows), per_statement):
+            chunk = rows[start:start + per_statement]
+            params: Dict[str, Any] = {}
+            values = []
+            for i, row in enumerate(chunk):
+                names = []
+                for j, value in enumerate(row):
+                    params[f"p{i}_{j}"] = value
+                    names.append(f":p{i}_{j}")
+                values.append(f"({', '.join(names)})")
+            await self.db.execute(
+                text(f"INSERT INTO {stage} ({column_list}) VALUES {', '.join(values)}"),
+                params
+            )
+
+    async def load_rows(
+        self,
+        columns: List[str],
+        rows: Iterable[Sequence[Any]],
+        start_row: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Load one batch of rows and commit it
+
+        Args:
+            columns: Target column names, in row order
+            rows: Row tuples (values are sent as text and cast by PostgreSQL)
+            start_row: Source row number of the first row (defaults to continuing the count)
+
+        Returns:
+            Batch result with loaded/rejected counts
+        """
+        started = time.perf_counter()
+        load_columns = await self._load_columns(columns)
+        keep = [columns.index(c) for c in load_columns]
+
+        row_number = self._next_row if start_row is None else start_row
+        staged = []
+        for row in rows:
+            staged.append((row_number, *[None if row[i] is None else str(row[i]) for i in keep]))
+            row_number += 1
+        self._next_row = row_number
+        return await self._load_staged(load_columns, staged, started)
+
+    async def load_frame(self, frame: pd.DataFrame, start_row: Optional[int] = None) -> Dict[str, Any]:
+        """Load one DataFrame batch and commit it (text conversion is column-wise)"""
+        started = time.perf_counter()
+        load_columns = await self._load_columns(list(frame.columns))
+
+        row_number = self._next_row if start_row is None else start_row
+        columns = [_as_text(frame[column]) for column in load_columns]
+        self._next_row = row_number + len(frame)
+        staged = list(zip(range(row_number, self._next_row), *columns))
+        return await self._load_staged(load_columns, staged, started)
+
+    async def _load_columns(self, columns: List[str]) -> List[str]:
+        """Columns that can be loaded into the target; the rest are reported as ignored"""
+        target = await self._target_columns()
+        if self.method is None:
+            self.method = "copy" if await self._uses_copy() else "insert"
+        load_columns = []
+        for c in columns:
+            if c in TIMESTAMP_COLUMNS:
+                continue
+            if c in target and not target[c]["generated"]:
+                load_columns.append(c)
+            elif c not in self.ignored_columns:
+                self.ignored_columns.append(c)
+        return load_columns
+
+    def _cast_expression(self, column: str, info: Dict[str, Any], alias: str = "") -> str:
+        """Staged TEXT value as the target column type"""
+        if self._is_typed(info):
+            return f'CAST(NULLIF(trim({alias}"{column}"), \'\') AS {info["sql_type"]})'
+        return f'{alias}"{column}"'
+
+    async def _match_existing(self, stage: str, load_columns: List[str], target: Dict[str, Any]) -> int:
+        """Point staged rows at existing rows with the same key; optionally merge into them"""
+        keys = [(c, expression) for c, expression in self.match_keys.items() if c in load_columns]
+        if not keys or "id" not in target:
+            return 0
+        table = f"{self.schema_name}.{self.table_name}"
+        lookups = [
+            f"(SELECT t.id FROM {table} t WHERE {expression.format(column=f't.{column}')} = "
+            f"{expression.format(column=f's.{column}')} LIMIT 1)"
+            for column, expression in keys
+        ]
+        await self.db.execute(text(
+            f"UPDATE {stage} s SET _match = COALESCE({', '.join(lookups)}) WHERE _error IS NULL"
+        ))
+        result = await self.db.execute(text(f"SELECT COUNT(*) FROM {stage} WHERE _match IS NOT NULL"))
+        matched = result.scalar() or 0
+        if matched and self.merge_matches:
+            assignments = [
+                f'"{c}" = COALESCE(t."{c}", {self._cast_expression(c, target[c], "s.")})'
+                for c in load_columns
+            ]
+            if "updated_at" in target:
+                assignments.append("updated_at = NOW()")
+            await self.db.execute(text(
+                f"UPDATE {table} t SET {', '.join(assignments)} FROM {stage} s WHERE s._match = t.id"
+            ))
+        return matched
+
+    async def _load_staged(self, load_columns: List[str], staged: List[Sequence[Any]], started: float) -> Dict[str, Any]:
+        """Stage, validate and move one batch of (row number, *text values) tuples"""
+        if not staged:
+            return {"loaded": 0, "rejected": 0, "skipped": 0, "matched": 0}
+        target = await self._target_columns()
+
+        # Per-batch staging table; dropped when the batch transaction commits
+        stage = f"_stage_{self.table_name}_{uuid.uuid4().hex[:8]}"
+        stage_columns = ", ".join(
+            ["_row BIGINT"] + [f'"{c}" TEXT' for c in load_columns] + ["_error TEXT", "_match UUID"]
+        )
+        await self.db.execute(text(f"CREATE TEMP TABLE {stage} ({stage_columns}) ON COMMIT DROP"))
+        await self.db.execute(text(f"SET LOCAL DateStyle = '{LOAD_DATESTYLE}'"))
+        # Recreated per batch: with transaction pooling the next batch may run on another connection
+        for sql_type in sorted({target[c]["sql_type"] for c in load_columns if self._is_typed(target[c])}):
+            await self.db.execute(text(self._safe_cast_ddl(sql_type)))
+
+        try:
+            if self.method == "copy":
+                await self._copy_rows(stage, load_columns, staged)
+            else:
+                await self._insert_rows(stage, load_columns, staged)
+
+            # Validate in the database: first failing check wins per row
+            checks = [c for name in load_columns for c in self._check_expression(name, target[name])]
+            missing = [name for name, info in target.items()
+                       if info["not_null"] and not info["has_default"] and not info["generated"]
+                       and name not in load_columns and name not in TIMESTAMP_COLUMNS]
+            if missing:
+                checks.insert(0, f"WHEN TRUE THEN 'missing required column(s): {', '.join(missing)}'")
+            if checks:
+                await self.db.execute(text(f"UPDATE {stage} SET _error = CASE {' '.join(checks)} END"))
+                result = await self.db.execute(text(
+                    f"SELECT _row, _error FROM {stage} WHERE _error IS NOT NULL ORDER BY _row"
+                ))
+                rejected = result.fetchall()
+            else:
+                rejected = []
+
+            # Rows that already exist (by match key) are skipped or merged
+            matched = await self._match_existing(stage, load_columns, target)
+
+            # Move valid rows to the target table
+            select_list = [self._cast_expression(c, target[c]) for c in load_columns]
+            insert_columns = [f'"{c}"' for c in load_columns]
+            for c in TIMESTAMP_COLUMNS:
+                if c in target:
+                    insert_columns.append(c)
+                    select_list.append("NOW()")
+            result = await self.db.execute(text(f"""
+                INSERT INTO {self.schema_name}.{self.table_name} ({', '.join(insert_columns)})
+                SELECT {', '.join(select_list)} FROM {stage} WHERE _error IS NULL AND _match IS NULL ORDER BY _row
+                ON CONFLICT DO NOTHING
+            """))
+            loaded = result.rowcount or 0
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+
+        skipped = len(staged) - len(rejected) - matched - loaded
+        self.rows_loaded += loaded
+        self.rows_rejected += len(rejected)
+        self.rows_skipped += skipped
+        self.rows_matched += matched
+        room = self.max_reported_rejects - len(self.rejects)
+        if room > 0:
+            self.rejects.extend({"row": row, "error": error} for row, error in rejected[:room])
+        self.seconds += time.perf_counter() - started
+        logger.info(
+            f"Loaded {loaded} rows into {self.schema_name}.{self.table_name} "
+            f"({len(rejected)} rejected, {skipped} duplicates, {matched} matched existing rows)"
+        )
+
+        return {"loaded": loaded, "rejected": len(rejected), "skipped": skipped, "matched": matched}
+
+    async def load_records(self, records: List[Dict[str, Any]], batch_size: int = 5000) -> Dict[str, Any]:
+        """Load a list of record dicts (columns taken from the first record)"""
+        if not records:
+            return self.summary()
+        columns = [k for k in records[0].keys() if k not in TIMESTAMP_COLUMNS]
+        for start in range(0, len(records), batch_size):
+            batch = records[start:start + batch_size]
+            await self.load_rows(columns, [tuple(r.get(c) for c in columns) for r in batch])
+        return self.summary()
+
+    async def load_frames(self, frames: Iterable[pd.DataFrame]) -> Dict[str, Any]:
+        """Load a stream of DataFrame batches, one transaction per batch"""
+        for frame in frames:
+            await self.load_frame(frame)
+        return self.summary()
+
+    def summary(self) -> Dict[str, Any]:
+        """Load statistics including throughput"""
+        total = self.rows_loaded + self.rows_rejected + self.rows_skipped + self.rows_matched
+        return {
+            "method": self.method,
+            "rows_loaded": self.rows_loaded,
+            "rows_rejected": self.rows_rejected,
+            "rows_skipped_duplicates": self.rows_skipped,
+            "rows_matched_existing": self.rows_matched,
+            "rejected_rows": self.rejects,
+            "ignored_columns": self.ignored_columns,
+            "seconds": round(self.seconds, 3),
+            "rows_per_sec": round(total / self.seconds, 1) if self.seconds > 0 else None,
+        }
@@ -0,0 +1,287 @@
+"""
+Contact Deduplication
+Normalised email/phone/name keys, exact blocking plus a sorted-neighbourhood pass on names
+(corroborated by organization), and an optional merge of each duplicate cluster into one record
+Also the index DDL and SQL key expressions used to match incoming contacts against a tenant's table
+"""
+
+from typing import Dict, List, Set, Tuple
+import numpy as np
+import pandas as pd
+
+
+# SQL equivalents of email_key/phone_key; queries must use the exact same
+# expressions for the planner to pick the indexes
+EMAIL_KEY_SQL = "NULLIF(lower(btrim({column})), '')"
+PHONE_KEY_SQL = (
+    "CASE WHEN length(regexp_replace({column}, '\\D', '', 'g')) >= 7 "
+    "THEN right(regexp_replace({column}, '\\D', '', 'g'), 10) END"
+)
+
+NAME_COLUMNS = ("full_name", "name", "donor_name", "volunteer_name")
+# Field that must agree before two records are joined on name alone
+# (email/phone agreement is already an exact match)
+CORROBORATING_COLUMNS = ("organization",)
+
+DEFAULT_WINDOW = 5
+DEFAULT_NAME_THRESHOLD = 0.8
+
+DUPLICATE_MODES = ("keep", "skip", "merge")
+
+
+def contact_dedup_ddl(schema_name: str, columns: Tuple[str, ...] = ("email", "phone")) -> List[str]:
+    """Indexes on the match keys of a tenant contacts table (for the key columns it has)"""
+    statements = []
+    if "email" in columns:
+        statements.append(
+            f"CREATE INDEX IF NOT EXISTS idx_contacts_email_key "
+            f"ON {schema_name}.contacts (({EMAIL_KEY_SQL.format(column='email')}))"
+        )
+    if "phone" in columns:
+        statements.append(
+            f"CREATE INDEX IF NOT EXISTS idx_contacts_phone_key "
+            f"ON {schema_name}.contacts (({PHONE_KEY_SQL.format(column='phone')}))"
+        )
+    return statements
+
+
+def email_key(values: pd.Series) -> pd.Series:
+    """Lowercased, trimmed email (missing for blanks)"""
+    keys = values.astype("str").str.strip().str.lower()
+    return keys.mask(values.isna() | (keys == ""))
+
+
+def phone_key(values: pd.Series) -> pd.Series:
+    """Last 10 digits (drops a leading country code); missing below 7 digits"""
+    if pd.api.types.is_float_dtype(values):
+        values = values.round().astype("Int64")
+    digits = values.astype("str").str.replace(r"\D", "", regex=True)
+    return digits.str[-10:].mask(values.isna() | (digits.str.len() < 7))
+
+
+def name_key(df: pd.DataFrame) -> pd.Series:
+    """Accent/punctuation-folded, lowercased 'first last' name (missing if the row has no name)"""
+    if "first_name" in df.columns or "last_name" in df.columns:
+        parts = [df[c].astype("str").where(df[c].notna(), "") for c in ("first_name", "last_name") if c in df.columns]
+        names = parts[0] if len(parts) == 1 else parts[0] + " " + parts[1]
+    else:
+        column = next((c for c in NAME_COLUMNS if c in df.columns), None)
+        if column is None:
+            return pd.Series(pd.NA, index=df.index, dtype="str")
+        names = df[column].astype("str").where(df[column].notna(), "")
+    # Fold the distinct names only (exports repeat a lot); object dtype keeps
+    # Python's Unicode-aware regexes (\W) whatever the string storage
+    codes, uniques = pd.factorize(names)
+    folded = (
+        pd.Series(uniques, dtype=object)
+        .str.normalize("NFKD")
+        .str.replace(r"[\u0300-\u036f]", "", regex=True)
+        .str.lower()
+        .str.replace(r"[\W_]+", " ", regex=True)
+        .str.strip()
+    )
+    keys = pd.Series(folded.to_numpy(dtype=object)[codes] if len(codes) else [], index=df.index, dtype="str")
+    return keys.mask(keys == "")
+
+
+def _codes(values: pd.Series) -> np.ndarray:
+    """Integer code per value (-1 for missing), for vectorised equality tests"""
+    return pd.factorize(values)[0]
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _similarity(a: str, b: str) -> float:
+    """Dice coefficient of character trigrams"""
+    grams_a, grams_b = _trigrams(a), _trigrams(b)
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+def _propagate(labels: np.ndarray, groupings: List[np.ndarray], pairs: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+    """Connected components as minimum row labels (vectorised label propagation)"""
+    n = len(labels)
+    left, right = pairs
+    while True:
+        before = labels.copy()
+        for codes in groupings:
+            present = codes >= 0
+            if not present.any():
+                continue
+            minimum = np.full(codes.max() + 1, n, dtype=labels.dtype)
+            np.minimum.at(minimum, codes[present], labels[present])
+            labels[present] = minimum[codes[present]]
+        if len(left):
+            np.minimum.at(labels, left, labels[right])
+            np.minimum.at(labels, right, labels[left])
+        # Pointer jumping: follow labels to their own label
+        labels = labels[labels]
+        if np.array_equal(before, labels):
+            return labels
+
+
+def _conflicted(labels: np.ndarray, groupings: List[np.ndarray]) -> np.ndarray:
+    """Rows whose cluster holds two different non-null email (or phone) keys"""
+    n = len(labels)
+    conflicted = np.zeros(n, dtype=bool)
+    for codes in groupings:
+        present = codes >= 0
+        if not present.any():
+            continue
+        distinct = np.unique(np.stack([labels[present], codes[present]]), axis=1)
+        conflicted |= np.bincount(distinct[0], minlength=n) > 1
+    return conflicted[labels]
+
+
+def _regroup_by_keys(labels: np.ndarray, rows: np.ndarray, groupings: List[np.ndarray]) -> np.ndarray:
+    """Split rows out of their clusters, rejoining only rows with identical (email, phone) keys"""
+    labels = labels.copy()
+    labels[rows] = rows
+    emails, phones = groupings
+    keyed = rows[(emails[rows] >= 0) | (phones[rows] >= 0)]
+    if len(keyed):
+        combined = (emails[keyed].astype(np.int64) + 1) * (len(labels) + 1) + phones[keyed] + 1
+        _, first, inverse = np.unique(combined, return_index=True, return_inverse=True)
+        labels[keyed] = keyed[first][inverse]
+    return labels
+
+
+def _fuzzy_pairs(
+    names: pd.Series,
+    keys: List[np.ndarray],
+    corroborating: List[np.ndarray],
+    rows: np.ndarray,
+    window: int,
+    threshold: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sorted-neighbourhood candidate pairs among rows: they are sorted by name
+    (twice, by first and by last token) and each is compared with the next
+    window - 1 rows sharing its two-letter block, so comparisons are O(n * window).
+
+    A pair matches when the names are identical or their trigram similarity
+    reaches the threshold, no key (email/phone code) conflicts, and a
+    corroborating field (organization) agrees - a shared name alone is not enough.
+    """
+    rows = rows[names.iloc[rows].notna().to_numpy()]
+    if len(rows) < 2:
+        return np.array([], dtype=np.intp), np.array([], dtype=np.intp)
+    name_values = names.to_numpy(dtype=object)
+    name_codes = _codes(names)
+    forward = names.iloc[rows]
+    # Second ordering on reversed tokens catches typos early in the name
+    backward = forward.str.split().str[::-1].str.join(" ")
+
+    left: List[np.ndarray] = []
+    right: List[np.ndarray] = []
+    for ordering in (forward, backward):
+        order_index = np.argsort(ordering.to_numpy(dtype=str), kind="stable")
+        order = rows[order_index]
+        blocks = _codes(ordering.iloc[order_index].str[:2])
+        for offset in range(1, window):
+            a, b = order[:-offset], order[offset:]
+            candidates = blocks[:-offset] == blocks[offset:]
+            for codes in keys:
+                candidates &= ~((codes[a] >= 0) & (codes[b] >= 0) & (codes[a] != codes[b]))
+            a, b = a[candidates], b[candidates]
+            same_name = name_codes[a] == name_codes[b]
+            corroborated = np.zeros(len(a), dtype=bool)
+            for codes in corroborating:
+                corroborated |= (codes[a] >= 0) & (codes[a] == codes[b])
+            # Only corroborated pairs with different names need a similarity score
+            fuzzy = np.flatnonzero(corroborated & ~same_name)
+            similar = np.array(
+                [_similarity(name_values[a[i]], name_values[b[i]]) >= threshold for i in fuzzy], dtype=bool
+            )
+            matched = corroborated & same_name
+            matched[fuzzy[similar] if len(fuzzy) else fuzzy] = True
+            left.append(a[matched])
+            right.append(b[matched])
+    return np.concatenate(left), np.concatenate(right)
+
+
+def cluster_contacts(
+    df: pd.DataFrame,
+    window: int = DEFAULT_WINDOW,
+    threshold: float = DEFAULT_NAME_THRESHOLD
+) -> Tuple[np.ndarray, Dict[str, int]]:
+    """
+    Duplicate clusters of a contact frame
+
+    Rows sharing an email or phone key are joined exactly (blocking on the
+    keys, no pairwise comparison); a sorted-neighbourhood pass then joins
+    near-identical names whose organization agrees. A cluster that ends up
+    with two different emails or phones (chained through a shared key or a
+    keyless row) is rejected: its rows fall back to the previous pass.
+
+    Returns:
+        (cluster label per row = position of the cluster's first row, stats)
+    """
+    n = len(df)
+    labels = np.arange(n)
+    stats = {"rows": n, "exact_matches": 0, "fuzzy_matches": 0, "duplicates": 0, "rejected_clusters": 0}
+    if n < 2:
+        return labels, stats
+
+    frame = df.reset_index(drop=True)
+    missing = pd.Series(pd.NA, index=frame.index, dtype="str")
+    emails = email_key(frame["email"]) if "email" in frame.columns else missing
+    phones = phone_key(frame["phone"]) if "phone" in frame.columns else missing
+    groupings = [_codes(keys) for keys in (emails, phones)]
+
+    no_pairs = (np.array([], dtype=np.intp), np.array([], dtype=np.intp))
+    labels = _propagate(labels, groupings, no_pairs)
+    conflicted = _conflicted(labels, groupings)
+    if conflicted.any():
+        stats["rejected_clusters"] += len(np.unique(labels[conflicted]))
+        labels = _regroup_by_keys(labels, np.flatnonzero(conflicted), groupings)
+    stats["exact_matches"] = int(n - np.count_nonzero(labels == np.arange(n)))
+
+    corroborating = []
+    for column in CORROBORATING_COLUMNS:
+        if column in frame.columns:
+            values = frame[column].astype("str").str.strip().str.lower()
+            corroborating.append(_codes(values.mask(frame[column].isna() | (values == ""))))
+    # Exact clusters are compared through their first row only
+    representatives = np.flatnonzero(labels == np.arange(n))
+    pairs = _fuzzy_pairs(name_key(frame), groupings, corroborating, representatives, window, threshold)
+    if len(pairs[0]):
+        exact_labels = labels
+        labels = _propagate(labels.copy(), [], pairs)
+        conflicted = _conflicted(labels, groupings)
+        if conflicted.any():
+            stats["rejected_clusters"] += len(np.unique(labels[conflicted]))
+            labels[conflicted] = exact_labels[conflicted]
+
+    stats["duplicates"] = int(n - np.count_nonzero(labels == np.arange(n)))
+    stats["fuzzy_matches"] = stats["duplicates"] - stats["exact_matches"]
+    return labels, stats
+
+
+def dedupe_contacts(
+    df: pd.DataFrame,
+    merge: bool = True,
+    window: int = DEFAULT_WINDOW,
+    threshold: float = DEFAULT_NAME_THRESHOLD
+) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Collapse duplicate contacts
+
+    Args:
+        df: Contacts (mapped column names: email, phone, first_name, ...)
+        merge: Fill each cluster's first row with the first non-missing value
+            of every column across the cluster; otherwise just keep the first row
+
+    Returns:
+        (deduplicated frame in first-occurrence order, cluster stats)
+    """
+    labels, stats = cluster_contacts(df, window, threshold)
+    if not stats["duplicates"]:
+        return df, stats
+    if merge:
+        merged = df.groupby(labels, sort=True).first()
+        merged.index = df.index[merged.index.to_numpy()]
+        return merged[df.columns], stats
+    return df[labels == np.arange(len(df))], stats
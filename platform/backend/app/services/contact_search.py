@@ -0,0 +1,226 @@
+"""
+Contact Search Service
+Full-text (generated tsvector) and trigram (pg_trgm) search over tenant contacts,
+plus keyset pagination and cheap row-count estimates for contact listings
+Shared by the schema generators (DDL) and the client contact routes (queries)
+"""
+
+import re
+import base64
+import uuid
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Collection, FrozenSet, Tuple, Union
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy import text
+
+
+# Searched text columns and their tsvector weights: names weigh most, then
+# email/organization, then notes. Expressions only use the columns a tenant's
+# contacts table has (template layouts may lack organization or notes)
+SEARCH_VECTOR_GROUPS = (
+    (("first_name", "last_name"), "simple", "A"),
+    (("email", "organization"), "simple", "B"),
+    (("notes",), "english", "D"),
+)
+
+# Name/email/organization blob the trigram index is built on
+TRIGRAM_COLUMNS = ("first_name", "last_name", "email", "organization")
+
+# Contact fields returned by the listing and search routes
+LISTED_COLUMNS = ("first_name", "last_name", "email", "phone", "organization")
+
+# Contacts columns per schema, cached once the search column exists; until then
+# they are re-read per request so a finished migration is picked up without a restart
+_schema_columns: Dict[str, FrozenSet[str]] = {}
+
+
+def _joined(columns: List[str], row: str = "") -> str:
+    return " || ' ' || ".join(f"coalesce({row}{column}, '')" for column in columns)
+
+
+def trigram_expression(columns: Collection[str]) -> Optional[str]:
+    """
+    Trigram-indexed expression over the columns present (None if there are none)
+
+    Queries must use the exact same expression for the planner to pick the index.
+    """
+    present = [column for column in TRIGRAM_COLUMNS if column in columns]
+    if not present:
+        return None
+    return f"lower({_joined(present)})"
+
+
+def search_vector_expression(columns: Collection[str], row: str = "") -> Optional[str]:
+    """
+    Weighted tsvector expression over the columns present (None if there are none)
+
+    row qualifies the column references (e.g. "NEW." inside a trigger).
+    """
+    parts = []
+    for group, config, weight in SEARCH_VECTOR_GROUPS:
+        present = [column for column in group if column in columns]
+        if present:
+            parts.append(f"setweight(to_tsvector('{config}', {_joined(present, row)}), '{weight}')")
+    return " || ".join(parts) or None
+
+
+def contact_search_ddl(schema_name: str, columns: Collection[str]) -> List[str]:
+    """
+    Statements adding the search column and listing/search indexes to a new contacts table
+
+    Only for tables created in the same transaction: adding the generated
+    column to a populated table rewrites it under an exclusive lock. Existing
+    tenants are upgraded online by app.migrations.contact_search_indexes.
+    """
+    vector = search_vector_expression(columns)
+    trigram = trigram_expression(columns)
+    statements = []
+    if trigram:
+        statements.append("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    if vector:
+        statements.extend([
+            f"""
+                ALTER TABLE {schema_name}.contacts
+                ADD COLUMN IF NOT EXISTS search_vector tsvector
+                GENERATED ALWAYS AS ({vector}) STORED
+            """,
+            f"CREATE INDEX IF NOT EXISTS idx_contacts_search_vector ON {schema_name}.contacts USING GIN (search_vector)",
+        ])
+    if trigram:
+        statements.append(
+            f"CREATE INDEX IF NOT EXISTS idx_contacts_search_trgm ON {schema_name}.contacts USING GIN (({trigram}) gin_trgm_ops)"
+        )
+    if "created_at" in columns:
+        # Keyset pagination (newest first, id breaks ties)
+        statements.append(
+            f"CREATE INDEX IF NOT EXISTS idx_contacts_created_id ON {schema_name}.contacts (created_at DESC, id DESC)"
+        )
+    return statements
+
+
+async def contact_columns(db: Union[AsyncSession, AsyncConnection], schema_name: str) -> FrozenSet[str]:
+    """Column names of the tenant's contacts table (empty if it has none)"""
+    cached = _schema_columns.get(schema_name)
+    if cached is not None:
+        return cached
+    result = await db.execute(
+        text("""
+            SELECT attname FROM pg_attribute
+            WHERE attrelid = to_regclass(:table_name) AND attnum > 0 AND NOT attisdropped
+        """),
+        {"table_name": f"{schema_name}.contacts"}
+    )
+    columns = frozenset(row[0] for row in result.fetchall())
+    if "search_vector" in columns:
+        _schema_columns[schema_name] = columns
+    return columns
+
+
+def select_list(columns: Collection[str]) -> str:
+    """LISTED_COLUMNS for a SELECT, with NULL standing in for columns the table lacks"""
+    return ", ".join(
+        column if column in columns else f"NULL AS {column}"
+        for column in LISTED_COLUMNS
+    )
+
+
+def _prefix_tsquery(query: str) -> Optional[str]:
+    """'jane sm' -> 'jane:* & sm:*' (prefix match on every word)"""
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return None
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def _like_pattern(query: str) -> str:
+    escaped = query.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _like_conditions(query: str, columns: Collection[str]) -> Dict[str, Any]:
+    """Unindexed substring match for tables without the search column (not yet migrated)"""
+    searched = [column for group, _, _ in SEARCH_VECTOR_GROUPS for column in group if column in columns]
+    names = [column for column in ("first_name", "last_name") if column in columns]
+    ranks = []
+    if names:
+        ranks.append(" OR ".join(f"LOWER({column}) = :search_text" for column in names) + " THEN 2")
+    if "email" in columns:
+        ranks.append("LOWER(email) = :search_text THEN 1")
+    # Exact name matches first, then exact email
+    rank = "CASE " + " ".join(f"WHEN {r}" for r in ranks) + " ELSE 0 END" if ranks else "0"
+    return {
+        "where": "(" + (" OR ".join(f"LOWER({column}) LIKE :search_pattern" for column in searched) or "FALSE") + ")",
+        "rank": rank,
+        "params": {
+            "search_text": query.lower().strip(),
+            "search_pattern": _like_pattern(query.strip()),
+        },
+    }
+
+
+def search_conditions(query: str, columns: Collection[str]) -> Dict[str, Any]:
+    """
+    WHERE/rank SQL fragments and parameters for a contact search
+
+    Matches full-text prefixes (GIN on search_vector), substrings (trigram
+    LIKE) and near-misses such as misheard names (trigram word similarity).
+    Tables without the search column fall back to a plain substring match.
+    """
+    if "search_vector" not in columns:
+        return _like_conditions(query, columns)
+    tsquery = _prefix_tsquery(query)
+    trigram = trigram_expression(columns)
+    params: Dict[str, Any] = {
+        "search_text": query.lower().strip(),
+        "search_pattern": _like_pattern(query.strip()),
+    }
+    matches = []
+    rank = "0"
+    if trigram:
+        matches.extend([
+            f"{trigram} LIKE :search_pattern",
+            f":search_text <% {trigram}",
+        ])
+        rank = f"word_similarity(:search_text, {trigram})"
+    if tsquery:
+        params["search_tsquery"] = tsquery
+        matches.insert(0, "search_vector @@ to_tsquery('simple', :search_tsquery)")
+        rank = f"ts_rank(search_vector, to_tsquery('simple', :search_tsquery)) * 2 + {rank}"
+    return {
+        "where": "(" + (" OR ".join(matches) or "FALSE") + ")",
+        "rank": rank,
+        "params": params,
+    }
+
+
+def encode_cursor(created_at: datetime, contact_id: Any) -> str:
+    """Opaque cursor for the row after which the next page starts"""
+    raw = f"{created_at.isoformat()}|{contact_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, contact_id = base64.urlsafe_b64decode(padded).decode("utf-8").split("|", 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(contact_id)
+    except (UnicodeDecodeError, ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+async def estimate_row_count(db: AsyncSession, schema_name: str, table_name: str) -> Optional[int]:
+    """
+    Planner row estimate from pg_class (kept current by autovacuum/ANALYZE)
+
+    Returns None when the table has never been analysed (or looks empty), so
+    callers can fall back to an exact count; such tables are new and small.
+    """
+    result = await db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"),
+        {"table_name": f"{schema_name}.{table_name}"}
+    )
+    estimate = result.scalar()
+    if estimate is None or estimate <= 0:
+        return None
+    return int(estimate)
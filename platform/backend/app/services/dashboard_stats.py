@@ -0,0 +1,311 @@
+"""
+Dashboard Statistics Service
+Per-tenant counters kept current by statement-level triggers on the tracked tables
+The dashboard reads one row instead of aggregating the tables on every load
+"""
+
+import logging
+from typing import Dict, List, Any, Optional, Set
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+
+logger = logging.getLogger(__name__)
+
+# Tables with counters; donations only exists for tenants with that module
+STATS_TABLES = ("contacts", "donations")
+
+# Columns a table's triggers aggregate, with the types they can sum; a table
+# without them is not tracked (its trigger would fail every insert)
+SUMMED_COLUMNS = {"donations": "amount"}
+NUMERIC_TYPES = ("numeric", "integer", "bigint", "smallint", "real", "double precision")
+
+# Window for the "recent contacts" figure (daily buckets)
+RECENT_DAYS = 30
+
+# Schemas whose stats row already tracks every existing table
+_ready_schemas: Set[str] = set()
+
+
+def _stats_tables_ddl(schema_name: str) -> List[str]:
+    return [
+        f"""
+            CREATE TABLE IF NOT EXISTS {schema_name}.crm_stats (
+                id BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+                contacts_total BIGINT NOT NULL DEFAULT 0,
+                donations_total BIGINT NOT NULL DEFAULT 0,
+                donations_amount NUMERIC(14,2) NOT NULL DEFAULT 0,
+                tracked_tables TEXT[] NOT NULL DEFAULT '{{}}',
+                updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                refreshed_at TIMESTAMP NOT NULL DEFAULT NOW()
+            )
+        """,
+        f"""
+            CREATE TABLE IF NOT EXISTS {schema_name}.crm_stats_daily (
+                day DATE PRIMARY KEY,
+                contacts_added BIGINT NOT NULL DEFAULT 0
+            )
+        """,
+        f"INSERT INTO {schema_name}.crm_stats (id) VALUES (true) ON CONFLICT (id) DO NOTHING",
+    ]
+
+
+def _contacts_trigger_ddl(schema_name: str) -> List[str]:
+    return [
+        f"""
+            CREATE OR REPLACE FUNCTION {schema_name}.crm_stats_contacts() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    UPDATE {schema_name}.crm_stats
+                    SET contacts_total = contacts_total + (SELECT COUNT(*) FROM new_rows), updated_at = NOW();
+                    INSERT INTO {schema_name}.crm_stats_daily AS d (day, contacts_added)
+                    SELECT created_at::date, COUNT(*) FROM new_rows WHERE created_at IS NOT NULL GROUP BY 1
+                    ON CONFLICT (day) DO UPDATE SET contacts_added = d.contacts_added + EXCLUDED.contacts_added;
+                ELSIF TG_OP = 'DELETE' THEN
+                    UPDATE {schema_name}.crm_stats
+                    SET contacts_total = contacts_total - (SELECT COUNT(*) FROM old_rows), updated_at = NOW();
+                    UPDATE {schema_name}.crm_stats_daily AS d
+                    SET contacts_added = d.contacts_added - o.removed
+                    FROM (SELECT created_at::date AS day, COUNT(*) AS removed FROM old_rows GROUP BY 1) o
+                    WHERE d.day = o.day;
+                ELSE
+                    UPDATE {schema_name}.crm_stats SET contacts_total = 0, updated_at = NOW();
+                    DELETE FROM {schema_name}.crm_stats_daily;
+                END IF;
+                RETURN NULL;
+            END
+            $$
+        """,
+        f"""
+            CREATE OR REPLACE TRIGGER crm_stats_contacts_insert
+            AFTER INSERT ON {schema_name}.contacts
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.crm_stats_contacts()
+        """,
+        f"""
+            CREATE OR REPLACE TRIGGER crm_stats_contacts_delete
+            AFTER DELETE ON {schema_name}.contacts
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.crm_stats_contacts()
+        """,
+        f"""
+            CREATE OR REPLACE TRIGGER crm_stats_contacts_truncate
+            AFTER TRUNCATE ON {schema_name}.contacts
+            FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.crm_stats_contacts()
+        """,
+    ]
+
+
+def _donations_trigger_ddl(schema_name: str) -> List[str]:
+    return [
+        f"""
+            CREATE OR REPLACE FUNCTION {schema_name}.crm_stats_donations() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    UPDATE {schema_name}.crm_stats SET
+                        donations_total = donations_total + (SELECT COUNT(*) FROM new_rows),
+                        donations_amount = donations_amount + (SELECT COALESCE(SUM(amount), 0) FROM new_rows),
+                        updated_at = NOW();
+                ELSIF TG_OP = 'DELETE' THEN
+                    UPDATE {schema_name}.crm_stats SET
+                        donations_total = donations_total - (SELECT COUNT(*) FROM old_rows),
+                        donations_amount = donations_amount - (SELECT COALESCE(SUM(amount), 0) FROM old_rows),
+                        updated_at = NOW();
+                ELSIF TG_OP = 'UPDATE' THEN
+                    UPDATE {schema_name}.crm_stats SET
+                        donations_amount = donations_amount
+                            + (SELECT COALESCE(SUM(amount), 0) FROM new_rows)
+                            - (SELECT COALESCE(SUM(amount), 0) FROM old_rows),
+                        updated_at = NOW();
+                ELSE
+                    UPDATE {schema_name}.crm_stats SET donations_total = 0, donations_amount = 0, updated_at = NOW();
+                END IF;
+                RETURN NULL;
+            END
+            $$
+        """,
+        f"""
+            CREATE OR REPLACE TRIGGER crm_stats_donations_insert
+            AFTER INSERT ON {schema_name}.donations
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.crm_stats_donations()
+        """,
+        f"""
+            CREATE OR REPLACE TRIGGER crm_stats_donations_delete
+            AFTER DELETE ON {schema_name}.donations
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.crm_stats_donations()
+        """,
+        f"""
+            CREATE OR REPLACE TRIGGER crm_stats_donations_update
+            AFTER UPDATE ON {schema_name}.donations
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.crm_stats_donations()
+        """,
+        f"""
+            CREATE OR REPLACE TRIGGER crm_stats_donations_truncate
+            AFTER TRUNCATE ON {schema_name}.donations
+            FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.crm_stats_donations()
+        """,
+    ]
+
+
+TRIGGER_DDL = {
+    "contacts": _contacts_trigger_ddl,
+    "donations": _donations_trigger_ddl,
+}
+
+
+def dashboard_stats_ddl(schema_name: str, tables: List[str]) -> List[str]:
+    """
+    Stats tables and triggers for tables created in the same transaction
+
+    The tables must be empty (zero counters are recorded as exact), so this is
+    for provisioning only; existing tenants go through ensure_dashboard_stats.
+    """
+    tracked = [table for table in STATS_TABLES if table in tables]
+    if "contacts" not in tracked:
+        return []
+    statements = _stats_tables_ddl(schema_name)
+    for table in tracked:
+        statements.extend(TRIGGER_DDL[table](schema_name))
+    array = ", ".join(f"'{table}'" for table in tracked)
+    statements.append(f"UPDATE {schema_name}.crm_stats SET tracked_tables = ARRAY[{array}]::TEXT[]")
+    return statements
+
+
+async def _existing_tables(db: AsyncSession, schema_name: str) -> List[str]:
+    """Tracked tables present in the schema with the columns their triggers sum"""
+    result = await db.execute(
+        text("""
+            SELECT table_name, column_name, data_type FROM information_schema.columns
+            WHERE table_schema = :schema_name AND table_name = ANY(:tables)
+        """),
+        {"schema_name": schema_name, "tables": list(STATS_TABLES)}
+    )
+    columns: Dict[str, Dict[str, str]] = {}
+    for table_name, column_name, data_type in result.fetchall():
+        columns.setdefault(table_name, {})[column_name] = data_type
+    existing = []
+    for table in STATS_TABLES:
+        if table not in columns:
+            continue
+        summed = SUMMED_COLUMNS.get(table)
+        if summed and columns[table].get(summed) not in NUMERIC_TYPES:
+            logger.warning(f"Not tracking {schema_name}.{table}: no numeric {summed} column")
+            continue
+        existing.append(table)
+    return existing
+
+
+async def _has_stats_table(db: AsyncSession, schema_name: str) -> bool:
+    result = await db.execute(
+        text("SELECT to_regclass(:table_name) IS NOT NULL"),
+        {"table_name": f"{schema_name}.crm_stats"}
+    )
+    return bool(result.scalar())
+
+
+async def ensure_dashboard_stats(db: AsyncSession, schema_name: str, force: bool = False) -> bool:
+    """
+    Attach stats triggers to every tracked table that exists in the schema
+
+    Newly attached tables are backfilled with an exact recount in the same
+    transaction (CREATE TRIGGER blocks concurrent writes until commit).
+    Pass force=True after creating a tracked table.
+
+    Returns:
+        False if the tenant has no contacts table yet
+    """
+    if schema_name in _ready_schemas and not force:
+        return True
+
+    existing = await _existing_tables(db, schema_name)
+    if "contacts" not in existing:
+        return False
+
+    tracked: Set[str] = set()
+    if await _has_stats_table(db, schema_name):
+        result = await db.execute(text(f"SELECT tracked_tables FROM {schema_name}.crm_stats"))
+        tracked = set(result.scalar() or [])
+
+    missing = [table for table in existing if table not in tracked]
+    if missing:
+        statements = _stats_tables_ddl(schema_name)
+        for table in missing:
+            statements.extend(TRIGGER_DDL[table](schema_name))
+        for statement in statements:
+            await db.execute(text(statement))
+        await _recount(db, schema_name, existing)
+        await db.commit()
+        logger.info(f"Dashboard stats tracking {missing} in {schema_name}")
+
+    _ready_schemas.add(schema_name)
+    return True
+
+
+async def _recount(db: AsyncSession, schema_name: str, tables: List[str]) -> None:
+    """Recompute every counter exactly from the base tables"""
+    donations = "donations" in tables
+    await db.execute(text(f"""
+        UPDATE {schema_name}.crm_stats SET
+            contacts_total = (SELECT COUNT(*) FROM {schema_name}.contacts),
+            donations_total = {f"(SELECT COUNT(*) FROM {schema_name}.donations)" if donations else "0"},
+            donations_amount = {f"(SELECT COALESCE(SUM(amount), 0) FROM {schema_name}.donations)" if donations else "0"},
+            tracked_tables = :tables,
+            updated_at = NOW(),
+            refreshed_at = NOW()
+    """), {"tables": tables})
+    await db.execute(text(f"DELETE FROM {schema_name}.crm_stats_daily"))
+    await db.execute(text(f"""
+        INSERT INTO {schema_name}.crm_stats_daily (day, contacts_added)
+        SELECT created_at::date, COUNT(*) FROM {schema_name}.contacts
+        WHERE created_at >= CURRENT_DATE - {RECENT_DAYS - 1}
+        GROUP BY 1
+    """))
+
+
+async def refresh_dashboard_stats(db: AsyncSession, schema_name: str) -> None:
+    """Reconcile the counters with an exact recount (drift repair, pruning old buckets)"""
+    if not await ensure_dashboard_stats(db, schema_name):
+        return
+    await _recount(db, schema_name, await _existing_tables(db, schema_name))
+    await db.commit()
+
+
+async def read_dashboard_stats(db: AsyncSession, schema_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Read the tenant's counters (single row)
+
+    The query is tenant-independent; db must be scoped with use_client_schema.
+
+    Returns:
+        Stats dict, or None if the tenant's CRM schema isn't initialised
+    """
+    if not await ensure_dashboard_stats(db, schema_name):
+        return None
+
+    result = await db.execute(text(f"""
+        SELECT s.contacts_total,
+               (SELECT COALESCE(SUM(contacts_added), 0) FROM crm_stats_daily
+                WHERE day >= CURRENT_DATE - {RECENT_DAYS - 1}),
+               s.donations_total, s.donations_amount, s.tracked_tables,
+               s.updated_at, s.refreshed_at
+        FROM crm_stats s
+    """))
+    row = result.first()
+
+    stats: Dict[str, Any] = {
+        "contacts": {"total": row[0], "recent": row[1]},
+        "donations": None,
+        "updated_at": row[5].isoformat(),
+        "refreshed_at": row[6].isoformat()
+    }
+    if "donations" in row[4]:
+        stats["donations"] = {
+            "total_donations": row[2],
+            "total_amount": float(row[3])
+        }
+    return stats
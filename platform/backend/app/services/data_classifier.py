@@ -0,0 +1,287 @@
+"""
+Local Data Classifier
+Scores uploaded tables against the entity definitions in ultra_flexible_templates
+Used ahead of the LLM: only low-confidence tables need an AI round trip
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Iterable, Set, Tuple
+import pandas as pd
+
+from ..models.ultra_flexible_templates import registry
+
+
+# Below this the onboarding pipeline asks the LLM instead
+DEFAULT_CONFIDENCE_THRESHOLD = 0.6
+
+# Score at which a table counts as a strong match on its own
+STRONG_SCORE = 8.0
+
+# Header spellings that map onto a standard field name
+FIELD_SYNONYMS: Dict[str, Dict[str, str]] = {
+    "contacts": {
+        "email_address": "email", "e_mail": "email", "phone_number": "phone", "telephone": "phone",
+        "mobile": "phone", "cell": "phone", "first": "first_name", "firstname": "first_name",
+        "given_name": "first_name", "last": "last_name", "lastname": "last_name", "surname": "last_name",
+        "name": "full_name", "full_name": "full_name", "organization": "organization", "company": "organization",
+        "org": "organization", "employer": "organization",
+    },
+    "donations": {
+        "donation": "amount", "donation_amount": "amount", "gift": "amount", "gift_amount": "amount",
+        "pledge_amount": "amount", "donation_date": "date", "gift_date": "date",
+        "donor": "donor_name", "donor_name": "donor_name", "contributor": "donor_name",
+        "method": "payment_method", "fund": "campaign", "appeal": "campaign",
+    },
+    "events": {
+        "event": "title", "event_name": "title", "event_date": "start_date", "date": "start_date",
+        "venue": "location",
+    },
+    "grants": {
+        "grantor": "grantor_organization", "funder": "grantor_organization", "foundation": "grantor_organization",
+        "requested": "amount_requested", "awarded": "amount_awarded", "award_amount": "amount_awarded",
+    },
+    "service_requests": {
+        "request": "request_type", "issue": "request_type", "category": "request_type",
+        "address": "location", "cross_street": "cross_street", "reported": "reported_date",
+    },
+    "organizations": {
+        "organization_name": "name", "company_name": "name", "org_name": "name", "url": "website",
+    },
+}
+
+# Words that point at an entity without being one of its field names; this is
+# the vocabulary the upload and intake heuristics used to hard-code
+ENTITY_KEYWORDS: Dict[str, List[str]] = {
+    "contacts": ["contact", "person", "people", "constituent", "email", "phone", "first", "last", "address"],
+    "donations": ["donation", "donor", "gift", "pledge", "amount", "contribution", "giving", "payment"],
+    "events": ["event", "program", "attendance", "attendee", "registration", "rsvp"],
+    "grants": ["grant", "grantor", "funder", "award", "application", "proposal"],
+    "service_requests": ["request", "ticket", "service", "graffiti", "trash", "crew", "priority", "cleanup"],
+    "organizations": ["organization", "company", "institution", "corporate", "business", "website"],
+    "activities": ["activity", "interaction", "call", "meeting", "outcome", "follow"],
+    # Entities without a template module (mapped in EXTRA_ENTITY_MODULES)
+    "volunteers": ["volunteer", "hours", "shift", "skills", "availability"],
+    "members": ["member", "membership", "dues"],
+}
+
+# Entity -> CRM module for entities that aren't a module's base entity
+EXTRA_ENTITY_MODULES = {"volunteers": "contacts", "members": "contacts"}
+
+# Field-name tokens too generic to say anything about the entity
+GENERIC_TOKENS = {
+    "id", "name", "type", "date", "status", "notes", "description", "title", "start", "end",
+    "to", "of", "by", "at", "json", "array", "estimated", "actual", "total",
+}
+
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[a-z]{2,}$", re.IGNORECASE)
+PHONE_PATTERN = re.compile(r"^\+?[\d\s().-]{7,20}$")
+MONEY_PATTERN = re.compile(r"^\$\s?-?[\d,]+(\.\d{1,2})?$")
+DECIMAL_PATTERN = re.compile(r"^-?\d+\.\d+$")
+
+SAMPLE_VALUES = 20
+
+
+def normalize_header(header: Any) -> str:
+    """'Email Address ' -> 'email_address'"""
+    return re.sub(r"[^a-z0-9]+", "_", str(header).strip().lower()).strip("_")
+
+
+def _tokens(text: str) -> Set[str]:
+    tokens = set()
+    for token in re.split(r"[^a-z0-9]+", text.lower()):
+        if token and token not in GENERIC_TOKENS:
+            tokens.add(token)
+            # Crude singular so "donors"/"grants" hit "donor"/"grant"
+            if len(token) > 3 and token.endswith("s"):
+                tokens.add(token[:-1])
+    return tokens
+
+
+@lru_cache(maxsize=1)
+def _vocabulary() -> Tuple[Dict[str, Set[str]], Dict[str, Set[str]], Dict[str, str], Dict[str, int]]:
+    """
+    Field names, keyword tokens and module per entity, from the module registry,
+    plus how many entities share each keyword
+
+    Built on the first classification, so importing the classifier doesn't compile the registry.
+    """
+    fields: Dict[str, Set[str]] = {}
+    keywords: Dict[str, Set[str]] = {}
+    entity_modules: Dict[str, str] = dict(EXTRA_ENTITY_MODULES)
+
+    for module_id, module in registry.modules().items():
+        for entity_name, entity_def in module.base_entities.items():
+            entity_modules[entity_name] = module_id
+            names = {f["name"] for f in entity_def.get("fields", [])}
+            names.update(f["name"] for f in module.optional_fields)
+            fields.setdefault(entity_name, set()).update(names)
+        for entity_name, extra in module.extension_fields.items():
+            fields.setdefault(entity_name, set()).update(f["name"] for f in extra)
+
+    for entity_name in set(fields) | set(ENTITY_KEYWORDS):
+        entity_fields = fields.setdefault(entity_name, set())
+        vocab = _tokens(entity_name)
+        vocab.update(ENTITY_KEYWORDS.get(entity_name, []))
+        for field_name in entity_fields:
+            # Reference columns (contact_id) describe the other entity
+            if not field_name.endswith("_id"):
+                vocab.update(_tokens(field_name))
+        keywords[entity_name] = vocab
+
+    # A keyword shared by many entities ("amount", "location") is weak evidence
+    spread: Dict[str, int] = {}
+    for vocab in keywords.values():
+        for token in vocab:
+            spread[token] = spread.get(token, 0) + 1
+
+    return fields, keywords, entity_modules, spread
+
+
+def _confidence(best: float, runner_up: float) -> float:
+    """Strength of the best score times its margin over the runner-up"""
+    if best <= 0:
+        return 0.0
+    return round(min(1.0, best / STRONG_SCORE) * (1.0 - 0.5 * runner_up / best), 3)
+
+
+def _is_phone(value: str) -> bool:
+    digits = sum(c.isdigit() for c in value)
+    return bool(PHONE_PATTERN.match(value)) and 7 <= digits <= 15 and not DECIMAL_PATTERN.match(value)
+
+
+def _value_pattern_scores(values: Iterable[Any]) -> Dict[str, float]:
+    """Entity evidence from what a column's values look like"""
+    sample = [str(v).strip() for v in values if v is not None and not pd.isna(v) and str(v).strip()]
+    if not sample:
+        return {}
+
+    def share(matches) -> float:
+        return sum(1 for v in sample if matches(v)) / len(sample)
+
+    scores: Dict[str, float] = {}
+    if share(EMAIL_PATTERN.match) >= 0.6:
+        scores["contacts"] = 2.0
+    elif share(_is_phone) >= 0.6:
+        scores["contacts"] = 1.0
+    if share(MONEY_PATTERN.match) >= 0.6:
+        scores["donations"] = 1.0
+        scores["grants"] = 0.5
+    return scores
+
+
+def classify_columns(columns: List[Any], table_name: str = "", samples: Optional[Dict[Any, List[Any]]] = None) -> Dict[str, Any]:
+    """
+    Classify a table from its headers (and optionally sample values per column)
+
+    Returns:
+        {"entity_type", "confidence", "field_mapping", "scores", "reasoning", "source": "local"}
+    """
+    entity_fields, entity_vocabulary, _, keyword_spread = _vocabulary()
+    scores: Dict[str, float] = {entity: 0.0 for entity in entity_vocabulary}
+    mappings: Dict[str, Dict[str, str]] = {entity: {} for entity in entity_vocabulary}
+
+    for column in columns:
+        normalized = normalize_header(column)
+        column_tokens = _tokens(normalized)
+        for entity, vocab in entity_vocabulary.items():
+            synonym = FIELD_SYNONYMS.get(entity, {}).get(normalized)
+            if normalized in entity_fields[entity] or synonym:
+                weight = 3.0
+                mappings[entity][str(column)] = synonym or normalized
+            else:
+                hits = column_tokens & vocab
+                weight = max((1.5 / keyword_spread[t] for t in hits), default=0.0)
+            scores[entity] += weight
+        if samples and column in samples:
+            for entity, weight in _value_pattern_scores(samples[column][:SAMPLE_VALUES]).items():
+                scores[entity] += weight
+
+    # The table/sheet name is a strong hint ("Donor List 2024")
+    name_tokens = _tokens(normalize_header(table_name)) if table_name else set()
+    for entity in scores:
+        if name_tokens & (_tokens(entity) | set(ENTITY_KEYWORDS.get(entity, [])[:2])):
+            scores[entity] += 3.0
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    (best_entity, best), (_, runner_up) = ranked[0], ranked[1]
+    confidence = _confidence(best, runner_up)
+    top = {entity: round(score, 2) for entity, score in ranked[:3] if score > 0}
+
+    return {
+        "entity_type": best_entity if best > 0 else "unknown",
+        "confidence": confidence,
+        "field_mapping": mappings[best_entity] if best > 0 else {},
+        "scores": top,
+        "reasoning": f"Local header/value scoring: {top}" if top else "No recognisable columns",
+        "source": "local"
+    }
+
+
+def classify_table(table_name: str, df: pd.DataFrame) -> Dict[str, Any]:
+    """Classify a DataFrame (headers plus the first SAMPLE_VALUES values of each column)"""
+    head = df.head(SAMPLE_VALUES)
+    samples = {column: head[column].tolist() for column in head.columns}
+    return classify_columns(list(df.columns), table_name, samples)
+
+
+def entity_module(entity_type: str) -> Optional[str]:
+    """CRM module that holds an entity type"""
+    return _vocabulary()[2].get(entity_type)
+
+
+def suggest_modules(classifications: Iterable[Dict[str, Any]], base: Optional[List[str]] = None) -> List[str]:
+    """Modules for a set of table classifications (contacts always included)"""
+    modules = list(base or ["contacts"])
+    for classification in classifications:
+        module_id = entity_module(classification["entity_type"])
+        if module_id and module_id not in modules:
+            modules.append(module_id)
+    return modules
+
+
+def classify_text(text: Optional[str]) -> List[str]:
+    """Entity types mentioned in free text (e.g. an intake form's data description)"""
+    if not text:
+        return []
+    words = _tokens(text)
+    return [entity for entity, keywords in ENTITY_KEYWORDS.items() if words & set(keywords[:2])]
+
+
+def classify_organization(classifications: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Organization template from the table classifications
+
+    Each confidently classified table votes for the templates that require
+    (or suggest) its module; modules every template shares carry no vote.
+
+    Returns:
+        Same shape as the LLM organization analysis, plus "source": "local"
+    """
+    templates = registry.templates()
+    shared = set.intersection(*(set(t.required_modules) for t in templates.values()))
+    votes = {template_id: 0.0 for template_id in templates}
+    for classification in classifications.values():
+        module_id = entity_module(classification["entity_type"])
+        if not module_id or module_id in shared:
+            continue
+        for template_id, template in templates.items():
+            if module_id in template.required_modules:
+                votes[template_id] += classification["confidence"]
+            elif module_id in template.suggested_modules:
+                votes[template_id] += 0.5 * classification["confidence"]
+
+    ranked = sorted(votes.items(), key=lambda item: item[1], reverse=True)
+    (best_type, best), (_, runner_up) = ranked[0], ranked[1]
+    # Two confident tables are enough evidence for an organization type
+    confidence = round(min(1.0, best / 1.5) * (1.0 - 0.5 * runner_up / best), 3) if best > 0 else 0.0
+    entities = sorted({c["entity_type"] for c in classifications.values() if c["entity_type"] != "unknown"})
+
+    return {
+        "type": best_type if best > 0 else "nonprofit",
+        "confidence": confidence,
+        "primary_activities": entities,
+        "focus_areas": [],
+        "reasoning": f"Local classification from detected entities {entities} (template votes {votes})",
+        "source": "local"
+    }
@@ -0,0 +1,196 @@
+"""
+Data Cleaning Pipeline
+Plans the transforms for each column once per (entity type, header) and applies them in a single pass
+Low-cardinality text is stored as category and money as Arrow decimals
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Tuple
+import pandas as pd
+import pyarrow as pa
+
+
+MONEY_COLUMNS = ('amount', 'donation_amount', 'gift_amount')
+DATE_COLUMNS = ('date', 'gift_date', 'donation_date')
+
+SERVICE_STATUS_MAPPING = {
+    'open': 'Reported',
+    'in progress': 'In Progress',
+    'completed': 'Completed',
+    'closed': 'Completed'
+}
+
+# Matches the generated schemas' Numeric(12, 2) amount columns
+MONEY_PRECISION = 12
+MONEY_SCALE = 2
+MONEY_DTYPE = pd.ArrowDtype(pa.decimal128(MONEY_PRECISION, MONEY_SCALE))
+MONEY_LIMIT = 10 ** (MONEY_PRECISION - MONEY_SCALE)
+
+# Text columns become category when distinct values are at most this share of the rows
+CATEGORY_MAX_UNIQUE_RATIO = 0.1
+CATEGORY_MIN_ROWS = 100
+CATEGORY_KINDS = ("text", "status")
+
+
+@dataclass(frozen=True)
+class ColumnPlan:
+    """What to do with one column ("text", "email", "phone", "money", "date" or "status")"""
+    position: int
+    name: str
+    kind: str
+
+
+@dataclass(frozen=True)
+class CleaningPlan:
+    """Column plans for one entity type and header, reusable across frames and chunks"""
+    entity_type: str
+    columns: Tuple[ColumnPlan, ...]
+    split_full_name: bool
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Clean df (which must have the header the plan was compiled for)"""
+        names: List[str] = []
+        cleaned: Dict[int, pd.Series] = {}
+        for plan in self.columns:
+            series = _by_unique(df.iloc[:, plan.position], _CLEANERS[plan.kind])
+            if plan.kind in CATEGORY_KINDS:
+                series = _maybe_category(series)
+            cleaned[len(names)] = series
+            names.append(plan.name)
+
+        if self.split_full_name:
+            first, last = _split_full_name(cleaned[names.index('full_name')])
+            cleaned[len(names)], cleaned[len(names) + 1] = first, last
+            names.extend(['first_name', 'last_name'])
+
+        result = pd.DataFrame(cleaned, index=df.index)
+        result.columns = names
+        # Rows with nothing left after cleaning (blank or whitespace-only)
+        return result[result.notna().any(axis=1)] if len(result.columns) else result
+
+
+@lru_cache(maxsize=256)
+def compile_cleaning_plan(entity_type: str, columns: Tuple[str, ...]) -> CleaningPlan:
+    """Per-column transforms from the entity type and (already mapped) column names"""
+    plans = []
+    for position, name in enumerate(columns):
+        kind = "text"
+        if entity_type == "contacts" and name == 'email':
+            kind = "email"
+        elif entity_type == "contacts" and name == 'phone':
+            kind = "phone"
+        elif entity_type == "donations" and name in MONEY_COLUMNS:
+            kind = "money"
+        elif entity_type == "donations" and name in DATE_COLUMNS:
+            kind = "date"
+        elif entity_type == "service_requests" and name == 'status':
+            kind = "status"
+        plans.append(ColumnPlan(position, name, kind))
+
+    split_full_name = entity_type == "contacts" and 'full_name' in columns and 'first_name' not in columns
+    return CleaningPlan(entity_type, tuple(plans), split_full_name)
+
+
+def clean_frame(df: pd.DataFrame, entity_type: str) -> pd.DataFrame:
+    """Clean a frame of the given entity type (plans are cached by header)"""
+    return compile_cleaning_plan(entity_type, tuple(str(c) for c in df.columns)).apply(df)
+
+
+def money_as_float(df: pd.DataFrame) -> pd.DataFrame:
+    """Decimal money columns as float64, for JSON consumers that need numbers (Elasticsearch)"""
+    money = [c for c in df.columns if df[c].dtype == MONEY_DTYPE]
+    if not money:
+        return df
+    return df.astype({c: "float64" for c in money})
+
+
+def _is_text(series: pd.Series) -> bool:
+    return pd.api.types.infer_dtype(series, skipna=True) in ("string", "empty")
+
+
+def _stripped(series: pd.Series) -> pd.Series:
+    """Whitespace stripped, blanks as missing"""
+    stripped = series.str.strip()
+    return stripped.mask(stripped == "")
+
+
+def _by_unique(series: pd.Series, clean) -> pd.Series:
+    """Run an elementwise cleaner on the distinct values only, when they are few"""
+    codes, uniques = pd.factorize(series)
+    if len(uniques) > len(series) * CATEGORY_MAX_UNIQUE_RATIO:
+        return clean(series)
+    cleaned = clean(pd.Series(uniques))
+    values = pd.api.extensions.take(cleaned.array, codes, allow_fill=True)
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def _maybe_category(series: pd.Series) -> pd.Series:
+    if len(series) < CATEGORY_MIN_ROWS:
+        return series
+    if series.nunique() <= len(series) * CATEGORY_MAX_UNIQUE_RATIO:
+        return series.astype("category")
+    return series
+
+
+def _clean_text(series: pd.Series) -> pd.Series:
+    if not _is_text(series):
+        # Numbers/dates/mixed cells are left alone apart from blank strings
+        return series.mask(series == "") if series.dtype == object else series
+    return _stripped(series)
+
+
+def _clean_email(series: pd.Series) -> pd.Series:
+    if not _is_text(series):
+        series = series.astype("str")
+    return _stripped(series).str.lower()
+
+
+def _clean_phone(series: pd.Series) -> pd.Series:
+    if pd.api.types.is_float_dtype(series):
+        # Spreadsheet phone numbers often arrive as floats (5551234567.0)
+        series = series.round().astype("Int64")
+    digits = series.astype("str").str.replace(r'\D', '', regex=True)
+    return digits.mask(series.isna() | (digits == ""))
+
+
+def _clean_money(series: pd.Series) -> pd.Series:
+    if not pd.api.types.is_numeric_dtype(series):
+        series = pd.to_numeric(series.astype("str").str.replace(r'[\$,\s]', '', regex=True), errors='coerce')
+    series = series.astype("float64")
+    # Out-of-range amounts can't be stored in the target column
+    series = series.where(series.abs() < MONEY_LIMIT).round(MONEY_SCALE)
+    return series.astype(MONEY_DTYPE)
+
+
+def _clean_date(series: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    if _is_text(series):
+        series = _stripped(series)
+    return pd.to_datetime(series, errors='coerce')
+
+
+def _clean_status(series: pd.Series) -> pd.Series:
+    if not _is_text(series):
+        return _clean_text(series)
+    stripped = _stripped(series)
+    mapped = stripped.str.lower().map(SERVICE_STATUS_MAPPING)
+    return mapped.fillna(stripped)
+
+
+def _split_full_name(series: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    parts = series.astype("str").str.split(' ', n=1, expand=True)
+    first = parts[0].mask(series.isna())
+    last = parts[1] if 1 in parts.columns else pd.Series(pd.NA, index=series.index, dtype="str")
+    return first, last
+
+
+_CLEANERS = {
+    "text": _clean_text,
+    "email": _clean_email,
+    "phone": _clean_phone,
+    "money": _clean_money,
+    "date": _clean_date,
+    "status": _clean_status,
+}
@@ -0,0 +1,253 @@
+"""
+Upload File Loader
+Parses uploaded spreadsheets in worker processes, one pass per workbook
+Each file's sheets are streamed back as soon as it is parsed, so analysis can start on the first one
+Previews only read the header and first rows; the full parse waits for import
+"""
+
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Any, Optional, Iterator, AsyncIterator, Tuple
+import pandas as pd
+
+from ..core.config import settings
+
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm')
+LEGACY_EXCEL_EXTENSIONS = ('.xls',)
+CSV_EXTENSIONS = ('.csv',)
+
+# Rows parsed for a preview (enough for column classification)
+SAMPLE_ROWS = 200
+
+# CSVs up to this size get an exact newline count; larger ones are estimated
+# from the average line length of the head
+EXACT_COUNT_BYTES = 64 * 1024 * 1024
+COUNT_CHUNK_BYTES = 1024 * 1024
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def loader_pool() -> ProcessPoolExecutor:
+    """Shared worker pool (spawned, so workers don't inherit the event loop or sockets)"""
+    global _pool
+    if _pool is None:
+        workers = settings.FILE_LOADER_PROCESSES or min(4, os.cpu_count() or 1)
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _reset_pool(broken: ProcessPoolExecutor) -> None:
+    """Drop a pool whose worker died; the next loader_pool() call starts a fresh one"""
+    global _pool
+    if _pool is broken:
+        _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def is_supported(path: str) -> bool:
+    return path.lower().endswith(EXCEL_EXTENSIONS + LEGACY_EXCEL_EXTENSIONS + CSV_EXTENSIONS)
+
+
+def _column_names(header: Tuple[Any, ...]) -> List[str]:
+    """pandas read_excel naming: blank headers become 'Unnamed: i', repeats get '.n'"""
+    names: List[str] = []
+    seen: Dict[str, int] = {}
+    for i, value in enumerate(header):
+        name = f"Unnamed: {i}" if value is None or str(value).strip() == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def sheet_frame(rows: Iterator[Tuple[Any, ...]]) -> pd.DataFrame:
+    """DataFrame from worksheet rows (first row is the header)"""
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+    columns = _column_names(header)
+    width = len(columns)
+    data = [tuple(row[:width]) + (None,) * (width - len(row)) for row in rows]
+    # Read-only worksheets often report formatted-but-empty rows at the end
+    while data and all(value is None for value in data[-1]):
+        data.pop()
+    # ...and trailing columns with neither a header nor values
+    while width and header[width - 1] is None and all(row[width - 1] is None for row in data):
+        width -= 1
+    if width < len(columns):
+        columns = columns[:width]
+        data = [row[:width] for row in data]
+    return pd.DataFrame(data, columns=columns)
+
+
+def iter_file_frames(path: str, name: str) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """(table key, DataFrame) per sheet, parsing the file once"""
+    lower = path.lower()
+    if lower.endswith(EXCEL_EXTENSIONS):
+        from openpyxl import load_workbook
+
+        # Read-only mode streams each sheet's XML instead of building the whole workbook
+        workbook = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+        try:
+            multiple = len(workbook.sheetnames) > 1
+            for worksheet in workbook.worksheets:
+                key = f"{name}_{worksheet.title}" if multiple else name
+                yield key, sheet_frame(worksheet.iter_rows(values_only=True))
+        finally:
+            workbook.close()
+    elif lower.endswith(LEGACY_EXCEL_EXTENSIONS):
+        # xlrd has no streaming mode; sheet_name=None still opens the file once
+        sheets = pd.read_excel(path, sheet_name=None)
+        for sheet_name, frame in sheets.items():
+            yield (f"{name}_{sheet_name}" if len(sheets) > 1 else name), frame
+    elif lower.endswith(CSV_EXTENSIONS):
+        yield name, pd.read_csv(path)
+
+
+class LineCounter:
+    """Counts CSV data rows from raw byte chunks (no decoding or parsing)"""
+
+    def __init__(self):
+        self.newlines = 0
+        self.size = 0
+        self._last = b""
+
+    def update(self, chunk: bytes) -> None:
+        if chunk:
+            self.newlines += chunk.count(b"\n")
+            self.size += len(chunk)
+            self._last = chunk[-1:]
+
+    @property
+    def rows(self) -> int:
+        """Lines minus the header (quoted multi-line values count once per line)"""
+        lines = self.newlines + (1 if self._last not in (b"", b"\n") else 0)
+        return max(lines - 1, 0)
+
+
+def count_csv_rows(path: str) -> Tuple[int, bool]:
+    """
+    Data rows in a CSV from a newline scan
+
+    Returns:
+        (row count, whether it is an estimate) - files over EXACT_COUNT_BYTES
+        are estimated from size and the average line length of the first chunk
+    """
+    size = os.path.getsize(path)
+    counter = LineCounter()
+    with open(path, "rb") as f:
+        if size > EXACT_COUNT_BYTES:
+            counter.update(f.read(COUNT_CHUNK_BYTES))
+            line_length = counter.size / max(counter.newlines, 1)
+            return max(int(size / line_length) - 1, 0), True
+        while chunk := f.read(COUNT_CHUNK_BYTES):
+            counter.update(chunk)
+    return counter.rows, False
+
+
+def _sample(key: str, frame: pd.DataFrame, row_count: Optional[int], estimated: bool, file_format: str) -> Dict[str, Any]:
+    return {
+        "key": key,
+        "format": file_format,
+        "columns": [str(c) for c in frame.columns],
+        "row_count": row_count,
+        "row_count_estimated": estimated,
+        "frame": frame,
+    }
+
+
+def sample_file(path: str, name: str, nrows: int = SAMPLE_ROWS) -> List[Dict[str, Any]]:
+    """
+    Header and first rows of every sheet, plus a cheap row count
+
+    Nothing past the first nrows is parsed: CSV rows are counted by newline
+    scan (estimated for very large files) and .xlsx rows come from the
+    sheet's dimension record (None if the writer didn't store one).
+
+    Returns:
+        One dict per sheet with key, format, columns, row_count,
+        row_count_estimated and frame (the sampled rows as a DataFrame)
+    """
+    lower = path.lower()
+    if lower.endswith(CSV_EXTENSIONS):
+        row_count, estimated = count_csv_rows(path)
+        frame = pd.read_csv(path, nrows=nrows)
+        return [_sample(name, frame, row_count, estimated, "csv")]
+
+    if lower.endswith(EXCEL_EXTENSIONS):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+        try:
+            multiple = len(workbook.sheetnames) > 1
+            samples = []
+            for worksheet in workbook.worksheets:
+                key = f"{name}_{worksheet.title}" if multiple else name
+                frame = sheet_frame(worksheet.iter_rows(max_row=nrows + 1, values_only=True))
+                max_row = worksheet.max_row
+                row_count = max(max_row - 1, 0) if max_row else None
+                samples.append(_sample(key, frame, row_count, False, "xlsx"))
+            return samples
+        finally:
+            workbook.close()
+
+    if lower.endswith(LEGACY_EXCEL_EXTENSIONS):
+        # xlrd reads the whole file anyway; only the DataFrames are limited
+        with pd.ExcelFile(path) as excel:
+            multiple = len(excel.sheet_names) > 1
+            samples = []
+            for sheet_name in excel.sheet_names:
+                key = f"{name}_{sheet_name}" if multiple else name
+                frame = excel.parse(sheet_name, nrows=nrows)
+                row_count = max(excel.book.sheet_by_name(sheet_name).nrows - 1, 0)
+                samples.append(_sample(key, frame, row_count, False, "xls"))
+            return samples
+
+    raise ValueError(f"Unsupported file type: {name}")
+
+
+def _load_file(path: str, name: str) -> List[Tuple[str, pd.DataFrame]]:
+    """Worker: every sheet of one file (returned, so each frame is pickled once)"""
+    return list(iter_file_frames(path, name))
+
+
+async def _load_in_pool(index: int, path: str, name: str) -> Tuple[int, List[Tuple[str, pd.DataFrame]]]:
+    """(index, sheets) for one file; load errors are reported and yield no sheets"""
+    pool = loader_pool()
+    try:
+        return index, await asyncio.get_running_loop().run_in_executor(pool, _load_file, path, name)
+    except BrokenProcessPool as e:
+        _reset_pool(pool)
+        print(f"Error loading {name}: loader worker died ({e})")
+    except Exception as e:
+        print(f"Error loading {name}: {type(e).__name__}: {e}")
+    return index, []
+
+
+async def stream_data_files(uploaded_files: List[Dict]) -> AsyncIterator[Tuple[int, str, pd.DataFrame]]:
+    """
+    Parse uploaded files in the worker pool and yield sheets as they are ready
+
+    Yields:
+        (index of the file in uploaded_files, table key, DataFrame), files in
+        the order they finish parsing
+    """
+    tasks = [
+        asyncio.ensure_future(_load_in_pool(i, f["path"], f["name"]))
+        for i, f in enumerate(uploaded_files) if is_supported(f["path"])
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, sheets = await next_done
+            for key, frame in sheets:
+                yield index, key, frame
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -10,6 +10,8 @@ from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 from pathlib import Path
 
+from .data_classifier import classify_text
+
 # Add Make-Lit to path for imports
 MAKELIT_PATH = "/Users/Laurie/Make-Lit"
 if MAKELIT_PATH not in sys.path:
@@ -152,29 +154,11 @@ class MakeLitIntegrationService:
         if not data_files_info:
             return ["contacts"]
 
-        data_types = []
-        info_lower = data_files_info.lower()
-
-        type_mapping = {
-            "contact": "contacts",
-            "donor": "donations",
-            "donation": "donations",
-            "event": "events",
-            "volunteer": "volunteers",
-            "grant": "grants",
-            "member": "members",
-            "organization": "organizations"
-        }
-
-        for keyword, data_type in type_mapping.items():
-            if keyword in info_lower:
-                data_types.append(data_type)
+        # Same keyword vocabulary as the upload classifier
+        data_types = classify_text(data_files_info)
 
         # Default to contacts if nothing detected
-        if not data_types:
-            data_types = ["contacts"]
-
-        return list(set(data_types))  # Remove duplicates
+        return data_types or ["contacts"]
 
     def recommend_modules(self, org_type: str, data_types: List[str]) -> List[str]:
         """Recommend Make-Lit modules based on organization type and data"""
@@ -0,0 +1,176 @@
+"""
+Realtime Token Service
+Pre-warmed pool of OpenAI Realtime client secrets for the voice interface
+Session configs are cached per tenant and config version (LRU-bounded); session start pops a ready secret
+"""
+
+import time
+import asyncio
+from collections import deque, OrderedDict
+from typing import Dict, Any, Optional, Tuple, Callable, Deque
+
+import httpx
+
+from ..core.config import settings
+
+
+class RealtimeTokenService:
+    """
+    Mints realtime client secrets over a persistent async client and pools them per key
+
+    A key identifies one session config (tenant + config version). Keys are
+    LRU-bounded, a tenant's newer version evicts its older ones, and a pool is
+    only kept warm for keys asked for more than once.
+    """
+
+    def __init__(
+        self,
+        realtime_url: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+        max_keys: Optional[int] = None,
+        min_remaining: float = 60.0
+    ):
+        self.realtime_url = realtime_url or settings.OPENAI_REALTIME_URL
+        self.pool_size = pool_size if pool_size is not None else settings.REALTIME_TOKEN_POOL_SIZE
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.REALTIME_TOKEN_TTL_SECONDS
+        self.max_keys = max_keys if max_keys is not None else settings.REALTIME_TOKEN_MAX_KEYS
+        self.min_remaining = min_remaining
+        self._client: Optional[httpx.AsyncClient] = None
+        self._configs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tenants: Dict[str, str] = {}
+        self._pools: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._refills: Dict[str, asyncio.Task] = {}
+
+    def _http(self) -> httpx.AsyncClient:
+        """Lazily create the shared HTTP client (bound to the running loop)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=10)
+        return self._client
+
+    def session_config(
+        self,
+        key: str,
+        build: Callable[[], Dict[str, Any]],
+        tenant: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Get cached session config for key, building it on first use (replaces the tenant's older key)"""
+        config = self._configs.get(key)
+        if config is not None:
+            self._configs.move_to_end(key)
+            return config
+        config = build()
+        self._configs[key] = config
+        if tenant is not None:
+            previous = self._tenants.get(tenant)
+            if previous is not None and previous != key:
+                self.invalidate(previous)
+            self._tenants[tenant] = key
+        while len(self._configs) > self.max_keys:
+            self.invalidate(next(iter(self._configs)))
+        return config
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop cached config (and secrets minted from it) for one or all keys"""
+        if key is None:
+            for task in self._refills.values():
+                task.cancel()
+            self._configs.clear()
+            self._pools.clear()
+            self._refills.clear()
+            self._tenants.clear()
+            return
+        self._configs.pop(key, None)
+        self._pools.pop(key, None)
+        task = self._refills.pop(key, None)
+        if task is not None:
+            task.cancel()
+        for tenant in [t for t, current in self._tenants.items() if current == key]:
+            del self._tenants[tenant]
+
+    async def mint(self, config: Dict[str, Any]) -> Tuple[int, Any]:
+        """Mint a single client secret (one round trip to OpenAI)"""
+        body = {
+            "expires_after": {"anchor": "created_at", "seconds": self.ttl_seconds},
+            **config
+        }
+        response = await self._http().post(
+            self.realtime_url,
+            headers={
+                "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
+                "Content-Type": "application/json",
+            },
+            json=body,
+        )
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {"error": response.text}
+        return response.status_code, payload
+
+    def _take(self, key: str) -> Optional[Dict[str, Any]]:
+        """Pop the next secret that still has enough lifetime left"""
+        pool = self._pools.get(key)
+        now = time.time()
+        while pool:
+            secret = pool.popleft()
+            if float(secret.get("expires_at") or 0) - now > self.min_remaining:
+                return secret
+        return None
+
+    async def get_token(
+        self,
+        key: str,
+        build: Callable[[], Dict[str, Any]],
+        tenant: Optional[str] = None
+    ) -> Tuple[int, Any]:
+        """Get a client secret for key: pooled if available, minted directly otherwise"""
+        seen = key in self._configs
+        config = self.session_config(key, build, tenant)
+        secret = self._take(key)
+        if seen:
+            # A key's first session mints directly; pools are only kept for repeat keys
+            self._schedule_refill(key)
+        if secret is not None:
+            return 200, secret
+        return await self.mint(config)
+
+    def _schedule_refill(self, key: str) -> None:
+        if self.pool_size <= 0:
+            return
+        task = self._refills.get(key)
+        if task is not None and not task.done():
+            return
+        self._refills[key] = asyncio.get_running_loop().create_task(self._refill(key))
+
+    async def _refill(self, key: str) -> None:
+        """Top the key's pool back up to pool_size in the background"""
+        config = self._configs.get(key)
+        if config is None:
+            return
+        pool = self._pools.setdefault(key, deque())
+        while len(pool) < self.pool_size:
+            try:
+                status_code, payload = await self.mint(config)
+            except httpx.HTTPError:
+                return
+            if status_code >= 300 or not isinstance(payload, dict):
+                return
+            if self._configs.get(key) is not config:
+                # Config invalidated while minting; discard the stale secret
+                return
+            payload.setdefault("expires_at", time.time() + self.ttl_seconds)
+            pool.append(payload)
+
+    async def aclose(self) -> None:
+        """Cancel pending refills and close the HTTP client"""
+        for task in self._refills.values():
+            task.cancel()
+        self._refills.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global service instance
+realtime_token_service = RealtimeTokenService()
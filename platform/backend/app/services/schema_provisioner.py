@@ -0,0 +1,579 @@
+"""
+Schema Provisioning
+Renders a tenant's complete DDL (tables, constraints, indexes, triggers) and runs it in one transaction
+A pool of empty pre-provisioned schemas lets a sign-up with a pooled layout claim one by renaming it
+"""
+
+import uuid
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from typing import Dict, List, Any, Optional, Set, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..models.ultra_flexible_templates import build_client_configuration
+from .contact_dedup import contact_dedup_ddl
+from .contact_search import contact_search_ddl
+from .dashboard_stats import dashboard_stats_ddl
+
+
+logger = logging.getLogger(__name__)
+
+# Schema name plans are rendered against (replaced per tenant)
+SCHEMA_PLACEHOLDER = "__crm_schema__"
+
+POOL_SCHEMA_PREFIX = "crm_pool_"
+
+# Basic generator modules, in creation order (referenced tables first)
+BASIC_MODULE_DDL = {
+    'contacts': '''
+        CREATE TABLE IF NOT EXISTS {schema}.contacts (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            first_name VARCHAR(100),
+            last_name VARCHAR(100),
+            email VARCHAR(255),
+            phone VARCHAR(50),
+            organization VARCHAR(255),
+            title VARCHAR(100),
+            address TEXT,
+            city VARCHAR(100),
+            state VARCHAR(50),
+            zip VARCHAR(20),
+            country VARCHAR(100) DEFAULT 'USA',
+            notes TEXT,
+            tags TEXT[],
+            status VARCHAR(50) DEFAULT 'active',
+            source VARCHAR(100),
+            created_at TIMESTAMP DEFAULT NOW(),
+            updated_at TIMESTAMP DEFAULT NOW()
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_contacts_email ON {schema}.contacts(email);
+        CREATE INDEX IF NOT EXISTS idx_contacts_name ON {schema}.contacts(last_name, first_name);
+        CREATE INDEX IF NOT EXISTS idx_contacts_organization ON {schema}.contacts(organization);
+    ''',
+
+    'donations': '''
+        CREATE TABLE IF NOT EXISTS {schema}.donations (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            contact_id UUID REFERENCES {schema}.contacts(id),
+            donor_name VARCHAR(255),
+            donor_email VARCHAR(255),
+            amount DECIMAL(10,2) NOT NULL,
+            donation_date DATE NOT NULL,
+            campaign VARCHAR(255),
+            fund VARCHAR(255),
+            method VARCHAR(100),
+            reference_number VARCHAR(100),
+            notes TEXT,
+            status VARCHAR(50) DEFAULT 'completed',
+            tax_deductible BOOLEAN DEFAULT true,
+            acknowledged BOOLEAN DEFAULT false,
+            created_at TIMESTAMP DEFAULT NOW(),
+            updated_at TIMESTAMP DEFAULT NOW()
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_donations_contact ON {schema}.donations(contact_id);
+        CREATE INDEX IF NOT EXISTS idx_donations_date ON {schema}.donations(donation_date);
+        CREATE INDEX IF NOT EXISTS idx_donations_campaign ON {schema}.donations(campaign);
+    ''',
+
+    'events': '''
+        CREATE TABLE IF NOT EXISTS {schema}.events (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            name VARCHAR(255) NOT NULL,
+            description TEXT,
+            event_date DATE,
+            start_time TIME,
+            end_time TIME,
+            location VARCHAR(255),
+            address TEXT,
+            capacity INTEGER,
+            registered_count INTEGER DEFAULT 0,
+            price DECIMAL(8,2) DEFAULT 0,
+            status VARCHAR(50) DEFAULT 'planned',
+            category VARCHAR(100),
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT NOW(),
+            updated_at TIMESTAMP DEFAULT NOW()
+        );
+
+        CREATE TABLE IF NOT EXISTS {schema}.event_registrations (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            event_id UUID REFERENCES {schema}.events(id),
+            contact_id UUID REFERENCES {schema}.contacts(id),
+            registration_date TIMESTAMP DEFAULT NOW(),
+            status VARCHAR(50) DEFAULT 'registered',
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT NOW()
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_events_date ON {schema}.events(event_date);
+        CREATE INDEX IF NOT EXISTS idx_registrations_event ON {schema}.event_registrations(event_id);
+    ''',
+
+    'volunteers': '''
+        CREATE TABLE IF NOT EXISTS {schema}.volunteers (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            contact_id UUID REFERENCES {schema}.contacts(id),
+            volunteer_name VARCHAR(255),
+            email VARCHAR(255),
+            phone VARCHAR(50),
+            skills TEXT[],
+            availability TEXT,
+            hours_logged DECIMAL(8,2) DEFAULT 0,
+            status VARCHAR(50) DEFAULT 'active',
+            background_check BOOLEAN DEFAULT false,
+            emergency_contact VARCHAR(255),
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT NOW(),
+            updated_at TIMESTAMP DEFAULT NOW()
+        );
+
+        CREATE TABLE IF NOT EXISTS {schema}.volunteer_hours (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            volunteer_id UUID REFERENCES {schema}.volunteers(id),
+            activity VARCHAR(255),
+            hours DECIMAL(4,2) NOT NULL,
+            date DATE NOT NULL,
+            notes TEXT,
+            approved BOOLEAN DEFAULT false,
+            created_at TIMESTAMP DEFAULT NOW()
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_volunteers_contact ON {schema}.volunteers(contact_id);
+        CREATE INDEX IF NOT EXISTS idx_volunteer_hours_volunteer ON {schema}.volunteer_hours(volunteer_id);
+    ''',
+
+    'grants': '''
+        CREATE TABLE IF NOT EXISTS {schema}.grants (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            name VARCHAR(255) NOT NULL,
+            funder VARCHAR(255),
+            amount DECIMAL(12,2),
+            purpose TEXT,
+            application_date DATE,
+            decision_date DATE,
+            start_date DATE,
+            end_date DATE,
+            status VARCHAR(50) DEFAULT 'researching',
+            probability INTEGER DEFAULT 0,
+            notes TEXT,
+            documents TEXT[],
+            created_at TIMESTAMP DEFAULT NOW(),
+            updated_at TIMESTAMP DEFAULT NOW()
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_grants_status ON {schema}.grants(status);
+        CREATE INDEX IF NOT EXISTS idx_grants_decision_date ON {schema}.grants(decision_date);
+    ''',
+
+    'services': '''
+        CREATE TABLE IF NOT EXISTS {schema}.service_requests (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            contact_id UUID REFERENCES {schema}.contacts(id),
+            title VARCHAR(255) NOT NULL,
+            description TEXT,
+            category VARCHAR(100),
+            priority VARCHAR(50) DEFAULT 'medium',
+            status VARCHAR(50) DEFAULT 'open',
+            assigned_to VARCHAR(255),
+            requested_date DATE DEFAULT CURRENT_DATE,
+            completed_date DATE,
+            location VARCHAR(255),
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT NOW(),
+            updated_at TIMESTAMP DEFAULT NOW()
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_service_requests_contact ON {schema}.service_requests(contact_id);
+        CREATE INDEX IF NOT EXISTS idx_service_requests_status ON {schema}.service_requests(status);
+    '''
+}
+
+BASIC_MODULE_TABLES = {
+    'contacts': ('contacts',),
+    'donations': ('donations',),
+    'events': ('events', 'event_registrations'),
+    'volunteers': ('volunteers', 'volunteer_hours'),
+    'grants': ('grants',),
+    'services': ('service_requests',),
+}
+
+# Columns every template entity table gets (ids and timestamps are set on import too)
+SYSTEM_COLUMNS = (
+    ("id", "UUID PRIMARY KEY DEFAULT gen_random_uuid()"),
+    ("created_at", "TIMESTAMP NOT NULL DEFAULT NOW()"),
+    ("updated_at", "TIMESTAMP"),
+    ("created_by", "VARCHAR(255)"),
+)
+
+# Template field types; "string" uses max_length, "reference" is a UUID foreign key,
+# anything else (e.g. "file") has no column
+FIELD_TYPES = {
+    "email": "VARCHAR(255)",
+    "phone": "VARCHAR(50)",
+    "text": "TEXT",
+    "url": "VARCHAR(2048)",
+    "integer": "INTEGER",
+    "decimal": "NUMERIC(12,2)",
+    "boolean": "BOOLEAN",
+    "datetime": "TIMESTAMP",
+    "date": "TIMESTAMP",  # Store as datetime for simplicity
+    "json": "JSONB",
+    "json_array": "JSONB",
+    "choice": "VARCHAR(100)",
+}
+
+# Choice columns that list views filter on
+INDEXED_CHOICE_FIELDS = ("status", "priority", "request_type", "activity_type")
+
+# Columns of the basic contacts table the search and match-key DDL look at
+BASIC_CONTACT_COLUMNS = frozenset({
+    "id", "first_name", "last_name", "email", "phone", "organization", "notes", "created_at"
+})
+
+
+@dataclass(frozen=True)
+class SchemaPlan:
+    """Complete, idempotent DDL for one tenant layout, rendered against SCHEMA_PLACEHOLDER"""
+    tables: Tuple[str, ...]
+    statements: Tuple[str, ...]
+
+    @cached_property
+    def key(self) -> str:
+        """Layout fingerprint; pooled schemas are only handed to plans with the same key"""
+        return hashlib.sha1("\n".join(self.statements).encode("utf-8")).hexdigest()
+
+    def render(self, schema_name: str) -> List[str]:
+        return [statement.replace(SCHEMA_PLACEHOLDER, schema_name) for statement in self.statements]
+
+
+def _finish_plan(
+    tables: List[str],
+    statements: List[str],
+    contact_columns: Set[str],
+    stats_tables: List[str]
+) -> SchemaPlan:
+    """Add the contact search/dedup indexes and dashboard counters the tables call for"""
+    if "contacts" in tables:
+        statements.extend(contact_search_ddl(SCHEMA_PLACEHOLDER, contact_columns))
+        statements.extend(contact_dedup_ddl(SCHEMA_PLACEHOLDER, tuple(sorted(contact_columns))))
+    statements.extend(dashboard_stats_ddl(SCHEMA_PLACEHOLDER, stats_tables))
+    return SchemaPlan(tuple(tables), tuple(statement.strip() for statement in statements))
+
+
+@lru_cache(maxsize=64)
+def plan_for_modules(modules: Tuple[str, ...]) -> SchemaPlan:
+    """Plan for the basic generator's module set"""
+    tables: List[str] = []
+    statements: List[str] = []
+    for module, definition in BASIC_MODULE_DDL.items():
+        if module not in modules:
+            continue
+        rendered = definition.format(schema=SCHEMA_PLACEHOLDER)
+        statements.extend(s.strip() for s in rendered.split(";") if s.strip())
+        tables.extend(BASIC_MODULE_TABLES[module])
+    for module in modules:
+        if module not in BASIC_MODULE_DDL:
+            logger.warning(f"No table definition found for module: {module}")
+
+    return _finish_plan(tables, statements, set(BASIC_CONTACT_COLUMNS), tables)
+
+
+def _dependency_order(entities: Dict[str, Dict]) -> List[str]:
+    """Entity names with referenced entities first (reference cycles are broken arbitrarily)"""
+    order: List[str] = []
+    visiting: Set[str] = set()
+
+    def visit(name: str) -> None:
+        if name in order or name in visiting:
+            return
+        visiting.add(name)
+        for field in entities[name].get("fields", []):
+            reference = field.get("reference") if field.get("type") == "reference" else None
+            if reference in entities:
+                visit(reference)
+        visiting.discard(name)
+        order.append(name)
+
+    for name in entities:
+        visit(name)
+    return order
+
+
+def _sql_literal(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _column_definition(field: Dict, created: Set[str]) -> Optional[str]:
+    """Column DDL for a template field (None for types without a column)"""
+    field_type = field["type"]
+    if field_type == "string":
+        sql_type = f"VARCHAR({field.get('max_length') or 255})"
+    elif field_type == "reference":
+        sql_type = "UUID"
+        # Only tables created earlier in the plan can be referenced
+        if field.get("reference") in created:
+            sql_type += f" REFERENCES {SCHEMA_PLACEHOLDER}.{field['reference']}(id)"
+    elif field_type in FIELD_TYPES:
+        sql_type = FIELD_TYPES[field_type]
+    else:
+        return None
+
+    definition = f'"{field["name"]}" {sql_type}'
+    if field.get("required"):
+        definition += " NOT NULL"
+    if field.get("auto_now_add"):
+        definition += " DEFAULT NOW()"
+    elif field.get("default") is not None and field_type not in ("json", "json_array", "reference"):
+        definition += f" DEFAULT {_sql_literal(field['default'])}"
+    return definition
+
+
+def _entity_ddl(entity_name: str, entity: Dict, created: Set[str]) -> Tuple[List[str], Set[str]]:
+    """CREATE TABLE and index statements for one entity, plus its column names"""
+    table = f"{SCHEMA_PLACEHOLDER}.{entity_name}"
+    columns = [f"{name} {sql}" for name, sql in SYSTEM_COLUMNS]
+    names = {name for name, _ in SYSTEM_COLUMNS}
+    indexes = [f"CREATE INDEX IF NOT EXISTS idx_{entity_name}_created ON {table} (created_at)"]
+    for field in entity.get("fields", []):
+        if field["name"] in names:
+            continue
+        definition = _column_definition(field, created)
+        if definition is None:
+            continue
+        columns.append(definition)
+        names.add(field["name"])
+        if field["type"] == "reference" or (field["type"] == "choice" and field["name"] in INDEXED_CHOICE_FIELDS):
+            indexes.append(
+                f'CREATE INDEX IF NOT EXISTS idx_{entity_name}_{field["name"]} ON {table} ("{field["name"]}")'
+            )
+    create = f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(columns)})"
+    return [create] + indexes, names
+
+
+def plan_for_configuration(config: Dict[str, Any]) -> SchemaPlan:
+    """
+    Plan for a client configuration (as built by build_client_configuration)
+
+    One table per entity with its fields' types, NOT NULL and default
+    constraints, foreign keys for references, and indexes on references,
+    filterable choices and created_at.
+    """
+    entities = config.get("entities", {})
+    tables: List[str] = []
+    statements: List[str] = []
+    stats_tables: List[str] = []
+    contact_columns: Set[str] = set()
+    for entity_name in _dependency_order(entities):
+        entity_statements, columns = _entity_ddl(entity_name, entities[entity_name], set(tables))
+        statements.extend(entity_statements)
+        tables.append(entity_name)
+        if entity_name == "contacts":
+            contact_columns = columns
+        # Donation counters sum the amount column
+        if entity_name == "contacts" or (entity_name == "donations" and "amount" in columns):
+            stats_tables.append(entity_name)
+    return _finish_plan(tables, statements, contact_columns, stats_tables)
+
+
+def default_pool_plans() -> List[SchemaPlan]:
+    """Layouts kept pre-provisioned: the default template's and the basic sign-up modules'"""
+    plans = []
+    if settings.SCHEMA_POOL_TEMPLATE:
+        plans.append(plan_for_configuration(build_client_configuration(settings.SCHEMA_POOL_TEMPLATE, {})))
+    modules = tuple(m.strip() for m in settings.SCHEMA_POOL_MODULES.split(",") if m.strip())
+    if modules:
+        plans.append(plan_for_modules(modules))
+    return plans
+
+
+async def execute_ddl(db: AsyncSession, statements: List[str]) -> None:
+    """
+    Run statements in the session's current transaction
+
+    Over asyncpg the first statement opens the transaction and the rest go
+    as one simple-query script: a single round trip however many tables.
+    """
+    if not statements:
+        return
+    await db.execute(text(statements[0]))
+    rest = statements[1:]
+    if not rest:
+        return
+    conn = await db.connection()
+    if conn.dialect.driver == "asyncpg":
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.execute(";\n".join(rest))
+    else:
+        for statement in rest:
+            await db.execute(text(statement))
+
+
+async def claim_pooled_schema(db: AsyncSession, schema_name: str, plan: SchemaPlan) -> bool:
+    """
+    Rename a pre-provisioned schema with the plan's layout to schema_name
+
+    The plan is replayed after the rename (every statement is idempotent) to
+    rebind the trigger functions, whose bodies name their schema. The session
+    must have nothing pending: it is committed, or rolled back on failure.
+
+    Returns:
+        False if the pool has no schema for this layout
+    """
+    try:
+        result = await db.execute(text("""
+            DELETE FROM schema_pool WHERE schema_name = (
+                SELECT schema_name FROM schema_pool WHERE plan_key = :plan_key
+                ORDER BY created_at LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING schema_name
+        """), {"plan_key": plan.key})
+        pooled = result.scalar()
+        if pooled is None:
+            await db.rollback()
+            return False
+        await execute_ddl(db, [f"ALTER SCHEMA {pooled} RENAME TO {schema_name}"] + plan.render(schema_name))
+        await db.commit()
+    except Exception as e:
+        logger.error(f"Could not claim a pooled schema for {schema_name}: {str(e)}")
+        await db.rollback()
+        return False
+
+    logger.info(f"Claimed pooled schema {pooled} as {schema_name}")
+    schedule_pool_refill()
+    return True
+
+
+async def provision_schema(
+    db: AsyncSession,
+    schema_name: str,
+    plan: SchemaPlan,
+    use_pool: bool = True
+) -> bool:
+    """
+    Create a tenant schema and everything in it in one transaction
+
+    Args:
+        db: Session with nothing pending (committed on success)
+        schema_name: Tenant schema
+        plan: Layout from plan_for_modules or plan_for_configuration
+        use_pool: Claim a pre-provisioned schema when one matches the layout
+
+    Returns:
+        True if a pooled schema was claimed, False if it was created
+    """
+    if use_pool and await claim_pooled_schema(db, schema_name, plan):
+        return True
+    try:
+        await execute_ddl(db, [f"CREATE SCHEMA IF NOT EXISTS {schema_name}"] + plan.render(schema_name))
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return False
+
+
+# One refill at a time per process (the pool table's count check keeps it bounded)
+_refill_lock = asyncio.Lock()
+_refill_task: Optional[asyncio.Task] = None
+
+
+async def refill_schema_pool(plan: SchemaPlan, size: int) -> int:
+    """
+    Top the pool up to size empty schemas with the plan's layout
+
+    Returns:
+        Number of schemas created
+    """
+    created = 0
+    async with _refill_lock:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                text("SELECT COUNT(*) FROM schema_pool WHERE plan_key = :plan_key"),
+                {"plan_key": plan.key}
+            )
+            missing = size - (result.scalar() or 0)
+            for _ in range(max(missing, 0)):
+                pooled = f"{POOL_SCHEMA_PREFIX}{uuid.uuid4().hex[:16]}"
+                try:
+                    await execute_ddl(db, [f"CREATE SCHEMA {pooled}"] + plan.render(pooled))
+                    await db.execute(
+                        text("INSERT INTO schema_pool (schema_name, plan_key) VALUES (:schema_name, :plan_key)"),
+                        {"schema_name": pooled, "plan_key": plan.key}
+                    )
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+                created += 1
+    return created
+
+
+async def drop_stale_pooled_schemas(plans: List[SchemaPlan]) -> List[str]:
+    """
+    Drop pooled schemas whose layout is none of plans
+
+    Plan keys hash the DDL, so any DDL change leaves the older pooled schemas
+    unclaimable. Schemas being claimed right now are skipped (row locks).
+
+    Returns:
+        Names of the dropped schemas
+    """
+    async with _refill_lock:
+        async with AsyncSessionLocal() as db:
+            try:
+                result = await db.execute(text("""
+                    DELETE FROM schema_pool WHERE schema_name IN (
+                        SELECT schema_name FROM schema_pool WHERE NOT (plan_key = ANY(:plan_keys))
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING schema_name
+                """), {"plan_keys": [plan.key for plan in plans]})
+                stale = [row[0] for row in result.fetchall()]
+                await execute_ddl(db, [f"DROP SCHEMA IF EXISTS {name} CASCADE" for name in stale])
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+    return stale
+
+
+async def fill_schema_pools() -> None:
+    """Refill every pooled layout (errors are logged; sign-ups fall back to creating schemas)"""
+    if settings.SCHEMA_POOL_SIZE <= 0:
+        return
+    plans = default_pool_plans()
+    try:
+        stale = await drop_stale_pooled_schemas(plans)
+        if stale:
+            logger.info(f"Dropped {len(stale)} pooled schemas with an outdated layout")
+    except Exception as e:
+        logger.error(f"Error dropping stale pooled schemas: {str(e)}")
+    for plan in plans:
+        try:
+            created = await refill_schema_pool(plan, settings.SCHEMA_POOL_SIZE)
+            if created:
+                logger.info(f"Pre-provisioned {created} schemas for layout {plan.key[:12]} ({', '.join(plan.tables)})")
+        except Exception as e:
+            logger.error(f"Error refilling schema pool: {str(e)}")
+
+
+def schedule_pool_refill() -> None:
+    """Refill the pools in the background (no-op while a refill is running)"""
+    global _refill_task
+    if settings.SCHEMA_POOL_SIZE <= 0:
+        return
+    if _refill_task is None or _refill_task.done():
+        _refill_task = asyncio.get_running_loop().create_task(fill_schema_pools())
@@ -0,0 +1,108 @@
+"""
+Realtime Tool Manifest Compiler
+Generates the voice assistant's function tools (those with an API handler) from a tenant's CRM configuration
+Manifests are compiled once per configuration version and cached
+"""
+
+import json
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+from ..core.config import settings
+from ..models.ultra_flexible_templates import get_module
+
+
+# Default configuration for users without a tenant (platform users)
+DEFAULT_CONFIGURATION: Dict[str, Any] = {"modules": ["contacts"]}
+
+# Compiled manifests by configuration version, LRU-bounded
+_MANIFEST_CACHE: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+
+
+def configuration_version(configuration: Optional[Dict[str, Any]]) -> str:
+    """Stable version key for a configuration (content hash)"""
+    canonical = json.dumps(configuration or {}, sort_keys=True, default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def _enabled_module_ids(configuration: Dict[str, Any]) -> List[str]:
+    """Module ids from either list form (basic generator) or dict form (template builder)"""
+    modules = configuration.get("modules") or []
+    if isinstance(modules, dict):
+        return [m for m, cfg in modules.items() if not isinstance(cfg, dict) or cfg.get("enabled", True)]
+    return list(modules)
+
+
+def resolve_entities(configuration: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Resolve entity definitions (with module extension fields) for a configuration"""
+    module_ids = _enabled_module_ids(configuration)
+    modules = [m for m in (get_module(module_id) for module_id in module_ids) if m]
+
+    entities: Dict[str, Dict[str, Any]] = {}
+    for name, entity_def in (configuration.get("entities") or {}).items():
+        entities[name] = {**entity_def, "fields": list(entity_def.get("fields", []))}
+    for module in modules:
+        for name, entity_def in module.base_entities.items():
+            if name not in entities:
+                entities[name] = {**entity_def, "fields": list(entity_def.get("fields", []))}
+
+    # Extension fields from enabled modules (e.g. donor_segment on contacts)
+    for module in modules:
+        for name, fields in module.extension_fields.items():
+            if name not in entities:
+                continue
+            existing = {f["name"] for f in entities[name]["fields"]}
+            entities[name]["fields"].extend(f for f in fields if f["name"] not in existing)
+
+    return entities
+
+
+def _search_contacts_tool(entity_def: Dict[str, Any]) -> Dict[str, Any]:
+    """Parameters match the route's ContactSearchRequest (free text over name, email, organization)"""
+    plural = (entity_def.get("plural") or "Contacts").lower()
+    return {
+        "type": "function",
+        "name": "search_contacts",
+        "description": f"Search {plural} in the CRM by name, email or organization",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "Free-text search query"},
+                "limit": {"type": "integer", "default": 10, "minimum": 1, "maximum": 100}
+            },
+            "required": ["query"],
+            "additionalProperties": False
+        }
+    }
+
+
+def _compile(configuration: Dict[str, Any]) -> List[Dict[str, Any]]:
+    entities = resolve_entities(configuration)
+    tools = []
+    if "contacts" in entities:
+        tools.append(_search_contacts_tool(entities["contacts"]))
+    description = "Get dashboard statistics (contact counts"
+    description += ", donation totals)" if "donations" in entities else ")"
+    tools.append({
+        "type": "function",
+        "name": "get_dashboard_stats",
+        "description": description,
+        "parameters": {"type": "object", "properties": {}}
+    })
+    return tools
+
+
+def compile_tool_manifest(configuration: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Get the tool manifest for a configuration, compiling it on first use per version"""
+    configuration = configuration or DEFAULT_CONFIGURATION
+    version = configuration_version(configuration)
+    manifest = _MANIFEST_CACHE.get(version)
+    if manifest is None:
+        manifest = _compile(configuration)
+        _MANIFEST_CACHE[version] = manifest
+        while len(_MANIFEST_CACHE) > settings.TOOL_MANIFEST_CACHE_SIZE:
+            _MANIFEST_CACHE.popitem(last=False)
+    else:
+        _MANIFEST_CACHE.move_to_end(version)
+    return manifest
@@ -0,0 +1,178 @@
+"""
+Upload Registry
+Stores uploaded data files by content hash and profiles each distinct file once
+Re-uploading the same export returns the existing file_id without storing or sampling again
+"""
+
+import os
+import json
+import uuid
+import asyncio
+import hashlib
+import tempfile
+from typing import Dict, List, Any, Optional, Tuple
+import pandas as pd
+from fastapi import UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select
+
+from ..core.config import settings
+from ..models.platform import UploadedFile
+from .file_loader import sample_file, EXCEL_EXTENSIONS, LEGACY_EXCEL_EXTENSIONS, CSV_EXTENSIONS
+
+
+CHUNK_BYTES = 1024 * 1024
+
+
+def detect_format(filename: str) -> Optional[str]:
+    """'csv', 'xlsx' or 'xls' from the file extension (None if unsupported)"""
+    lower = filename.lower()
+    if lower.endswith(CSV_EXTENSIONS):
+        return "csv"
+    if lower.endswith(EXCEL_EXTENSIONS):
+        return "xlsx"
+    if lower.endswith(LEGACY_EXCEL_EXTENSIONS):
+        return "xls"
+    return None
+
+
+def content_path(content_hash: str, filename: str) -> str:
+    """Storage path for a hash (the extension is kept for the format-sniffing loaders)"""
+    extension = os.path.splitext(filename)[1].lower()
+    return os.path.join(settings.UPLOAD_DIR, content_hash[:2], f"{content_hash}{extension}")
+
+
+async def _spool(file: UploadFile) -> Tuple[str, str, int]:
+    """Stream the upload to a temp file in the store, hashing as it goes"""
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(mode='wb', dir=settings.UPLOAD_DIR, suffix='.part', delete=False) as temp_file:
+        while chunk := await file.read(CHUNK_BYTES):
+            digest.update(chunk)
+            size += len(chunk)
+            temp_file.write(chunk)
+    return temp_file.name, digest.hexdigest(), size
+
+
+def _profile(path: str, filename: str) -> List[Dict[str, Any]]:
+    """Sampled header/rows/row count per sheet, JSON-ready and independent of the filename"""
+    profile = []
+    for sample in sample_file(path, filename):
+        rows = json.loads(sample["frame"].to_json(orient="records", date_format="iso"))
+        profile.append({
+            "sheet": None if sample["key"] == filename else sample["key"][len(filename) + 1:],
+            "columns": sample["columns"],
+            "row_count": sample["row_count"],
+            "row_count_estimated": sample["row_count_estimated"],
+            "rows": rows
+        })
+    return profile
+
+
+async def find_upload(db: AsyncSession, client_id: Optional[str], content_hash: str) -> Optional[UploadedFile]:
+    """Entry for a hash owned by client_id (any client's, if client_id is None)"""
+    query = select(UploadedFile).where(UploadedFile.content_hash == content_hash)
+    if client_id is not None:
+        query = query.where(UploadedFile.client_id == uuid.UUID(str(client_id)))
+    result = await db.execute(query.limit(1))
+    return result.scalars().first()
+
+
+async def register_upload(db: AsyncSession, client_id: str, file: UploadFile) -> Tuple[UploadedFile, bool]:
+    """
+    Store an upload by content hash and cache its profile
+
+    Args:
+        db: Platform database session
+        client_id: Owning client
+        file: Incoming upload (streamed, never held in memory)
+
+    Returns:
+        (registry entry, whether it was newly created)
+    """
+    file_format = detect_format(file.filename)
+    if file_format is None:
+        raise ValueError(f"Unsupported file type: {file.filename}")
+
+    temp_path, content_hash, size = await _spool(file)
+    try:
+        existing = await find_upload(db, client_id, content_hash)
+        if existing:
+            return existing, False
+
+        # Another client may have uploaded the same bytes; the blob is shared
+        storage_path = content_path(content_hash, file.filename)
+        if not os.path.exists(storage_path):
+            os.makedirs(os.path.dirname(storage_path), exist_ok=True)
+            os.replace(temp_path, storage_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+    upload = UploadedFile(
+        client_id=uuid.UUID(str(client_id)),
+        filename=file.filename,
+        content_type=file.content_type,
+        content_hash=content_hash,
+        storage_path=storage_path,
+        size=size,
+        file_format=file_format
+    )
+    # Profiles depend only on content, so another client's copy is reused as is
+    shared = await find_upload(db, None, content_hash)
+    if shared and shared.profile is not None:
+        upload.profile = shared.profile
+    else:
+        try:
+            upload.profile = await asyncio.to_thread(_profile, storage_path, file.filename)
+        except Exception as e:
+            upload.profile_error = f"Could not parse file: {str(e)}"
+
+    db.add(upload)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Concurrent upload of the same content won the insert
+        await db.rollback()
+        existing = await find_upload(db, client_id, content_hash)
+        if existing is None:
+            raise
+        return existing, False
+    await db.refresh(upload)
+    return upload, True
+
+
+async def get_uploads(db: AsyncSession, client_id: str, file_ids: List[str]) -> List[UploadedFile]:
+    """
+    Registry entries for a client's file_ids, in request order
+
+    Raises:
+        ValueError: for ids that aren't UUIDs
+    """
+    ids = [uuid.UUID(str(file_id)) for file_id in file_ids]
+    if not ids:
+        return []
+    result = await db.execute(
+        select(UploadedFile).where(
+            UploadedFile.client_id == uuid.UUID(str(client_id)),
+            UploadedFile.id.in_(ids)
+        )
+    )
+    by_id = {upload.id: upload for upload in result.scalars().all()}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+def profile_sheets(upload: UploadedFile) -> List[Tuple[str, Dict[str, Any]]]:
+    """(table key, cached sheet) pairs, keyed like the file loader ("name" or "name_Sheet")"""
+    return [
+        (upload.filename if sheet["sheet"] is None else f"{upload.filename}_{sheet['sheet']}", sheet)
+        for sheet in upload.profile or []
+    ]
+
+
+def profile_frame(sheet: Dict[str, Any]) -> pd.DataFrame:
+    """Sampled rows of a cached profile sheet as a DataFrame"""
+    return pd.DataFrame(sheet["rows"], columns=sheet["columns"])
+
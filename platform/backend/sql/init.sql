@@ -4,6 +4,9 @@
 -- Enable UUID extension
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- Trigram indexes for tenant contact search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Platform Users (administrators)
 CREATE TABLE IF NOT EXISTS platform_users (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -71,6 +74,29 @@ CREATE TABLE IF NOT EXISTS client_projects (
     actual_completion TIMESTAMP
 );
 
+-- Uploaded Files (content-addressed upload registry with cached previews)
+CREATE TABLE IF NOT EXISTS uploaded_files (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    client_id UUID NOT NULL REFERENCES clients(id) ON DELETE CASCADE,
+    filename VARCHAR(255) NOT NULL,
+    content_type VARCHAR(255),
+    content_hash VARCHAR(64) NOT NULL,
+    storage_path VARCHAR(1024) NOT NULL,
+    size BIGINT NOT NULL,
+    file_format VARCHAR(20) NOT NULL,
+    profile JSONB,
+    profile_error TEXT,
+    created_at TIMESTAMP DEFAULT NOW(),
+    UNIQUE(client_id, content_hash)
+);
+
+-- Pre-provisioned empty tenant schemas, claimed at sign-up by renaming
+CREATE TABLE IF NOT EXISTS schema_pool (
+    schema_name VARCHAR(63) PRIMARY KEY,
+    plan_key VARCHAR(40) NOT NULL,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
 -- Indexes for performance
 CREATE INDEX IF NOT EXISTS idx_clients_subdomain ON clients(subdomain);
 CREATE INDEX IF NOT EXISTS idx_clients_status ON clients(status);
@@ -78,6 +104,9 @@ CREATE INDEX IF NOT EXISTS idx_client_users_client_id ON client_users(client_id)
 CREATE INDEX IF NOT EXISTS idx_client_users_email ON client_users(email);
 CREATE INDEX IF NOT EXISTS idx_client_projects_client_id ON client_projects(client_id);
 CREATE INDEX IF NOT EXISTS idx_client_projects_status ON client_projects(status);
+CREATE INDEX IF NOT EXISTS idx_uploaded_files_client_id ON uploaded_files(client_id);
+CREATE INDEX IF NOT EXISTS idx_uploaded_files_content_hash ON uploaded_files(content_hash);
+CREATE INDEX IF NOT EXISTS idx_schema_pool_plan_key ON schema_pool(plan_key, created_at);
 
 -- Insert default platform admin user (password: admin123)
 INSERT INTO platform_users (email, hashed_password, full_name, is_superuser)
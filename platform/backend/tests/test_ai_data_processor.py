@@ -0,0 +1,125 @@
+import json
+import asyncio
+from types import SimpleNamespace
+
+import pandas as pd
+
+from app.services.ai_data_processor import AIDataProcessor, LLMResponseCache
+
+
+class StubChatModel:
+    """Local stand-in for the async OpenAI client; records prompts and peak concurrency"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    @staticmethod
+    def _reply(prompt):
+        if "type of CRM entity" in prompt:
+            return {"entity_type": "contacts", "confidence": 0.9, "field_mapping": {}, "reasoning": "stub"}
+        return {
+            "type": "nonprofit",
+            "confidence": 0.9,
+            "primary_activities": ["general"],
+            "focus_areas": ["community"],
+            "reasoning": "stub"
+        }
+
+    async def _create(self, model, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        self.calls.append(prompt)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        content = json.dumps(self._reply(prompt))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _processor(stub, cache=None, max_concurrent_requests=4):
+    # A threshold above 1 sends every table to the model
+    return AIDataProcessor(
+        openai_client=stub,
+        model="stub",
+        max_concurrent_requests=max_concurrent_requests,
+        response_cache=cache or LLMResponseCache(),
+        confidence_threshold=2.0
+    )
+
+
+def _files():
+    return {
+        "sheet_a": pd.DataFrame({"col_1": ["x", "y"], "col_2": [1, 2]}),
+        "sheet_b": pd.DataFrame({"col_3": ["p", "q"], "col_4": [3.5, 4.5]}),
+    }
+
+
+async def _analyse(processor, raw_data):
+    org = await processor._analyze_organization_type(raw_data, {})
+    entities = await processor._extract_entities(raw_data, org, {})
+    return org, sorted(entities)
+
+
+def test_reanalysing_the_same_files_makes_no_model_calls():
+    async def run():
+        stub = StubChatModel()
+        processor = _processor(stub)
+        first = await _analyse(processor, _files())
+        calls = len(stub.calls)
+        second = await _analyse(processor, _files())
+        return stub, calls, first, second
+
+    stub, calls, first, second = asyncio.run(run())
+    # One organization prompt and one entity prompt per sheet
+    assert calls == 3
+    assert len(stub.calls) == calls
+    assert second == first
+
+
+def test_identical_concurrent_prompts_share_one_call():
+    async def run():
+        stub = StubChatModel(delay=0.05)
+        processor = _processor(stub)
+        results = await asyncio.gather(*(
+            processor._complete_json("organization_type", {"tables": ["a"]}, "Analyze this") for _ in range(5)
+        ))
+        return stub, processor, results
+
+    stub, processor, results = asyncio.run(run())
+    assert len(stub.calls) == 1
+    assert all(result == results[0] for result in results)
+    assert not processor._inflight
+
+
+def test_concurrent_calls_are_bounded_by_the_semaphore():
+    async def run():
+        stub = StubChatModel(delay=0.02)
+        processor = _processor(stub, max_concurrent_requests=2)
+        await asyncio.gather(*(
+            processor._complete_json("entity_type", {"table": i}, f"Prompt {i}") for i in range(8)
+        ))
+        return stub
+
+    stub = asyncio.run(run())
+    assert len(stub.calls) == 8
+    assert stub.max_active == 2
+
+
+def test_disk_cache_survives_a_new_process(tmp_path):
+    async def run(stub):
+        return await _analyse(_processor(stub, LLMResponseCache(str(tmp_path))), _files())
+
+    first_stub, second_stub = StubChatModel(), StubChatModel()
+    first = asyncio.run(run(first_stub))
+    # A fresh cache object only has the files on disk to go on
+    second = asyncio.run(run(second_stub))
+    assert len(first_stub.calls) == 3
+    assert second_stub.calls == []
+    assert second == first
+    assert len(list(tmp_path.glob("*.json"))) == 3
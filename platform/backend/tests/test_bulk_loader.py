@@ -0,0 +1,86 @@
+import os
+import uuid
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.services.bulk_loader import BulkLoader
+
+
+# The loader validates in PostgreSQL itself, so these need a real server
+DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+COLUMNS = ["qty", "amount", "ratio", "joined", "seen", "active", "name"]
+
+
+async def _load(rows):
+    engine = create_async_engine(DATABASE_URL)
+    schema_name = f"bulk_loader_test_{uuid.uuid4().hex[:8]}"
+    try:
+        async with AsyncSession(engine) as db:
+            await db.execute(text(f"CREATE SCHEMA {schema_name}"))
+            await db.execute(text(f"""
+                CREATE TABLE {schema_name}.items (
+                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+                    qty INTEGER,
+                    amount NUMERIC(10,2),
+                    ratio DOUBLE PRECISION,
+                    joined DATE,
+                    seen TIMESTAMPTZ,
+                    active BOOLEAN,
+                    name VARCHAR(5)
+                )
+            """))
+            await db.commit()
+            loader = BulkLoader(db, schema_name, "items")
+            batch = await loader.load_rows(COLUMNS, rows, start_row=1)
+            loaded = (await db.execute(text(f"SELECT name FROM {schema_name}.items ORDER BY name"))).scalars().all()
+            return batch, loader.summary(), loaded
+    finally:
+        async with AsyncSession(engine) as db:
+            await db.execute(text(f"DROP SCHEMA IF EXISTS {schema_name} CASCADE"))
+            await db.commit()
+        await engine.dispose()
+
+
+GOOD = ("3", "12.50", "1.5", "2024-02-29", "2024-01-01 12:00 America/New_York", "yes", "ann")
+
+
+def _row(**overrides):
+    values = dict(zip(COLUMNS, GOOD))
+    values.update(overrides)
+    return tuple(values[c] for c in COLUMNS)
+
+
+def test_values_that_fail_the_cast_reject_their_row_only():
+    rows = [
+        _row(),
+        _row(qty="3000000000", name="r2"),
+        _row(amount="99999999.995", name="r3"),
+        _row(joined="2023-02-29", name="r4"),
+        _row(seen="2024-01-01 12:00 Mars/Olympus", name="r5"),
+        _row(active="maybe", name="r6"),
+        _row(name="toolong"),
+        _row(ratio="infinity", joined="12/31/2024", name="ok"),
+    ]
+    batch, summary, loaded = asyncio.run(_load(rows))
+
+    assert batch == {"loaded": 2, "rejected": 6, "skipped": 0, "matched": 0}
+    assert loaded == ["ann", "ok"]
+    assert [(r["row"], r["error"]) for r in summary["rejected_rows"]] == [
+        (2, "qty: invalid integer"),
+        (3, "amount: invalid number"),
+        (4, "joined: invalid date"),
+        (5, "seen: invalid timestamp"),
+        (6, "active: invalid boolean"),
+        (7, "name: longer than 5 characters"),
+    ]
+
+
+def test_blank_typed_values_load_as_null():
+    batch, _, loaded = asyncio.run(_load([_row(qty=" ", amount="", joined="", name="blank")]))
+    assert batch["loaded"] == 1
+    assert loaded == ["blank"]
@@ -0,0 +1,38 @@
+import os
+import asyncio
+
+import pandas as pd
+
+from app.services import file_loader
+from app.services.file_loader import loader_pool, stream_data_files
+
+
+def _write_csvs(tmp_path, count):
+    files = []
+    for i in range(count):
+        path = tmp_path / f"table_{i}.csv"
+        pd.DataFrame({"name": [f"n{i}", f"m{i}"], "value": [i, i + 1]}).to_csv(path, index=False)
+        files.append({"path": str(path), "name": f"table_{i}"})
+    return files
+
+
+async def _collect(files):
+    return sorted((index, key, len(frame)) for index, key, frame in [item async for item in stream_data_files(files)])
+
+
+def test_streams_every_file_with_its_upload_index(tmp_path):
+    files = _write_csvs(tmp_path, 3) + [{"path": str(tmp_path / "notes.txt"), "name": "notes"}]
+    assert asyncio.run(_collect(files)) == [(0, "table_0", 2), (1, "table_1", 2), (2, "table_2", 2)]
+
+
+def test_a_broken_pool_is_replaced(tmp_path):
+    files = _write_csvs(tmp_path, 1)
+    broken = loader_pool()
+    # A worker exiting abruptly breaks the whole executor
+    try:
+        broken.submit(os._exit, 1).result()
+    except Exception:
+        pass
+    assert asyncio.run(_collect(files)) == []
+    assert file_loader._pool is not broken
+    assert asyncio.run(_collect(files)) == [(0, "table_0", 2)]
@@ -0,0 +1,143 @@
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app import realtime
+from app.realtime import RealtimeTokenService
+
+
+class StubRealtimeServer:
+    """Local stand-in for the OpenAI client_secrets endpoint; counts mints"""
+
+    def __init__(self):
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests.append(body)
+                payload = json.dumps({
+                    "value": f"ek_{len(stub.requests)}",
+                    "expires_at": time.time() + body["expires_after"]["seconds"],
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/realtime/client_secrets"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    with StubRealtimeServer() as server:
+        monkeypatch.setattr(realtime, "get_realtime_url", lambda: server.url)
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        yield server
+
+
+def _config(name):
+    return lambda: {"session": {"type": "realtime", "instructions": name}}
+
+
+async def _settle(service):
+    await asyncio.gather(*service._refills.values(), return_exceptions=True)
+
+
+def test_first_session_mints_directly_without_filling_a_pool(stub):
+    async def run():
+        service = RealtimeTokenService(pool_size=2, ttl_seconds=600)
+        status, secret = await service.get_token("v1", _config("a"))
+        await _settle(service)
+        await service.aclose()
+        return status, secret, service
+
+    status, secret, service = asyncio.run(run())
+    assert status == 200
+    assert secret["value"] == "ek_1"
+    assert len(stub.requests) == 1
+    assert not service._pools.get("v1")
+    assert stub.requests[0]["expires_after"]["seconds"] == 600
+    assert stub.requests[0]["session"]["instructions"] == "a"
+
+
+def test_repeat_key_is_served_from_the_pool(stub):
+    async def run():
+        service = RealtimeTokenService(pool_size=2, ttl_seconds=600)
+        await service.get_token("v1", _config("a"))
+        await service.get_token("v1", _config("a"))
+        await _settle(service)
+        minted = len(stub.requests)
+        status, secret = await service.get_token("v1", _config("a"))
+        await service.aclose()
+        return minted, status, secret
+
+    minted, status, secret = asyncio.run(run())
+    # Two direct mints, then the refill topped the pool up to two secrets
+    assert minted == 4
+    assert status == 200
+    assert secret["value"] in ("ek_3", "ek_4")
+
+
+def test_warm_fills_the_pool_before_the_first_session(stub):
+    async def run():
+        service = RealtimeTokenService(pool_size=2, ttl_seconds=600)
+        await service.warm("v1", _config("a"))
+        await _settle(service)
+        status, secret = await service.get_token("v1", _config("a"))
+        await service.aclose()
+        return status, secret
+
+    status, secret = asyncio.run(run())
+    assert status == 200
+    assert secret["value"] == "ek_1"
+    assert len(stub.requests) == 2
+
+
+def test_new_tenant_version_evicts_the_old_one(stub):
+    async def run():
+        service = RealtimeTokenService(pool_size=1, ttl_seconds=600)
+        await service.get_token("t1:v1", _config("old"), tenant="t1")
+        await service.get_token("t1:v1", _config("old"), tenant="t1")
+        await _settle(service)
+        assert service._pools["t1:v1"]
+        await service.get_token("t1:v2", _config("new"), tenant="t1")
+        await service.aclose()
+        return service
+
+    service = asyncio.run(run())
+    assert list(service._configs) == ["t1:v2"]
+    assert "t1:v1" not in service._pools
+
+
+def test_keys_are_lru_bounded(stub):
+    async def run():
+        service = RealtimeTokenService(pool_size=0, max_keys=2)
+        await service.get_token("a", _config("a"))
+        await service.get_token("b", _config("b"))
+        await service.get_token("a", _config("a"))
+        await service.get_token("c", _config("c"))
+        await service.aclose()
+        return service
+
+    service = asyncio.run(run())
+    assert list(service._configs) == ["a", "c"]